@@ -290,9 +290,20 @@ def copy_metadata(old, data, do_coords=True):
     return new
 
 
-def make_subset_data(data, pixels=None, return_selection=False, seed=None):
+def make_subset_data(data, pixels=None, return_selection=False, seed=None,
+                     weights=None, uniform_fraction=0.1):
     """Sub-sample a data for faster inference.
 
+    By default pixels are chosen uniformly at random. Given weights (such
+    as from local_contrast, center_weights or Model.information_map),
+    pixels are chosen with probability proportional to a mixture of the
+    weights (a fraction 1 - uniform_fraction) and uniform weights (a
+    fraction uniform_fraction), by systematic sampling so that exactly
+    pixels are chosen. Each chosen pixel is then given the weight
+    1 / (probability it was chosen) in the likelihood (stored as
+    attrs['pixel_weights']), which keeps the log-likelihood of the
+    subset an unbiased estimate of that of the whole image.
+
     Parameters
     ----------
     data : `xr.DataArray`
@@ -304,6 +315,12 @@ def make_subset_data(data, pixels=None, return_selection=False, seed=None):
         Default is False
     seed : int or None, optional
         If not None, the seed to seed the random number generator with.
+    weights : array-like, optional
+        Nonnegative importance of each pixel of data, with the same shape
+        as data. Default chooses pixels uniformly.
+    uniform_fraction : float, optional
+        Fraction of the sampling probability spread uniformly over the
+        image, so that no pixel is left out entirely. Default is 0.1.
 
     Returns
     -------
@@ -316,11 +333,25 @@ def make_subset_data(data, pixels=None, return_selection=False, seed=None):
     if seed is not None:
         np.random.seed(seed)
     tot_pix = len(data.x) * len(data.y)
-    selection = np.random.choice(tot_pix, pixels, replace=False)
+    if weights is None:
+        selection = np.random.choice(tot_pix, pixels, replace=False)
+    else:
+        if isinstance(weights, xr.DataArray):
+            weights = flat(weights).values
+        probabilities = _inclusion_probabilities(
+            np.ravel(weights), pixels, uniform_fraction)
+        # systematic sampling picks pixel i with exactly probability
+        # probabilities[i], and always picks exactly pixels of them
+        cumulative = np.cumsum(probabilities)
+        cumulative *= pixels / cumulative[-1]
+        points = np.random.uniform() + np.arange(pixels)
+        selection = np.searchsorted(cumulative, points)
     subset = flat(data).isel(flat=selection)
     subset = copy_metadata(data, subset, do_coords=False)
 
     subset.attrs['original_dims'] = {key: data[key].values for key in data.dims}
+    if weights is not None:
+        subset.attrs['pixel_weights'] = 1 / probabilities[selection]
 
     if return_selection:
         return subset, selection
@@ -328,6 +359,33 @@ def make_subset_data(data, pixels=None, return_selection=False, seed=None):
         return subset
 
 
+def _inclusion_probabilities(weights, pixels, uniform_fraction):
+    weights = np.asarray(weights, dtype=float)
+    if (weights < 0).any() or not np.isfinite(weights).all():
+        raise ValueError("Pixel weights must be finite and nonnegative.")
+    if weights.sum() == 0:
+        uniform_fraction = 1
+    else:
+        weights = weights / weights.sum()
+    weights = ((1 - uniform_fraction) * weights +
+               uniform_fraction / len(weights))
+    if np.count_nonzero(weights) < pixels:
+        raise ValueError("Fewer pixels have nonzero weight than are to be "
+                         "chosen.")
+    # probabilities proportional to weights, except that pixels which
+    # would have a probability over 1 are always chosen
+    probabilities = np.zeros(len(weights))
+    free = weights > 0
+    while True:
+        remaining = pixels - (probabilities == 1).sum()
+        probabilities[free] = remaining * weights[free] / weights[free].sum()
+        certain = free & (probabilities >= 1)
+        if not certain.any():
+            return probabilities
+        probabilities[certain] = 1
+        free &= ~certain
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #             Methods not part of the Holopy API
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -28,6 +28,7 @@ reconstructions.
 
 
 from holopy.core.process.img_proc import (normalize, detrend, zero_filter,
-    subimage, add_noise, simulate_noise, bg_correct)
+    subimage, add_noise, simulate_noise, bg_correct, local_contrast)
 from holopy.core.process.fourier import fft, ifft
-from holopy.core.process.centerfinder import center_find, hough, image_gradient
+from holopy.core.process.centerfinder import (center_find, hough,
+    image_gradient, center_weights)
@@ -37,7 +37,9 @@ video microscopy, Optics Express 17, 13071-13079 (2009).
 """
 
 import numpy as np
+import xarray as xr
 from .img_proc import normalize
+from ..metadata import copy_metadata
 from scipy.ndimage import sobel, filters
 from copy import copy
 
@@ -98,6 +100,43 @@ def center_find(image, centers=1, threshold=.5, blursize=3.):
     return res
 
 
+def center_weights(image, scale=None, centers=1, threshold=.5, blursize=3.):
+    """
+    Weights of the pixels of a hologram that fall off with distance from
+    its center(s), as found by center_find.
+
+    Useful as weights for make_subset_data, since the fringes of a
+    hologram, and the information they carry about the scatterer, fade
+    away from its center.
+
+    Parameters
+    ----------
+    image : xarray.DataArray
+        hologram to weight
+    scale : float (optional)
+        distance (in pixels) from the center at which weights fall to
+        half. Default is a quarter of the width of the image.
+    centers, threshold, blursize
+        passed to center_find
+
+    Returns
+    -------
+    weights : xarray.DataArray
+        1 / (1 + (distance / scale)**2) at each pixel, using the distance
+        to the nearest center
+    """
+    shape = (len(image.x), len(image.y))
+    if scale is None:
+        scale = min(shape) / 4
+    found = np.reshape(center_find(image, centers, threshold, blursize),
+                       (-1, 2))
+    rows, cols = np.indices(shape)
+    distance = np.min([np.hypot(rows - row, cols - col)
+                       for row, col in found], axis=0)
+    weights = xr.DataArray(1 / (1 + (distance / scale)**2), dims=['x', 'y'])
+    return copy_metadata(image, xr.zeros_like(image, dtype=float) + weights)
+
+
 def image_gradient(image):
     """
     Uses the Sobel operator as a numerical approximation of a
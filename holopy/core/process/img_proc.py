@@ -28,7 +28,7 @@ or detrending
 from ..errors import BadImage
 from ..metadata import copy_metadata, update_metadata, detector_grid, get_spacing, get_values
 from scipy.signal import detrend as dt
-from scipy.ndimage import gaussian_filter
+from scipy.ndimage import gaussian_filter, uniform_filter
 import numpy as np
 
 def normalize(image):
@@ -107,6 +107,34 @@ def zero_filter(image):
 
     return copy_metadata(image, output)
 
+def local_contrast(image, size=5):
+    """
+    Fringe contrast about each pixel of an image
+
+    Useful as weights for make_subset_data, since pixels in the flat
+    background of a hologram carry little information about the
+    scatterer.
+
+    Parameters
+    ----------
+    image : xarray.DataArray
+       Image to process
+    size : int
+       Width in pixels of the square region about each pixel over which
+       the contrast is measured. It should span about a fringe.
+
+    Returns
+    -------
+    contrast : xarray.DataArray
+       Standard deviation of image over the region about each pixel
+    """
+    window = [size if dim in ('x', 'y') else 1 for dim in image.dims]
+    values = image.values.astype(float)
+    mean = uniform_filter(values, window, mode='nearest')
+    variance = uniform_filter(values**2, window, mode='nearest') - mean**2
+    return copy_metadata(image, image.copy(
+        data=np.sqrt(np.clip(variance, 0, None))))
+
 def subimage(arr, center, shape):
     """
     Pick out a region of an image or other array
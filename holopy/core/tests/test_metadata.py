@@ -2,6 +2,7 @@ import unittest
 from collections import OrderedDict
 
 import numpy as np
+from numpy.testing import assert_allclose
 from nose.plugins.attrib import attr
 
 from holopy.core.metadata import (
@@ -536,6 +537,50 @@ class TestMakeSubsetData(unittest.TestCase):
         data_z_coords = data.coords['z'].values
         self.assertTrue(np.all(subset_z_coords == data_z_coords))
 
+    @attr('fast')
+    def test_weighted_subset(self):
+        data = make_data()
+        weights = np.ones(data.shape)
+        weights[0, 2, 3] = 1000
+        subset, selection = make_subset_data(
+            data, pixels=5, return_selection=True, seed=1, weights=weights)
+        self.assertEqual(subset.size, 5)
+        self.assertEqual(len(np.unique(selection)), 5)
+        # a heavily weighted pixel is certain to be chosen
+        self.assertIn(2 * 5 + 3, selection)
+        pixel_weights = subset.attrs['pixel_weights']
+        self.assertEqual(pixel_weights[list(selection).index(13)], 1)
+        assert_allclose(np.delete(pixel_weights, list(selection).index(13)),
+                        6)
+
+    @attr('fast')
+    def test_weighted_subset_is_unbiased(self):
+        data = make_data()
+        weights = np.abs(data.values) + 0.1
+        estimates = []
+        for seed in range(2000):
+            subset = make_subset_data(data, pixels=5, seed=seed,
+                                      weights=weights, uniform_fraction=0)
+            estimates.append((subset.attrs['pixel_weights'] *
+                              subset.values**2).sum())
+        total = (data.values**2).sum()
+        standard_error = np.std(estimates) / np.sqrt(len(estimates))
+        self.assertTrue(abs(np.mean(estimates) - total) < 4 * standard_error)
+
+    @attr('fast')
+    def test_weighted_subset_needs_enough_weighted_pixels(self):
+        data = make_data()
+        weights = np.zeros(data.shape)
+        weights[0, :2, 0] = 1
+        self.assertRaises(ValueError, make_subset_data, data, pixels=3,
+                          weights=weights, uniform_fraction=0)
+        subset = make_subset_data(data, pixels=2, weights=weights,
+                                  uniform_fraction=0)
+        assert_allclose(sorted(subset.values), sorted(data.values[0, :2, 0]))
+        self.assertRaises(ValueError, make_subset_data, data, pixels=2,
+                          weights=-weights)
+
+
 
 def make_data(seed=1):
     np.random.seed(seed)
@@ -22,7 +22,8 @@ import xarray as xr
 from numpy.testing import assert_allclose
 from nose.plugins.attrib import attr
 
-from holopy.core.process import center_find, subimage, fft, ifft
+from holopy.core.process import (
+    center_find, subimage, fft, ifft, local_contrast, center_weights)
 from holopy.core.metadata import data_grid, detector_grid
 from holopy.core.tests.common import get_example_data, assert_obj_close
 
@@ -36,7 +37,29 @@ def test_FoundLocation():
     assert_allclose(location, gold_location, atol=0.01)
 
 
+@attr("medium")
+def test_center_weights():
+    holo = get_example_data('image0001')
+    weights = center_weights(holo, scale=10, threshold=.25)
+    assert weights.shape == holo.shape
+    distance = np.hypot(*(gold_location - [48, 60]))
+    assert_allclose(weights.values[0, 48, 60], 1 / (1 + (distance / 10)**2),
+                    rtol=1e-3)
+    assert np.unravel_index(np.argmax(weights.values), holo.shape) == (
+        0, 49, 50)
+
+
 #Test img_proc
+@attr("fast")
+def test_local_contrast():
+    image = data_grid(np.ones((10, 10)), 1)
+    assert_allclose(local_contrast(image), 0, atol=1e-7)
+    image.values[:] = np.indices(image.shape).sum(axis=0) % 2
+    contrast = local_contrast(image, size=3)
+    assert contrast.dims == image.dims
+    assert_allclose(contrast.values[0, 1:-1, 1:-1], np.sqrt(20) / 9)
+
+
 @attr("fast")
 def test_subimage():
     i = detector_grid(shape=(10, 10), spacing=1)
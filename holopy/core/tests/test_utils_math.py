@@ -17,6 +17,7 @@
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import pickle
 import shutil
 import unittest
 import tempfile
@@ -36,7 +37,7 @@ except ModuleNotFoundError:
 
 from holopy.core.utils import (
     ensure_array, ensure_listlike, ensure_scalar, mkdir_p, dict_without,
-    updated, repeat_sing_dims, choose_pool)
+    updated, repeat_sing_dims, choose_pool, WorkerPool, NonePool, broadcast)
 from holopy.core.math import (
     rotate_points, rotation_matrix, transform_cartesian_to_spherical,
     transform_spherical_to_cartesian, transform_cartesian_to_cylindrical,
@@ -55,6 +56,29 @@ class DummyPool():
         return None
 
 
+class SumWithData(object):
+    def __init__(self, size):
+        self.values = np.arange(size, dtype=float)
+
+    def __call__(self, x):
+        return x + self.values.sum()
+
+
+def get_worker_preload(index):
+    from holopy.core.utils import _WORKER_STATE
+    return _WORKER_STATE['preload']
+
+
+class UsesPreload(object):
+    def __init__(self, preload):
+        self.preload = preload
+
+    def __call__(self, x):
+        from holopy.core.utils import _WORKER_STATE
+        return x + self.preload.values.sum(), (
+            self.preload is _WORKER_STATE['preload'])
+
+
 class TestCoordinateTransformations(unittest.TestCase):
     @attr("fast")
     def test_transform_cartesian_to_spherical_returns_correct_shape(self):
@@ -429,3 +453,47 @@ class TestChoosePool(unittest.TestCase):
         auto_pool = choose_pool('auto')
         self.assertTrue(isinstance(auto_pool, (pool.BasePool, mp.pool.Pool)))
 
+
+class TestWorkerPool(unittest.TestCase):
+    @attr("fast")
+    def test_preload_reaches_every_worker(self):
+        with WorkerPool(2, preload={'model': 'preloaded'}) as worker_pool:
+            self.assertTrue(choose_pool(worker_pool) is worker_pool)
+            preloads = worker_pool.map(get_worker_preload, range(8))
+        self.assertEqual(preloads, [{'model': 'preloaded'}] * 8)
+
+    @attr("fast")
+    def test_defaults_to_all_cores(self):
+        with WorkerPool() as worker_pool:
+            self.assertEqual(worker_pool._processes, os.cpu_count())
+
+
+class TestBroadcast(unittest.TestCase):
+    @attr("fast")
+    def test_tasks_carry_only_a_handle(self):
+        function = SumWithData(10**5)
+        self.assertGreater(len(pickle.dumps(function)), 10**5)
+        with WorkerPool(2) as worker_pool:
+            with broadcast(function, worker_pool) as shared:
+                self.assertLess(len(pickle.dumps(shared)), 1000)
+                results = worker_pool.map(shared, range(6))
+                path = shared.path
+                self.assertTrue(os.path.exists(path))
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(results, [function(x) for x in range(6)])
+
+    @attr("fast")
+    def test_preload_is_not_pickled_again(self):
+        preload = SumWithData(10**5)
+        function = UsesPreload(preload)
+        with WorkerPool(2, preload=preload) as worker_pool:
+            with broadcast(function, worker_pool) as shared:
+                self.assertLess(os.path.getsize(shared.path), 1000)
+                results = worker_pool.map(shared, range(6))
+        self.assertEqual(results, [(preload(x), True) for x in range(6)])
+
+    @attr("fast")
+    def test_serial_pool_gets_function_unchanged(self):
+        function = SumWithData(10)
+        with broadcast(function, NonePool()) as shared:
+            self.assertTrue(shared is function)
@@ -27,7 +27,13 @@ import sys
 import shutil
 import errno
 from copy import copy
+from collections import OrderedDict
+from contextlib import contextmanager
 import itertools
+import multiprocessing.pool
+import mmap
+import pickle
+import tempfile
 
 import numpy as np
 import xarray as xr
@@ -168,6 +174,10 @@ class LnpostWrapper(HoloPyObject):
     only takes parameter values as an argument for passing into optimizers.
     However, individual functions can't be pickled to distribute hologram
     calculations with python multiprocessing. This class solves both issues.
+
+    Unless new pixels are drawn for every evaluation, the calculation goes
+    through a plan compiled once from the model and data (see
+    Model.compile_plan).
     '''
     def __init__(self, model, data, new_pixels=None, minus=False):
         self.parameters = model._parameters
@@ -175,11 +185,25 @@ class LnpostWrapper(HoloPyObject):
         self.pixels = new_pixels
         self.func = model.lnposterior
         self.prefactor = -1 if minus else 1
+        if new_pixels is None and hasattr(model, 'compile_plan'):
+            self.plan = model.compile_plan(data)
+        else:
+            self.plan = None
 
     def evaluate(self, par_vals):
+        if self.plan is not None:
+            return self.prefactor * self.plan.lnposterior(par_vals)
         pars_dict = {par.name:val for par, val in zip(self.parameters, par_vals)}
         return self.prefactor * self.func(pars_dict, self.data, self.pixels)
 
+    def evaluate_many(self, par_vals):
+        """
+        Evaluate a batch of parameter sets, one per row of par_vals
+        """
+        if self.plan is not None:
+            return self.prefactor * self.plan.lnposterior_many(par_vals)
+        return np.array([self.evaluate(values) for values in par_vals])
+
 
 def choose_pool(parallel):
     """
@@ -223,6 +247,149 @@ def choose_pool(parallel):
                         "object with 'map' method.")
     return pool
 
+
+_WORKER_STATE = {}
+
+
+def _initialize_worker(preload):
+    # Import the scattering theories, and with them the compiled
+    # extensions, once when the worker starts rather than with its first
+    # task. preload (typically a Model) is unpickled here for the same
+    # reason and kept for the life of the worker.
+    import holopy.scattering.theory
+    _WORKER_STATE['preload'] = preload
+
+
+class WorkerPool(multiprocessing.pool.Pool):
+    """
+    Multiprocessing pool that stays open across inference calculations.
+
+    Pass it as the parallel argument of any strategy. Strategies never
+    close a pool they were given, so one WorkerPool can serve every stage
+    of a TemperedStrategy and repeated fits or samples of a whole batch of
+    holograms, without starting new processes. Workers import holopy's
+    scattering theories, and unpickle preload if it is given, when they
+    start. Functions broadcast to the pool then refer to preload rather
+    than pickling it again (see broadcast). Used as a context manager, the
+    pool is closed and joined on exit.
+
+    Parameters
+    ----------
+    processes : int, optional
+        Number of worker processes. Defaults to the number of cpus.
+    preload : object, optional
+        Picklable object, usually the Model to be fit, to load into every
+        worker ahead of the first task.
+    """
+    def __init__(self, processes=None, preload=None):
+        if processes is None:
+            processes = os.cpu_count()
+        self.preload = preload
+        super().__init__(processes, initializer=_initialize_worker,
+                         initargs=(preload,))
+
+    def __exit__(self, *args):
+        self.close()
+        self.join()
+
+
+_SHARED_FUNCTIONS = OrderedDict()
+_SHARED_CACHE_SIZE = 4
+
+
+class SharedFunction(object):
+    """
+    Handle to a function pickled once into a memory-mapped file.
+
+    Sending a function such as LnpostWrapper.evaluate to a multiprocessing
+    pool pickles the model and the data along with every batch of tasks.
+    A SharedFunction pickles to no more than the path of its file, so
+    tasks carry only their arguments. Each worker maps the file and
+    unpickles the function the first time it is called, and keeps it for
+    later tasks. If preload is given, it is left out of the file, and
+    workers use the object their WorkerPool preloaded in its place.
+
+    The process that made the handle owns the file and must close it
+    (see broadcast).
+    """
+    def __init__(self, function, preload=None):
+        descriptor, self.path = tempfile.mkstemp(prefix='holopy-',
+                                                 suffix='.pickle')
+        with os.fdopen(descriptor, 'wb') as f:
+            _PreloadPickler(f, preload).dump(function)
+        self._function = function
+        self._owner = True
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._function = None
+        self._owner = False
+
+    def __call__(self, *args, **kwargs):
+        if self._function is None:
+            self._function = _load_shared_function(self.path)
+        return self._function(*args, **kwargs)
+
+    def close(self):
+        if self._owner and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _load_shared_function(path):
+    if path not in _SHARED_FUNCTIONS:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                _SHARED_FUNCTIONS[path] = _PreloadUnpickler(mapped).load()
+        if len(_SHARED_FUNCTIONS) > _SHARED_CACHE_SIZE:
+            _SHARED_FUNCTIONS.popitem(last=False)
+    return _SHARED_FUNCTIONS[path]
+
+
+class _PreloadPickler(pickle.Pickler):
+    # pickles preload as a reference to the object a worker preloaded
+    def __init__(self, file, preload):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.preload = preload
+
+    def persistent_id(self, obj):
+        if self.preload is not None and obj is self.preload:
+            return 'preload'
+        return None
+
+
+class _PreloadUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        if pid != 'preload':
+            raise pickle.UnpicklingError("Unknown reference {}".format(pid))
+        return _WORKER_STATE['preload']
+
+
+@contextmanager
+def broadcast(function, pool):
+    """
+    Context in which function can be mapped over pool without being
+    pickled again for each batch of tasks.
+
+    For multiprocessing pools (including WorkerPool and schwimmbad's
+    MultiPool) this yields a SharedFunction, whose file is removed when
+    the context exits. The preload of a WorkerPool, such as the model
+    being fit, is not pickled with function. Other pools, whose workers
+    may not share a file system with this process, get function
+    unchanged.
+    """
+    if not isinstance(pool, multiprocessing.pool.Pool):
+        yield function
+        return
+    shared = SharedFunction(function, getattr(pool, 'preload', None))
+    try:
+        yield shared
+    finally:
+        shared.close()
+
+
 class NonePool():
     def map(self, function, arguments):
         return map(function, arguments)
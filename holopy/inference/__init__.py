@@ -22,6 +22,12 @@ from holopy.inference.model import (AlphaModel, ExactModel, LimitOverlaps)
 from holopy.inference.interface import (
     fit, sample, available_fit_strategies, available_sampling_strategies)
 from holopy.inference.emcee import EmceeStrategy, TemperedStrategy
+from holopy.inference.tempering import ParallelTemperingStrategy
+from holopy.inference.laplace import LaplaceStrategy
 from holopy.inference.nmpfit import NmpfitStrategy
 from holopy.inference.cmaes import CmaStrategy
 from holopy.inference.scipyfit import LeastSquaresScipyStrategy
+from holopy.inference.pyramid import PyramidStrategy
+from holopy.inference.surrogate import SurrogateStrategy
+from holopy.inference.tracking import TrackingStrategy
+from holopy.core.utils import WorkerPool
@@ -26,6 +26,7 @@ import sys
 import tempfile
 import shutil
 import warnings
+import queue
 
 import numpy as np
 import xarray as xr
@@ -37,7 +38,7 @@ except ModuleNotFoundError:
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import make_subset_data
-from holopy.core.utils import choose_pool, LnpostWrapper
+from holopy.core.utils import choose_pool, broadcast, LnpostWrapper
 from holopy.core.errors import DependencyMissing
 from holopy.inference import prior
 from holopy.inference.result import FitResult, UncertainValue
@@ -67,11 +68,21 @@ class CmaStrategy(HoloPyObject):
     parallel: optional
         number of threads to use or pool object or one of {None, 'all', 'mpi'}.
         Default tries 'mpi' then 'all'.
+    asynchronous: Boolean, optional
+        If true, candidates are evaluated as independent pool tasks and each
+        generation is told to cma as soon as popsize of them have finite
+        values, rather than after a blocking map over the population.
+        Results then depend on the order in which tasks finish.
+    oversample: int, optional
+        Number of extra candidates submitted with each generation in
+        asynchronous mode, so that failed evaluations are replaced without
+        waiting for a new candidate. Extras are only submitted to workers
+        that would otherwise be idle.
     """
     def __init__(self, npixels=None, popsize=None, resample_pixels=True,
                  parent_fraction=0.25, weight_function=None,
                  walker_initial_pos=None, tols={}, seed=None,
-                 parallel='auto'):
+                 parallel='auto', asynchronous=False, oversample=0):
         self.npixels = npixels
         self.popsize = popsize
         if resample_pixels:
@@ -88,6 +99,8 @@ class CmaStrategy(HoloPyObject):
         self.tols.update(tols)
         self.seed = seed
         self.parallel = parallel
+        self.asynchronous = asynchronous
+        self.oversample = oversample
 
     def fit(self, model, data):
         parameters = model._parameters
@@ -105,7 +118,8 @@ class CmaStrategy(HoloPyObject):
         obj_func = LnpostWrapper(model, data, self.new_pixels, True)
         sampler = run_cma(obj_func.evaluate, parameters,
                           self.walker_initial_pos, self.weights, self.tols,
-                          self.seed, self.parallel)
+                          self.seed, self.parallel, self.asynchronous,
+                          self.oversample)
         xrecent = sampler.logger.data['xrecent']
         samples = xr.DataArray(
             [xrecent[:, 5:]], dims=['walker', 'chain', 'parameter'],
@@ -124,7 +138,8 @@ class CmaStrategy(HoloPyObject):
 
 
 def run_cma(obj_func, parameters, initial_population, weight_function,
-            tols={}, seed=None, parallel='auto'):
+            tols={}, seed=None, parallel='auto', asynchronous=False,
+            oversample=0):
     """
     instantiate and run a CMAEvolutionStrategy object
 
@@ -145,6 +160,12 @@ def run_cma(obj_func, parameters, initial_population, weight_function,
     parallel: optional
         number of threads to use or pool object or one of {None, 'all', 'mpi'}.
         Default tries 'mpi' then 'all'.
+    asynchronous: Boolean, optional
+        evaluate candidates as they are submitted, without a barrier per
+        generation (see CmaStrategy). Needs a pool with apply_async;
+        other pools are used synchronously.
+    oversample: int, optional
+        extra candidates to submit with each generation when asynchronous
     """
     if _CMA_MISSING:
         raise DependencyMissing('cma', "Install it with \'pip install cma\'.")
@@ -168,17 +189,33 @@ def run_cma(obj_func, parameters, initial_population, weight_function,
         solutions = np.zeros((popsize, len(parameters)))
         func_vals = np.zeros(popsize)
         pool = choose_pool(parallel)
-        while not cma_strategy.stop():
-            invalid = np.ones(popsize, dtype=bool)
-            inf_replace_counter = 0
-            while invalid.any() and inf_replace_counter < 10:
-                attempts = cma_strategy.ask(np.sum(invalid))
-                solutions[invalid, :] = attempts
-                func_vals[invalid] = list(pool.map(obj_func, attempts))
-                invalid = ~np.isfinite(func_vals)
-                inf_replace_counter += 1  # catches case where all are inf
-            cma_strategy.tell(solutions, func_vals)
-            cma_strategy.logger.add()
+        asynchronous = asynchronous and hasattr(pool, 'apply_async')
+        pending = []
+        with broadcast(obj_func, pool) as obj_func:
+            try:
+                while not cma_strategy.stop():
+                    if asynchronous:
+                        solutions, func_vals = evaluate_generation_async(
+                            cma_strategy, obj_func, pool, popsize,
+                            oversample, pending=pending)
+                        cma_strategy.tell(solutions, func_vals)
+                        cma_strategy.logger.add()
+                        continue
+                    invalid = np.ones(popsize, dtype=bool)
+                    inf_replace_counter = 0
+                    while invalid.any() and inf_replace_counter < 10:
+                        attempts = cma_strategy.ask(np.sum(invalid))
+                        solutions[invalid, :] = attempts
+                        func_vals[invalid] = list(pool.map(obj_func, attempts))
+                        invalid = ~np.isfinite(func_vals)
+                        # catches case where all are inf
+                        inf_replace_counter += 1
+                    cma_strategy.tell(solutions, func_vals)
+                    cma_strategy.logger.add()
+            finally:
+                # stragglers still need the broadcast function
+                for result in pending:
+                    result.wait()
         cma_strategy.logger.load()
 
     if pool is not parallel:
@@ -186,3 +223,70 @@ def run_cma(obj_func, parameters, initial_population, weight_function,
         pool.close()
     return cma_strategy
 
+
+def evaluate_generation_async(cma_strategy, obj_func, pool, popsize,
+                              oversample=0, max_evaluations=None,
+                              pending=None):
+    """
+    Evaluate one generation of cma_strategy with independent pool tasks.
+
+    popsize candidates, plus as many of the oversample extras as there
+    are free workers for, are submitted at once. Whenever one of them
+    returns a non-finite value, a replacement is asked for and submitted
+    straight away, until popsize finite values have arrived or
+    max_evaluations (default 10 * popsize) candidates have been tried, in
+    which case the population is filled with the failed candidates, as
+    the synchronous loop does.
+
+    Tasks still running when the population is complete are ignored, but
+    their AsyncResults are kept in pending, a list shared between
+    generations: workers busy with them are not counted as free, and the
+    caller must wait for them before obj_func goes away.
+
+    Returns
+    -------
+    solutions, func_vals : arrays of popsize candidates and their values
+    """
+    if max_evaluations is None:
+        max_evaluations = 10 * popsize
+    if pending is None:
+        pending = []
+    pending[:] = [result for result in pending if not result.ready()]
+    workers = getattr(pool, '_processes', None)
+    if workers is not None:
+        oversample = min(oversample,
+                         max(workers - len(pending) - popsize, 0))
+    finished = queue.Queue()
+    submitted = []
+
+    def submit(n):
+        for candidate in cma_strategy.ask(n):
+            index = len(submitted)
+            submitted.append(candidate)
+            pending.append(pool.apply_async(
+                obj_func, (candidate,),
+                callback=lambda value, i=index: finished.put((i, value)),
+                error_callback=lambda error, i=index: finished.put(
+                    (i, error))))
+
+    submit(popsize + oversample)
+    outstanding = len(submitted)
+    valid, invalid = [], []
+    while len(valid) < popsize and outstanding > 0:
+        index, value = finished.get()
+        if isinstance(value, BaseException):
+            raise value
+        outstanding -= 1
+        if np.isfinite(value):
+            valid.append((index, value))
+        else:
+            invalid.append((index, value))
+            shortfall = popsize - len(valid) - outstanding
+            if shortfall > 0 and len(submitted) < max_evaluations:
+                submit(1)
+                outstanding += 1
+    pending[:] = [result for result in pending if not result.ready()]
+    evaluated = (valid + invalid)[:popsize]
+    solutions = np.array([submitted[index] for index, value in evaluated])
+    func_vals = np.array([value for index, value in evaluated])
+    return solutions, func_vals
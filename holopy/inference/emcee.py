@@ -33,7 +33,7 @@ except ModuleNotFoundError:
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import make_subset_data
-from holopy.core.utils import choose_pool, LnpostWrapper
+from holopy.core.utils import choose_pool, broadcast, LnpostWrapper
 from holopy.core.errors import DependencyMissing
 from holopy.inference.result import SamplingResult, TemperedSamplingResult
 from holopy.inference import prior
@@ -48,14 +48,46 @@ def sample_one_sigma_gaussian(result):
 
 
 class EmceeStrategy(HoloPyObject):
+    """
+    Sample a posterior with emcee's affine-invariant ensemble sampler.
+
+    With vectorize=True the walkers of each ensemble step are evaluated
+    as one batch (see ForwardPlan.lnposterior_many) and the parallel pool
+    gets one chunk of walkers per worker instead of single walkers.
+
+    Given a chain_file, every stored step is written to that HDF5 file
+    (group chain_name) as the sampler runs, rather than only being kept
+    in memory. Only every thin-th of the nsamples steps is stored. When
+    the file already holds a chain and resume is True, sampling carries
+    on from its last walker positions and random state until nsamples
+    steps have been run in total.
+
+    With tau_factor set, nsamples becomes an upper limit: every
+    check_every stored steps the integrated autocorrelation time tau of
+    each parameter is estimated, and sampling stops once the chain is
+    longer than tau_factor * tau and tau has changed by less than a
+    fraction tau_rtol since the previous check. The diagnostics are
+    recorded as result.convergence.
+    """
     def __init__(self, nwalkers=100, nsamples=1000, npixels=None,
-                 walker_initial_pos=None, parallel='auto', seed=None):
+                 walker_initial_pos=None, parallel='auto', seed=None,
+                 vectorize=False, chain_file=None, chain_name='mcmc',
+                 thin=1, resume=True, tau_factor=None, tau_rtol=0.01,
+                 check_every=100):
         self.nwalkers = nwalkers
         self.nsamples = nsamples
         self.npixels = npixels
         self.walker_initial_pos = walker_initial_pos
         self.parallel = parallel
         self.seed = seed
+        self.vectorize = vectorize
+        self.chain_file = chain_file
+        self.chain_name = chain_name
+        self.thin = thin
+        self.resume = resume
+        self.tau_factor = tau_factor
+        self.tau_rtol = tau_rtol
+        self.check_every = check_every
 
     def sample(self, model, data, nsamples=None, walker_initial_pos=None):
         if nsamples is not None:
@@ -79,13 +111,20 @@ class EmceeStrategy(HoloPyObject):
         sampler = sample_emcee(model=model, data=data, nwalkers=self.nwalkers,
                                walker_initial_pos=self.walker_initial_pos,
                                nsamples=self.nsamples, parallel=self.parallel,
-                               seed=self.seed)
+                               seed=self.seed, vectorize=self.vectorize,
+                               chain_file=self.chain_file,
+                               chain_name=self.chain_name, thin=self.thin,
+                               resume=self.resume, tau_factor=self.tau_factor,
+                               tau_rtol=self.tau_rtol,
+                               check_every=self.check_every)
 
         samples = emcee_samples_DataArray(sampler, model._parameters)
         lnprobs = emcee_lnprobs_DataArray(sampler)
 
         d_time = time.time() - time_start
         kwargs = {'lnprobs': lnprobs, 'samples': samples}
+        if self.tau_factor is not None:
+            kwargs['convergence'] = sampler.convergence
         return SamplingResult(data, model, self, d_time, kwargs)
 
 
@@ -93,10 +132,15 @@ class TemperedStrategy(EmceeStrategy):
     def __init__(self, next_initial_dist=sample_one_sigma_gaussian,
                  nwalkers=100, nsamples=1000, min_pixels=None, npixels=1000,
                  walker_initial_pos=None, parallel='auto', stages=3,
-                 stage_len=30, seed=None):
+                 stage_len=30, seed=None, vectorize=False, tau_factor=None,
+                 tau_rtol=0.01, check_every=100):
         self.nwalkers = nwalkers
         self.parallel = parallel
         self.seed = seed
+        self.vectorize = vectorize
+        self.tau_factor = tau_factor
+        self.tau_rtol = tau_rtol
+        self.check_every = check_every
         self.walker_initial_pos = walker_initial_pos
         self.next_initial_dist = next_initial_dist
         self.stage_strategies = []
@@ -114,7 +158,11 @@ class TemperedStrategy(EmceeStrategy):
                           nsamples=nsamples,
                           npixels=int(round(npixels)),
                           parallel=self.parallel,
-                          seed=self.seed))
+                          seed=self.seed,
+                          vectorize=self.vectorize,
+                          tau_factor=self.tau_factor,
+                          tau_rtol=self.tau_rtol,
+                          check_every=self.check_every))
         if self.seed is not None:
             self.seed += 1
 
@@ -122,11 +170,20 @@ class TemperedStrategy(EmceeStrategy):
         start_time = time.time()
         stage_results = []
         guess = self.walker_initial_pos
-        for i, strategy in enumerate(self.stage_strategies):
-            strategy.walker_initial_pos = guess
-            result = strategy.sample(model, data)
-            stage_results.append(result)
-            guess = self.next_initial_dist(result)
+        # all stages share one pool rather than each starting its own
+        pool = choose_pool(self.parallel)
+        try:
+            for i, strategy in enumerate(self.stage_strategies):
+                strategy.walker_initial_pos = guess
+                strategy.parallel = pool
+                result = strategy.sample(model, data)
+                stage_results.append(result)
+                guess = self.next_initial_dist(result)
+        finally:
+            for strategy in self.stage_strategies:
+                strategy.parallel = self.parallel
+            if pool is not self.parallel:
+                pool.close()
         d_time = time.time()-start_time
         return TemperedSamplingResult(result, stage_results, self, d_time)
 
@@ -155,22 +212,141 @@ def emcee_lnprobs_DataArray(sampler):
                         attrs={"acceptance_fraction": acceptance_fraction})
 
 
+class EnsembleLnpost(HoloPyObject):
+    """
+    Log-posterior of a whole ensemble of walkers for emcee's vectorize
+    mode. The walkers are split into one chunk per worker of pool and
+    each chunk is evaluated as a batch by evaluate_many (typically
+    LnpostWrapper.evaluate_many).
+    """
+    def __init__(self, evaluate_many, pool):
+        self.evaluate_many = evaluate_many
+        self.pool = pool
+
+    @property
+    def nchunks(self):
+        for attr in ['_processes', 'size']:
+            size = getattr(self.pool, attr, None)
+            if isinstance(size, int) and size > 0:
+                return size
+        return 1
+
+    def __call__(self, coords):
+        chunks = [chunk for chunk in np.array_split(coords, self.nchunks)
+                  if len(chunk) > 0]
+        return np.concatenate(
+            list(self.pool.map(self.evaluate_many, chunks)))
+
+
+def open_chain_file(chain_file, nwalkers, ndim, chain_name='mcmc',
+                    resume=True):
+    """
+    emcee backend storing a chain in group chain_name of an HDF5 file.
+
+    A chain already in the file is kept if resume is True, and cleared
+    otherwise.
+    """
+    if _EMCEE_MISSING:
+        raise DependencyMissing(
+            'emcee', "Install it with \'conda install -c conda-forge emcee\'.")
+    try:
+        backend = emcee.backends.HDFBackend(chain_file, name=chain_name)
+    except ImportError:
+        raise DependencyMissing(
+            'h5py', "Install it with \'conda install h5py\' to store "
+            "chains in a file.")
+    if not (resume and backend.initialized):
+        backend.reset(nwalkers, ndim)
+    return backend
+
+
+def run_until_converged(sampler, initial_pos, nsteps, thin, parameters,
+                        tau_factor=50, tau_rtol=0.01, check_every=100):
+    """
+    Run sampler for at most nsteps, stopping early once the chain is
+    converged according to its integrated autocorrelation time.
+
+    Every check_every stored steps, tau is estimated for each parameter.
+    The chain counts as converged once it is longer than tau_factor * tau
+    and no tau has changed by more than a fraction tau_rtol since the
+    last check.
+
+    Returns
+    -------
+    convergence : dict
+        autocorrelation_time (in steps, per parameter name),
+        acceptance_fraction, converged and the number of steps run.
+    """
+    old_tau = np.inf
+    converged = False
+    for state in sampler.sample(initial_pos, iterations=nsteps,
+                                thin_by=thin):
+        if sampler.iteration % check_every:
+            continue
+        tau = sampler.get_autocorr_time(tol=0)
+        converged = (np.all(sampler.iteration > tau_factor * tau) and
+                     np.all(np.abs(old_tau - tau) < tau_rtol * tau))
+        if converged:
+            break
+        old_tau = tau
+    tau = sampler.get_autocorr_time(tol=0) * thin
+    return {'autocorrelation_time': {par.name: float(t)
+                                     for par, t in zip(parameters, tau)},
+            'acceptance_fraction': float(sampler.acceptance_fraction.mean()),
+            'converged': bool(converged),
+            'steps': int(sampler.iteration * thin)}
+
+
 def sample_emcee(model, data, nwalkers, nsamples, walker_initial_pos,
-                 parallel='auto', seed=None):
+                 parallel='auto', seed=None, vectorize=False, chain_file=None,
+                 chain_name='mcmc', thin=1, resume=True, tau_factor=None,
+                 tau_rtol=0.01, check_every=100):
     if _EMCEE_MISSING:
         raise DependencyMissing(
             'emcee', "Install it with \'conda install -c conda-forge emcee\'.")
 
+    ndim = len(model._parameters)
+    backend_kwargs = {}
+    stored_steps = 0
+    if chain_file is not None:
+        backend = open_chain_file(chain_file, nwalkers, ndim, chain_name,
+                                  resume)
+        backend_kwargs['backend'] = backend
+        stored_steps = backend.iteration
+
     obj_func = LnpostWrapper(model, data)
     pool = choose_pool(parallel)
-    sampler = emcee.EnsembleSampler(nwalkers, len(model._parameters),
-                                    obj_func.evaluate, pool=pool)
-    if seed is not None:
-        np.random.seed(seed)
-        seed_state = np.random.mtrand.RandomState(seed).get_state()
-        sampler.random_state = seed_state
-
-    sampler.run_mcmc(walker_initial_pos, nsamples)
+    evaluate = obj_func.evaluate_many if vectorize else obj_func.evaluate
+    with broadcast(evaluate, pool) as evaluate:
+        if vectorize:
+            sampler = emcee.EnsembleSampler(nwalkers, ndim,
+                                            EnsembleLnpost(evaluate, pool),
+                                            vectorize=True, **backend_kwargs)
+        else:
+            sampler = emcee.EnsembleSampler(nwalkers, ndim, evaluate,
+                                            pool=pool, **backend_kwargs)
+        if stored_steps > 0:
+            # carry on from the stored walkers; the sampler has restored the
+            # random state saved with them
+            walker_initial_pos = None
+        elif seed is not None:
+            np.random.seed(seed)
+            seed_state = np.random.mtrand.RandomState(seed).get_state()
+            sampler.random_state = seed_state
+
+        nsteps = nsamples // thin - stored_steps
+        if tau_factor is not None:
+            # convergence diagnostics are left on the sampler for the strategy
+            if walker_initial_pos is None:
+                walker_initial_pos = sampler.get_last_sample()
+            sampler.convergence = run_until_converged(
+                sampler, walker_initial_pos, max(nsteps, 0), thin,
+                model._parameters, tau_factor, tau_rtol, check_every)
+        elif nsteps > 0:
+            if thin == 1:
+                sampler.run_mcmc(walker_initial_pos, nsteps)
+            else:
+                sampler.run_mcmc(walker_initial_pos, nsteps, thin_by=thin)
     if pool is not parallel:
         pool.close()
 
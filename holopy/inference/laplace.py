@@ -0,0 +1,250 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Estimate uncertainties from the curvature of the posterior at its maximum
+"""
+import time
+
+import numpy as np
+import xarray as xr
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import make_subset_data
+from holopy.core.utils import choose_pool, broadcast
+from holopy.inference.result import SamplingResult, UncertainValue
+
+
+class LaplaceStrategy(HoloPyObject):
+    """
+    Approximate the posterior by a Gaussian about its maximum.
+
+    The maximum a posteriori (MAP) parameters are found with a fit
+    strategy, and the covariance of the Gaussian is the inverse of minus
+    the Hessian of the log-posterior there. For single spheres calculated
+    with Mie theory the likelihood part of the Hessian comes from the
+    analytic derivatives of the hologram (ForwardPlan.lnlike_hessian);
+    otherwise the whole Hessian is found by central finite differences,
+    with the 2 n^2 + 1 posterior evaluations sent to the parallel pool.
+    Differences are one-sided for parameters within a step of the bounds
+    of their priors, so the Hessian is always that at the MAP.
+
+    The result is a SamplingResult holding nsamples draws from the
+    Gaussian, truncated to where the priors are nonzero, as well as the
+    covariance itself. Its intervals are the MAP and the standard
+    deviations of the Gaussian. A fitted noise_sd is set to the root mean
+    square of the residuals of the best fit, since least squares fit
+    strategies do not find it. This is only a good description of
+    posteriors with a single, well-defined peak, such as fits of a
+    single particle, but takes no more than a fit and a few dozen
+    forward calculations rather than the hundreds of thousands of
+    EmceeStrategy.
+
+    Parameters
+    ----------
+    strategy : fit strategy or string, optional
+        Strategy used to find the MAP, as for Model.fit. Default is the
+        model's default fit strategy.
+    nsamples : int
+        Number of samples drawn from the Gaussian
+    step : float
+        Finite difference step, as a fraction of the scale of each
+        parameter (see Prior.scale)
+    npixels : int, optional
+        Number of pixels in the image to fit. Default fits all.
+    parallel : None, integer, 'all', 'mpi', 'auto', or pool object
+        Pool for the finite difference evaluations (see choose_pool)
+    seed : int, optional
+        Random seed for choosing pixels and drawing samples
+    """
+    def __init__(self, strategy=None, nsamples=1000, step=1e-4,
+                 npixels=None, parallel='auto', seed=None):
+        self.strategy = strategy
+        self.nsamples = nsamples
+        self.step = step
+        self.npixels = npixels
+        self.parallel = parallel
+        self.seed = seed
+
+    def sample(self, model, data):
+        """
+        Sample the Laplace approximation of the posterior of a model
+
+        Parameters
+        ----------
+        model : :class:`~holopy.inference.model.Model` object
+            A model describing the scattering system which leads to your
+            data and the parameters to vary to fit it to the data
+        data : xarray.DataArray
+            The data to fit
+
+        Returns
+        -------
+        result : :class:`SamplingResult`
+            Contains the samples and the MAP parameters with their
+            standard deviations as intervals
+        """
+        time_start = time.time()
+        if self.npixels is not None:
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+        strategy = model.validate_strategy(self.strategy, 'fit')
+        best_fit = strategy.fit(model, data)
+        parameters = model._parameters
+        names = [par.name for par in parameters]
+        values = np.array([best_fit.parameters[name] for name in names])
+
+        plan = model.compile_plan(data)
+        if 'noise_sd' in names:
+            # least squares fits cannot find the noise, so take the one
+            # most likely given the residuals of the fit
+            i = names.index('noise_sd')
+            rms = np.sqrt(((plan.residuals(values) * values[i])**2).sum() /
+                          plan._npixels)
+            values[i] = np.clip(rms, getattr(parameters[i], 'lower_bound', 0),
+                                getattr(parameters[i], 'upper_bound', np.inf))
+        steps = np.array([par.unscale(self.step) for par in parameters])
+        # keep the finite differences within the bounds of the priors
+        lower = [getattr(par, 'lower_bound', -np.inf) for par in parameters]
+        upper = [getattr(par, 'upper_bound', np.inf) for par in parameters]
+        if plan.analytic_jacobian:
+            hessian = (plan.lnlike_hessian(values) +
+                       finite_difference_hessian(plan.lnprior, values, steps,
+                                                 lower_bounds=lower,
+                                                 upper_bounds=upper))
+        else:
+            pool = choose_pool(self.parallel)
+            with broadcast(plan.lnposterior, pool) as lnposterior:
+                hessian = finite_difference_hessian(
+                    lnposterior, values, steps, pool.map, lower, upper)
+            if pool is not self.parallel:
+                pool.close()
+
+        covariance = gaussian_covariance(hessian)
+        samples, lnprobs = self._draw(plan, values, covariance,
+                                      plan.lnposterior(values))
+        errors = np.sqrt(np.diag(covariance))
+        intervals = [UncertainValue(value, error, name=name)
+                     for name, value, error in zip(names, values, errors)]
+        samples = xr.DataArray(samples[:, np.newaxis, :],
+                               dims=['walker', 'chain', 'parameter'],
+                               coords={'parameter': names})
+        lnprobs = xr.DataArray(lnprobs[:, np.newaxis],
+                               dims=['walker', 'chain'])
+        covariance = xr.DataArray(covariance, dims=['parameter', 'parameter_'],
+                                  coords={'parameter': names,
+                                          'parameter_': names})
+        d_time = time.time() - time_start
+        kwargs = {'intervals': intervals, 'samples': samples,
+                  'lnprobs': lnprobs, 'covariance': covariance}
+        return SamplingResult(data, model, self, d_time, kwargs)
+
+    def _draw(self, plan, values, covariance, max_lnprob):
+        # the first sample is the MAP itself; lnprobs are those of the
+        # Gaussian approximation
+        random = np.random.RandomState(self.seed)
+        samples = [values[np.newaxis]]
+        drawn = 1
+        for attempt in range(100):
+            if drawn >= self.nsamples:
+                break
+            new = random.multivariate_normal(values, covariance,
+                                             self.nsamples - drawn)
+            new = new[np.isfinite([plan.lnprior(x) for x in new])]
+            samples.append(new)
+            drawn += len(new)
+        samples = np.concatenate(samples)
+        deviations = samples - values
+        lnprobs = max_lnprob - 0.5 * np.einsum(
+            'ij,jk,ik->i', deviations, np.linalg.inv(covariance), deviations)
+        return samples, lnprobs
+
+
+def finite_difference_hessian(function, values, steps, map=map,
+                              lower_bounds=None, upper_bounds=None):
+    """
+    Second derivatives of function at values by finite differences, with
+    steps in each parameter. The evaluations (2 n^2 + 1 of them for
+    central differences) are made with map, so they can be made in
+    parallel.
+
+    Parameters within a step of their lower_bounds or upper_bounds, which
+    function must not be evaluated beyond, are differentiated by
+    one-sided differences of the same order instead.
+    """
+    n = len(values)
+    if lower_bounds is None:
+        lower_bounds = np.full(n, -np.inf)
+    if upper_bounds is None:
+        upper_bounds = np.full(n, np.inf)
+    stencils = [_stencils(value, step, lower, upper) for value, step, lower,
+                upper in zip(values, steps, lower_bounds, upper_bounds)]
+
+    def shift(offsets):
+        # offsets, in steps, of a point from values, as a hashable key
+        key = np.zeros(n, dtype=int)
+        for i, offset in offsets:
+            key[i] = offset
+        return tuple(key)
+
+    # terms[i, j] lists the (point, weight) pairs for the (i, j) derivative
+    terms = {}
+    for i in range(n):
+        terms[i, i] = [(shift([(i, offset)]), weight)
+                       for offset, weight in stencils[i][1]]
+        for j in range(i):
+            terms[i, j] = [(shift([(i, offset_i), (j, offset_j)]),
+                            weight_i * weight_j)
+                           for offset_i, weight_i in stencils[i][0]
+                           for offset_j, weight_j in stencils[j][0]]
+    keys = list(dict.fromkeys(
+        [shift([])] + [key for term in terms.values() for key, _ in term]))
+    points = [values + np.array(key) * steps for key in keys]
+    f = dict(zip(keys, np.array(list(map(function, points)), dtype=float)))
+    hessian = np.empty((n, n))
+    for (i, j), term in terms.items():
+        hessian[i, j] = hessian[j, i] = sum(
+            weight * f[key] for key, weight in term) / (steps[i] * steps[j])
+    return hessian
+
+
+def _stencils(value, step, lower, upper):
+    # (offset, weight) pairs for the first and second derivatives, accurate
+    # to second order, using central differences where they fit within
+    # the bounds
+    if value - step >= lower and value + step <= upper:
+        return ([(-1, -0.5), (1, 0.5)], [(-1, 1.), (0, -2.), (1, 1.)])
+    direction = 1 if value + 3 * step <= upper else -1
+    first = [(0, -1.5), (1, 2.), (2, -0.5)]
+    second = [(0, 2.), (1, -5.), (2, 4.), (3, -1.)]
+    return ([(direction * o, direction * w) for o, w in first],
+            [(direction * o, w) for o, w in second])
+
+
+def gaussian_covariance(hessian):
+    """
+    Covariance of the Gaussian whose log-density has the given Hessian
+    """
+    if not np.isfinite(hessian).all():
+        raise ValueError("The posterior is not finite around its maximum, "
+                         "so it cannot be approximated by a Gaussian.")
+    try:
+        np.linalg.cholesky(-hessian)
+    except np.linalg.LinAlgError:
+        raise ValueError("The posterior is not peaked at the best fit in "
+                         "every parameter, so it cannot be approximated by "
+                         "a Gaussian. Try sampling it with EmceeStrategy.")
+    return np.linalg.inv(-hessian)
@@ -21,28 +21,45 @@ from copy import copy
 import numpy as np
 import xarray as xr
 
-from holopy.core.metadata import dict_to_array, make_subset_data
+from holopy.core.math import find_transformation_function
+from holopy.core.metadata import (dict_to_array, make_subset_data, flat,
+                                  from_flat, illumination)
 from holopy.core.utils import ensure_array, ensure_listlike, ensure_scalar
 from holopy.core.holopy_object import HoloPyObject
 from holopy.scattering.errors import (MultisphereFailure, TmatrixFailure,
-                                InvalidScatterer, MissingParameter)
-from holopy.scattering.interface import calc_holo
-from holopy.scattering.theory import MieLens
-from holopy.scattering.scatterer import (_expand_parameters,
+                                InvalidScatterer, MissingParameter,
+                                TheoryNotCompatibleError)
+from holopy.scattering.interface import (calc_holo, interpret_theory,
+                                         prep_schema)
+from holopy.scattering.theory import Mie, MieLens
+from holopy.scattering.theory.scatteringtheory import get_wavevec_from
+from holopy.scattering.scatterer import (Scatterers, Sphere,
+                                         _expand_parameters,
                                          _interpret_parameters)
-from holopy.inference.prior import Prior, Uniform, generate_guess
+from holopy.inference.prior import (Prior, Uniform, generate_guess,
+                                    recentered)
 from holopy.inference.nmpfit import NmpfitStrategy
 from holopy.inference.scipyfit import LeastSquaresScipyStrategy
 from holopy.inference.cmaes import CmaStrategy
 from holopy.inference.emcee import EmceeStrategy, TemperedStrategy
+from holopy.inference.tempering import ParallelTemperingStrategy
+from holopy.inference.pyramid import PyramidStrategy
+from holopy.inference.surrogate import SurrogateStrategy
+from holopy.inference.laplace import LaplaceStrategy
 
 DEFAULT_STRATEGY = {'fit': 'nmpfit', 'sample': 'emcee'}
+# parameters of a single sphere model with analytic derivatives
+DIFFERENTIABLE_PARAMETERS = ['center.0', 'center.1', 'center.2', 'r', 'n',
+                             'n.real', 'n.imag', 'alpha', 'noise_sd']
 ALL_STRATEGIES = {'fit': {'nmpfit': NmpfitStrategy,
                           'scipy lsq': LeastSquaresScipyStrategy,
-                          'cma': CmaStrategy},
+                          'cma': CmaStrategy,
+                          'pyramid': PyramidStrategy,
+                          'surrogate': SurrogateStrategy},
                   'sample': {'emcee': EmceeStrategy,
                             'subset tempering': TemperedStrategy,
-                            'parallel tempering': NotImplemented}}
+                            'parallel tempering': ParallelTemperingStrategy,
+                            'laplace': LaplaceStrategy}}
 
 
 class Model(HoloPyObject):
@@ -108,6 +125,33 @@ class Model(HoloPyObject):
     def generate_guess(self, n=1, scaling=1, seed=None):
         return generate_guess(self._parameters, n, scaling, seed)
 
+    def with_guesses(self, guesses, max_step=None):
+        """
+        Copy of this model with its priors recentered on guesses (see
+        prior.recentered), to warm-start a fit from an earlier one
+
+        Uniform priors are narrowed by max_step; Gaussian priors keep
+        their mean and width and only take the new guess.
+
+        Parameters
+        ----------
+        guesses: dict(string, float)
+            New guess for each parameter
+        max_step: dict(string, float), optional
+            For each named parameter, the largest distance from its guess
+            the new prior allows
+        """
+        max_step = {} if max_step is None else max_step
+        # the priors as they appear in the scatterer and in the model's
+        # own arguments, under the names of self.parameters
+        priors = dict(_expand_parameters(self._dict.items()))
+        priors.update(self.scatterer.parameters)
+        replacements = {
+            id(priors[par.name]): recentered(par, guesses[par.name],
+                                             max_step.get(par.name))
+            for par in self._parameters}
+        return _replace_objects(self, replacements)
+
     def lnprior(self, par_vals):
         """
         Compute the log-prior probability of par_vals
@@ -120,17 +164,23 @@ class Model(HoloPyObject):
         -------
         lnprior: float
         """
+        par_scat = None
         if hasattr(self, 'scatterer'):
             try:
                 par_scat = self.scatterer.from_parameters(par_vals)
             except InvalidScatterer:
                 return -np.inf
 
+        return self._lnprior([par_vals[p.name] for p in self._parameters],
+                             par_scat)
+
+    def _lnprior(self, values, par_scat):
+        # values in the order of self._parameters
         for constraint in self.constraints:
             if not constraint.check(par_scat):
                 return -np.inf
 
-        return sum([p.lnprob(par_vals[p.name]) for p in self._parameters])
+        return sum([p.lnprob(val) for p, val in zip(self._parameters, values)])
 
     def lnposterior(self, par_vals, data, pixels=None):
         """
@@ -176,7 +226,11 @@ class Model(HoloPyObject):
 
     def _residuals(self, pars, data, noise):
         forward_model = self.forward(pars, data)
-        return ((forward_model - data) / noise).values
+        residuals = ((forward_model - data) / noise).values
+        weights = _pixel_weights(data)
+        if weights is not None:
+            residuals = residuals * np.sqrt(weights)
+        return residuals
 
     def lnlike(self, pars, data):
         """
@@ -194,13 +248,106 @@ class Model(HoloPyObject):
         lnlike: float
         """
         noise_sd = self._find_noise(pars, data)
-        N = data.size
+        N = _effective_size(data)
         log_likelihood = ensure_scalar(
             -N/2 * np.log(2 * np.pi) -
             N * np.mean(np.log(ensure_array(noise_sd))) -
             0.5 * (self._residuals(pars, data, noise_sd)**2).sum())
         return log_likelihood
 
+    def jacobian(self, pars, data):
+        """
+        Compute the derivatives of the forward model (the hologram) with
+        respect to each parameter
+
+        Analytic derivatives are available for single spheres calculated
+        with Mie theory, with respect to the sphere's center, radius and
+        index, alpha and noise_sd (see ForwardPlan.analytic_jacobian).
+
+        Parameters
+        -----------
+        pars: dict(string, float)
+            Dictionary containing values for each parameter
+        data: xarray
+            The data to compute the hologram for
+
+        Returns
+        --------
+        jacobian: xarray
+            Derivatives at each point of flat(data) with respect to each
+            parameter, with dimensions of flat(data) and 'parameter'
+        """
+        plan = self.compile_plan(data)
+        values = [pars[par.name] for par in self._parameters]
+        flat_data = flat(data)
+        dim = flat_data.dims[0]
+        return xr.DataArray(
+            plan.forward_jacobian(values), dims=[dim, 'parameter'],
+            coords={dim: flat_data[dim], 'parameter': plan.names})
+
+    def information_map(self, data, pars=None):
+        """
+        Approximate Fisher information about the parameters in each pixel
+        of data, for use as weights in make_subset_data
+
+        Parameters
+        -----------
+        data: xarray
+            The data whose pixels to weight
+        pars: dict(string, float), optional
+            Parameter values at which to calculate the information.
+            Default is the guess of each parameter.
+
+        Returns
+        --------
+        information: xarray
+            Squared derivative of the hologram at each pixel of data
+            with respect to each parameter (other than noise_sd),
+            normalized to sum to 1 over the image and summed over
+            parameters. Derivatives are analytic where ForwardPlan has
+            them, and central finite differences otherwise. Fits to a
+            subset of pixels are most precise when pixels are chosen
+            with probability proportional to the square root of their
+            information, so pass np.sqrt(information) to
+            make_subset_data.
+        """
+        if pars is None:
+            pars = {par.name: par.guess for par in self._parameters}
+        plan = self.compile_plan(data)
+        values = np.array([pars[par.name] for par in self._parameters])
+        if plan.analytic_jacobian:
+            jacobian = plan.forward_jacobian(values)
+        else:
+            steps = np.diag([par.unscale(1e-4) for par in self._parameters])
+            jacobian = np.transpose([
+                plan.residuals(values + step) - plan.residuals(values - step)
+                for step in steps])
+        jacobian = jacobian**2
+        totals = jacobian.sum(axis=0)
+        used = (totals > 0) & (np.array(plan.names) != 'noise_sd')
+        information = (jacobian[:, used] / totals[used]).sum(axis=1)
+        flat_data = flat(data)
+        return from_flat(flat_data.copy(data=information)).transpose(
+            *data.dims)
+
+    def compile_plan(self, data):
+        """
+        Prepare log-probability calculations against one set of data
+
+        Parameters
+        -----------
+        data: xarray
+            The data to compute probabilities against
+
+        Returns
+        --------
+        plan: :class:`ForwardPlan`
+            Computes lnprior, lnlike, lnposterior and residuals from
+            sequences of parameter values, in the order of
+            self._parameters
+        """
+        return ForwardPlan(self, data)
+
     def fit(self, data, strategy=None):
         strategy = self.validate_strategy(strategy, 'fit')
         return strategy.fit(self, data)
@@ -231,6 +378,400 @@ class Model(HoloPyObject):
                 raise ValueError(msg)
 
 
+class ForwardPlan(HoloPyObject):
+    """
+    Log-probabilities of a Model against fixed data, prepared once
+
+    Everything that does not change between evaluations -- the flattened
+    detector coordinates and data, the noise, the optics and the theory
+    -- is resolved when the plan is made, so an evaluation is the
+    scattering calculation plus a little numpy. Models, data or
+    parameters that the plan cannot prepare (subclassed models, multiple
+    illuminations, fitted optics, calc_funcs other than calc_holo) are
+    passed on to the model's own methods, so a plan always gives the same
+    results as the model.
+
+    Parameter values are given as sequences in the order of
+    model._parameters.
+    """
+    def __init__(self, model, data):
+        self.model = model
+        self.data = data
+        self.names = [par.name for par in model._parameters]
+        self._npixels = _effective_size(data)
+        self.compiled = self._compile()
+        self.analytic_jacobian = (self.compiled and
+                                  self._can_differentiate())
+
+    def _is_fixed(self, key):
+        return not any([name == key or name.startswith(key + '.') or
+                        name.startswith(key + ':') for name in self.names])
+
+    def _compile(self):
+        model = self.model
+        if type(model) not in (AlphaModel, ExactModel, PerfectLensModel):
+            return False
+        if isinstance(model, ExactModel) and model.calc_func is not calc_holo:
+            return False
+        optics_keys = ['medium_index', 'illum_wavelen', 'illum_polarization']
+        if not all([self._is_fixed(key) for key in optics_keys]):
+            return False
+        optics = {key: model._get_parameter(key, {}, self.data)
+                  for key in optics_keys}
+        schema = prep_schema(self.data, **optics)
+        if (len(ensure_array(schema.illum_wavelen)) > 1 or
+                illumination in schema.illum_polarization.dims or
+                hasattr(schema, 'theta')):
+            return False
+
+        self._alpha = 1.0
+        self._failures = (MultisphereFailure, InvalidScatterer)
+        theory = model.theory
+        if isinstance(model, AlphaModel):
+            if self._is_fixed('alpha'):
+                if not np.isscalar(model.alpha):
+                    return False
+                self._alpha = model.alpha
+            elif 'alpha' in self.names:
+                self._alpha = None
+                self._alpha_index = self.names.index('alpha')
+            else:
+                return False
+            self._failures += (TmatrixFailure,)
+        elif isinstance(model, PerfectLensModel):
+            if not self._is_fixed('lens_angle'):
+                return False
+            theory = MieLens(lens_angle=model.lens_angle)
+            self._failures = (InvalidScatterer,)
+        self._theory = interpret_theory(model.scatterer, theory)
+
+        if self._is_fixed('noise_sd'):
+            self._noise = ensure_array(model._find_noise({}, self.data))
+            if isinstance(self._noise, xr.DataArray):
+                self._noise = self._noise.values
+        elif 'noise_sd' in self.names:
+            self._noise = None
+            self._noise_index = self.names.index('noise_sd')
+        else:
+            return False
+
+        flat_schema = flat(schema)
+        self._coordinates = [flat_schema[dim].values.astype('float')
+                             for dim in ['x', 'y', 'z']]
+        self._data_values = flat(self.data).values
+        weights = _pixel_weights(self.data)
+        self._root_weights = 1. if weights is None else np.sqrt(weights)
+        self._wavevec = float(get_wavevec_from(schema))
+        self._medium_index = schema.medium_index
+        self._polarization = schema.illum_polarization
+        self._transform = find_transformation_function(
+            'cartesian', self._theory.desired_coordinate_system)
+        self._scatterer_map = model.scatterer.compile_parameters(self.names)
+        return True
+
+    def _can_differentiate(self):
+        scatterer = self.model.scatterer
+        if type(self._theory) is not Mie or type(scatterer) is not Sphere:
+            return False
+        if np.ndim(scatterer.r) > 0 or np.ndim(scatterer.n) > 0:
+            return False
+        return all([name in DIFFERENTIABLE_PARAMETERS for name in self.names])
+
+    def _as_dict(self, par_vals):
+        return dict(zip(self.names, par_vals))
+
+    def _scattered_field(self, scatterer):
+        # numpy counterpart of
+        # ScatteringTheory._calculate_single_color_scattered_field
+        if self._theory._can_handle(scatterer):
+            return self._field_from(scatterer)
+        elif isinstance(scatterer, Scatterers):
+            components = scatterer.get_component_list()
+            field = self._scattered_field(components[0])
+            for component in components[1:]:
+                field = field + self._scattered_field(component)
+            return field
+        raise TheoryNotCompatibleError(self._theory, scatterer)
+
+    def _field_from(self, scatterer):
+        # numpy counterpart of ScatteringTheory._get_field_from
+        center = scatterer.center
+        if center is None:
+            raise MissingParameter("center")
+        x, y, z = self._coordinates
+        positions = self._transform([
+            self._wavevec * (x - center[0]), self._wavevec * (y - center[1]),
+            self._wavevec * (center[2] - z)])
+        field = np.transpose(self._theory._raw_fields(
+            positions, scatterer, medium_wavevec=self._wavevec,
+            medium_index=self._medium_index,
+            illum_polarization=self._polarization))
+        return field * np.exp(-1j * self._wavevec * center[2])
+
+    def _forward(self, values, scatterer):
+        alpha = (values[self._alpha_index] if self._alpha is None
+                 else self._alpha)
+        try:
+            field = self._scattered_field(scatterer) * alpha
+        except self._failures:
+            return -np.inf
+        total = field[:, :2] + self._polarization.values[:2]
+        return (np.abs(total)**2).sum(axis=1)
+
+    def _noise_for(self, values):
+        return (values[self._noise_index] if self._noise is None
+                else self._noise)
+
+    def _residuals(self, values, scatterer):
+        return ((self._forward(values, scatterer) - self._data_values) /
+                self._noise_for(values) * self._root_weights)
+
+    def _lnlike(self, values, scatterer):
+        noise_sd = self._noise_for(values)
+        N = self._npixels
+        return ensure_scalar(
+            -N/2 * np.log(2 * np.pi) -
+            N * np.mean(np.log(ensure_array(noise_sd))) -
+            0.5 * (self._residuals(values, scatterer)**2).sum())
+
+    def lnprior(self, par_vals):
+        if not self.compiled:
+            return self.model.lnprior(self._as_dict(par_vals))
+        try:
+            scatterer = self._scatterer_map(par_vals)
+        except InvalidScatterer:
+            return -np.inf
+        return self.model._lnprior(par_vals, scatterer)
+
+    def lnlike(self, par_vals):
+        if not self.compiled:
+            return self.model.lnlike(self._as_dict(par_vals), self.data)
+        return self._lnlike(par_vals, self._scatterer_map(par_vals))
+
+    def lnposterior(self, par_vals):
+        if not self.compiled:
+            return self.model.lnposterior(
+                self._as_dict(par_vals), self.data, None)
+        try:
+            scatterer = self._scatterer_map(par_vals)
+        except InvalidScatterer:
+            return -np.inf
+        lnprior = self.model._lnprior(par_vals, scatterer)
+        if lnprior == -np.inf:
+            return lnprior
+        return lnprior + self._lnlike(par_vals, scatterer)
+
+    def lnprior_and_lnlike(self, par_vals):
+        """
+        The two terms of lnposterior, separately, as tempered samplers
+        need them. The likelihood is not calculated, and given as 0,
+        where the prior is -inf.
+        """
+        if not self.compiled:
+            pars = self._as_dict(par_vals)
+            lnprior = self.model.lnprior(pars)
+            if lnprior == -np.inf:
+                return lnprior, 0.
+            return lnprior, self.model.lnlike(pars, self.data)
+        try:
+            scatterer = self._scatterer_map(par_vals)
+        except InvalidScatterer:
+            return -np.inf, 0.
+        lnprior = self.model._lnprior(par_vals, scatterer)
+        if lnprior == -np.inf:
+            return lnprior, 0.
+        return lnprior, self._lnlike(par_vals, scatterer)
+
+    def lnposterior_many(self, par_vals):
+        """
+        Log-posteriors of a batch of parameter sets
+
+        par_vals has shape (nsets, nparameters). Priors are evaluated for
+        the whole batch at once, forward models are calculated only for
+        sets inside the priors, and the likelihoods of all the resulting
+        holograms are reduced together.
+        """
+        par_vals = np.asarray(par_vals)
+        if not self.compiled:
+            return np.array([self.lnposterior(values) for values in par_vals])
+        lnpriors = 0
+        for par, column in zip(self.model._parameters, par_vals.T):
+            lnpriors = lnpriors + par.lnprob(column)
+        lnpriors = np.broadcast_to(lnpriors, len(par_vals)).astype(float)
+
+        holograms = np.empty((len(par_vals), self._data_values.size))
+        computed = np.zeros(len(par_vals), dtype=bool)
+        for i in np.flatnonzero(np.isfinite(lnpriors)):
+            values = par_vals[i]
+            try:
+                scatterer = self._scatterer_map(values)
+            except InvalidScatterer:
+                lnpriors[i] = -np.inf
+                continue
+            if not all([constraint.check(scatterer)
+                        for constraint in self.model.constraints]):
+                lnpriors[i] = -np.inf
+                continue
+            hologram = self._forward(values, scatterer)
+            if np.isscalar(hologram):
+                # the scattering calculation failed
+                lnpriors[i] = hologram
+                continue
+            holograms[i] = hologram
+            computed[i] = True
+
+        if self._noise is None:
+            noise_sd = par_vals[computed, self._noise_index][:, np.newaxis]
+            mean_log_noise = np.log(noise_sd[:, 0])
+        else:
+            noise_sd = self._noise
+            mean_log_noise = np.mean(np.log(ensure_array(noise_sd)))
+        N = self._npixels
+        residuals = ((holograms[computed] - self._data_values) / noise_sd *
+                     self._root_weights)
+        lnposteriors = lnpriors
+        lnposteriors[computed] += (-N/2 * np.log(2 * np.pi) -
+                                   N * mean_log_noise -
+                                   0.5 * (residuals**2).sum(axis=1))
+        return lnposteriors
+
+    def residuals(self, par_vals):
+        """
+        Flattened residuals (forward model - data) / noise_sd
+        """
+        if not self.compiled:
+            pars = self._as_dict(par_vals)
+            noise = self.model._find_noise(pars, self.data)
+            return np.ravel(self.model._residuals(pars, self.data, noise))
+        return self._residuals(par_vals, self._scatterer_map(par_vals))
+
+    def _hologram_and_jacobian(self, values):
+        if not self.analytic_jacobian:
+            raise NotImplementedError(
+                "Analytic derivatives are only available for single "
+                "spheres calculated with Mie theory.")
+        scatterer = self._scatterer_map(values)
+        alpha = (values[self._alpha_index] if self._alpha is None
+                 else self._alpha)
+        center = scatterer.center
+        x, y, z = self._coordinates
+        positions = self._transform([
+            self._wavevec * (x - center[0]), self._wavevec * (y - center[1]),
+            self._wavevec * (center[2] - z)])
+        field, gradient, dfield_dr, dfield_dn = (
+            self._theory._raw_field_derivatives(
+                positions, scatterer, medium_wavevec=self._wavevec,
+                medium_index=self._medium_index,
+                illum_polarization=self._polarization))
+        k = self._wavevec
+        # positions move opposite to the center in x and y, with it in z
+        dfields = {'center.0': -k * gradient[0], 'center.1': -k * gradient[1],
+                   'center.2': k * gradient[2] - 1j * k * field,
+                   'r': dfield_dr, 'n': dfield_dn, 'n.real': dfield_dn,
+                   'n.imag': 1j * dfield_dn}
+        phase = np.exp(-1j * k * center[2])
+        field = field[:2] * phase
+        total = alpha * field + self._polarization.values[:2, np.newaxis]
+        hologram = (np.abs(total)**2).sum(axis=0)
+        jacobian = np.zeros((len(hologram), len(self.names)))
+        for i, name in enumerate(self.names):
+            if name == 'alpha':
+                dtotal = field
+            elif name in dfields:
+                dtotal = alpha * phase * dfields[name][:2]
+            else:
+                # noise_sd, which does not change the hologram
+                continue
+            jacobian[:, i] = 2 * (np.conj(total) * dtotal).real.sum(axis=0)
+        return hologram, jacobian
+
+    def forward_jacobian(self, par_vals):
+        """
+        Derivatives of the flattened hologram with respect to each of
+        par_vals, shape (npixels, nparameters). Only available if
+        analytic_jacobian is True.
+        """
+        return self._hologram_and_jacobian(par_vals)[1]
+
+    def residuals_jacobian(self, par_vals):
+        """
+        Derivatives of residuals(par_vals) with respect to each of
+        par_vals, shape (npixels, nparameters). Only available if
+        analytic_jacobian is True.
+        """
+        hologram, jacobian = self._hologram_and_jacobian(par_vals)
+        noise_sd = self._noise_for(par_vals)
+        jacobian = jacobian / np.reshape(noise_sd, (-1, 1))
+        if self._noise is None:
+            jacobian[:, self._noise_index] = (
+                -(hologram - self._data_values) / noise_sd**2)
+        return jacobian * np.reshape(self._root_weights, (-1, 1))
+
+    def lnlike_hessian(self, par_vals):
+        """
+        Second derivatives of lnlike(par_vals), shape (nparameters,
+        nparameters), in the Gauss-Newton approximation that drops the
+        second derivatives of the hologram (exact at a perfect fit). The
+        terms in a fitted noise_sd are exact. Only available if
+        analytic_jacobian is True.
+        """
+        jacobian = self.residuals_jacobian(par_vals)
+        hessian = -jacobian.T @ jacobian
+        if self._noise is None:
+            i = self._noise_index
+            noise_sd = par_vals[i]
+            residuals = -jacobian[:, i] * noise_sd
+            hessian[i] = 2 * residuals @ jacobian / noise_sd
+            hessian[:, i] = hessian[i]
+            hessian[i, i] = (self._npixels -
+                             3 * (residuals**2).sum()) / noise_sd**2
+        return hessian
+
+
+def _replace_objects(obj, replacements):
+    # copy of obj with each object whose id is a key of replacements
+    # swapped for its value, rebuilding the HoloPyObjects and containers
+    # along the way
+    if id(obj) in replacements:
+        return replacements[id(obj)]
+    if isinstance(obj, (list, tuple)):
+        new = [_replace_objects(item, replacements) for item in obj]
+        changed = any(a is not b for a, b in zip(new, obj))
+        return type(obj)(new) if changed else obj
+    if isinstance(obj, dict):
+        new = {key: _replace_objects(val, replacements)
+               for key, val in obj.items()}
+        changed = any(new[key] is not obj[key] for key in obj)
+        return new if changed else obj
+    if isinstance(obj, np.ndarray) and obj.dtype == object:
+        new = [_replace_objects(item, replacements) for item in obj.flat]
+        if not any(a is not b for a, b in zip(new, obj.flat)):
+            return obj
+        array = np.empty(obj.shape, dtype=object)
+        array.flat[:] = new
+        return array
+    if isinstance(obj, HoloPyObject):
+        items = dict(obj._iteritems())
+        new = {key: _replace_objects(val, replacements)
+               for key, val in items.items()}
+        if all(new[key] is items[key] for key in items):
+            return obj
+        return type(obj)(**new)
+    return obj
+
+
+def _pixel_weights(data):
+    # likelihood weights of the pixels of a subset from make_subset_data
+    weights = getattr(data, 'attrs', {}).get('pixel_weights')
+    return None if weights is None else np.asarray(weights, dtype=float)
+
+
+def _effective_size(data):
+    # number of pixels of the whole image the data stands for
+    weights = _pixel_weights(data)
+    return data.size if weights is None else weights.sum()
+
+
 class LimitOverlaps(HoloPyObject):
     """
     Constraint prohibiting overlaps beyond a certain tolerance.
@@ -30,6 +30,7 @@ import numpy as np
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import flat, make_subset_data
 from holopy.core.math import chisq, rsq
+from holopy.core.utils import choose_pool, broadcast
 from holopy.inference.third_party import nmpfit
 from holopy.inference.prior import Uniform
 from holopy.scattering.errors import (
@@ -68,19 +69,24 @@ class NmpfitStrategy(HoloPyObject):
         nmpfit documentation.
     maxiter: int
         Maximum number of Levenberg-Marquardt iterations to be performed.
+    parallel: None, integer, 'all', 'mpi', 'auto', or pool object
+        Pool through which the columns of each finite-difference Jacobian
+        are calculated. The fit is the same as the serial one. See
+        choose_pool for the options. Default is None (serial).
 
     Notes
     -----
 
     See nmpfit documentation for further details. Not all functionalities of
-    nmpfit are implemented here: in particular, we do not allow analytical
-    derivatives of the residual function, which is impractical and/or
-    impossible to calculate for holograms. If you want to weight the residuals,
-    you need to supply a custom residual function.
+    nmpfit are implemented here. Analytical derivatives of the residual
+    function are used when the model provides them (see
+    Model.jacobian) and damp is 0; otherwise the Jacobian is found by
+    finite differences. If you want to weight the residuals, you need to
+    supply a custom residual function.
 
     """
     def __init__(self, npixels=None, quiet=True, ftol=1e-10, xtol=1e-10,
-                 gtol=1e-10, damp=0, maxiter=100, seed=None):
+                 gtol=1e-10, damp=0, maxiter=100, seed=None, parallel=None):
         self.ftol = ftol
         self.xtol = xtol
         self.gtol = gtol
@@ -89,6 +95,7 @@ class NmpfitStrategy(HoloPyObject):
         self.quiet = quiet
         self.npixels = npixels
         self.seed = seed
+        self.parallel = parallel
 
     def unscale_pars_from_minimizer(self, parameters, values):
         assert len(parameters) == len(values)
@@ -122,14 +129,12 @@ class NmpfitStrategy(HoloPyObject):
             data = make_subset_data(data, pixels = self.npixels, seed=self.seed)
 
         guess_prior = model.lnprior({par.name:par.guess for par in parameters})
-        def residual(par_vals):
-            noise = model._find_noise(par_vals, data)
-            residuals = model._residuals(par_vals, data, noise).flatten()
-            prior = np.sqrt(guess_prior - model.lnprior(par_vals))
-            residuals = np.append(residuals, prior)
-            return residuals
-
-        fitted_pars, minimizer_info = self.minimize(parameters, residual)
+        residual = PriorWeightedResiduals(model.compile_plan(data),
+                                          parameters, guess_prior)
+        pool = choose_pool(self.parallel)
+        fitted_pars, minimizer_info = self.minimize(parameters, residual, pool)
+        if pool is not self.parallel:
+            pool.close()
 
         if minimizer_info.status == 5:
             setattr(minimizer_info, 'converged', False)
@@ -150,7 +155,7 @@ class NmpfitStrategy(HoloPyObject):
         return FitResult(data, model, self, d_time,
                      {'intervals': intervals, 'mpfit_details':minimizer_info})
 
-    def minimize(self, parameters, obj_func):
+    def minimize(self, parameters, obj_func, pool=None):
         nmp_pars = []
         for par in parameters:
             d = {'parname':par.name, 'value':par.scale(par.guess),
@@ -163,21 +168,95 @@ class NmpfitStrategy(HoloPyObject):
                 d['limits'][1] = par.scale(par.upper_bound)
             nmp_pars.append(d)
 
-        def resid_wrapper(p, fjac=None):
-            status = 0
-            out = obj_func(self.unscale_pars_from_minimizer(parameters, p))
-            return [status, out]
+        autoderivative = int(
+            not getattr(obj_func, 'has_jacobian', False) or self.damp != 0)
+        if not autoderivative:
+            pool = None
 
         # now fit it
-        with warnings.catch_warnings():
+        with warnings.catch_warnings(), broadcast(
+                MpfitResiduals(obj_func, parameters), pool) as resid_wrapper:
             warnings.simplefilter("ignore", RuntimeWarning)
             fitresult = nmpfit.mpfit(
                 resid_wrapper, parinfo=nmp_pars, ftol = self.ftol,
                 xtol = self.xtol, gtol = self.gtol, damp = self.damp,
-                maxiter = self.maxiter, quiet = self.quiet)
+                maxiter = self.maxiter, quiet = self.quiet, pool = pool,
+                autoderivative = autoderivative)
 
         result_pars = self.unscale_pars_from_minimizer(
             parameters, fitresult.params)
 
         return result_pars, fitresult
 
+
+class PriorWeightedResiduals(object):
+    """
+    Residuals of a compiled model, with the prior appended as one more
+    residual, as a function of a dict of parameter values.
+
+    Unlike a closure, this can be pickled and sent to a pool.
+    """
+    def __init__(self, plan, parameters, guess_prior):
+        self.plan = plan
+        self.parameters = parameters
+        self.guess_prior = guess_prior
+
+    def __call__(self, par_vals):
+        values = [par_vals[par.name] for par in self.parameters]
+        residuals = self.plan.residuals(values)
+        residuals = np.append(residuals, self._prior_residual(values))
+        return residuals
+
+    @property
+    def has_jacobian(self):
+        return self.plan.analytic_jacobian
+
+    def jacobian(self, par_vals):
+        """
+        Derivatives of the residuals with respect to each parameter, shape
+        (npixels + 1, nparameters). The model's analytic derivatives are
+        used for the pixels; the prior row, which is cheap to evaluate, is
+        found by finite differences, stepping backwards at the upper
+        bound of a prior.
+        """
+        values = np.array([par_vals[par.name] for par in self.parameters])
+        pixels = self.plan.residuals_jacobian(values)
+        prior = self._prior_residual(values)
+        eps = np.sqrt(np.finfo(float).eps)
+        steps = eps * np.abs(values)
+        steps[steps == 0] = eps
+        prior_row = np.zeros(len(values))
+        for i, step in enumerate(steps):
+            for step in [step, -step]:
+                shifted = values.copy()
+                shifted[i] += step
+                derivative = (self._prior_residual(shifted) - prior) / step
+                if np.isfinite(derivative):
+                    prior_row[i] = derivative
+                    break
+        return np.vstack([pixels, prior_row])
+
+    def _prior_residual(self, values):
+        return np.sqrt(self.guess_prior - self.plan.lnprior(values))
+
+
+class MpfitResiduals(object):
+    """
+    Adapts a function of a dict of parameter values to the call signature
+    mpfit expects, of scaled parameter values.
+    """
+    def __init__(self, obj_func, parameters):
+        self.obj_func = obj_func
+        self.parameters = parameters
+
+    def __call__(self, p, fjac=None):
+        status = 0
+        par_vals = {par.name: par.unscale(value)
+                    for par, value in zip(self.parameters, p)}
+        out = self.obj_func(par_vals)
+        if fjac is None:
+            return [status, out]
+        # mpfit expects the derivatives with their sign reversed
+        scale_factors = np.array([par.scale_factor
+                                  for par in self.parameters])
+        return [status, out, -self.obj_func.jacobian(par_vals) * scale_factors]
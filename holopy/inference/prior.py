@@ -134,6 +134,9 @@ class Uniform(Prior):
             self.scale_factor = 1.
 
     def lnprob(self, p):
+        if np.ndim(p) > 0:
+            outside = (p < self.lower_bound) | (p > self.upper_bound)
+            return np.where(outside, -np.inf, self._lnprob)
         if p < self.lower_bound or p > self.upper_bound:
             return -np.inf
         # For a uniform prior, the value is always the same, so precompute it
@@ -167,7 +170,7 @@ class Uniform(Prior):
 
 
 class Gaussian(Prior):
-    def __init__(self, mu, sd, name=None):
+    def __init__(self, mu, sd, name=None, guess=None):
         """
         Gaussian prior.
 
@@ -177,6 +180,9 @@ class Gaussian(Prior):
             The mean and standard deviation of the Gaussian.
         name : string or None, optional
             The name of the parameter.
+        guess : float or None, optional
+            The value to take as an initial guess from the prior. Defaults
+            to mu.
         """
         self.mu = mu
         self.sd = sd
@@ -184,6 +190,7 @@ class Gaussian(Prior):
             raise ParameterSpecificationError(
                     "Specified sd of {} is not greater than 0".format(sd))
         self.name = name
+        self._guess = guess
         self._lnprob_normalization = -np.log(self.sd * np.sqrt(2*np.pi))
 
         if abs(self.guess) > 1e-12:
@@ -205,7 +212,7 @@ class Gaussian(Prior):
 
     @property
     def guess(self):
-        return self.mu
+        return self.mu if self._guess is None else self._guess
 
     def sample(self, size=None):
         return random.normal(self.mu, self.sd, size=size)
@@ -224,19 +231,20 @@ class Gaussian(Prior):
             return super().__add__(value)
 
     def _add(self, value):
-        return Gaussian(self.mu+value, self.sd, self.name)
+        return Gaussian(self.mu+value, self.sd, self.name, self.guess+value)
 
     def _multiply(self, value):
-        return Gaussian(self.mu*value, self.sd*value, self.name)
+        return Gaussian(self.mu*value, self.sd*value, self.name,
+                        self.guess*value)
 
     def __neg__(self):
-        return Gaussian(-self.mu, self.sd, self.name)
+        return Gaussian(-self.mu, self.sd, self.name, -self.guess)
 
 
 class BoundedGaussian(Gaussian):
     # Note: this is not normalized
     def __init__(self, mu, sd, lower_bound=-np.inf, upper_bound=np.inf,
-                 name=None):
+                 name=None, guess=None):
         """Gaussian prior restricted to an interval.
 
         Note that the `prob` and `lnprob` methods return a value proportional
@@ -250,21 +258,31 @@ class BoundedGaussian(Gaussian):
             Defaults to +- infinity.
         name : string or None, optional
             The name of the parameter.
+        guess : float or None, optional
+            The value to take as an initial guess from the prior. Defaults
+            to mu.
         """
 
         if mu < lower_bound or mu > upper_bound or lower_bound == upper_bound:
             raise ParameterSpecificationError(
                 "Lower bound {} must be less than mean {}. Upper bound {} must"
                 " be greater than mean.")
+        if guess is not None and (guess < lower_bound or guess > upper_bound):
+            raise ParameterSpecificationError(
+                "Guess {} is not within bounds {} and {}".format(
+                    guess, lower_bound, upper_bound))
 
         self.lower_bound = lower_bound
         self.upper_bound = upper_bound
-        super().__init__(mu, sd, name)
+        super().__init__(mu, sd, name, guess)
 
     def lnprob(self, p):
         """Note that this does not return the actual log-probability, but
         a value proportional to it.
         """
+        if np.ndim(p) > 0:
+            outside = (p < self.lower_bound) | (p > self.upper_bound)
+            return np.where(outside, -np.inf, super().lnprob(p))
         if p < self.lower_bound or p > self.upper_bound:
             return -np.inf
         else:
@@ -290,16 +308,17 @@ class BoundedGaussian(Gaussian):
 
     def _add(self, value):
         return BoundedGaussian(self.mu+value, self.sd, self.lower_bound+value,
-                               self.upper_bound+value, self.name)
+                               self.upper_bound+value, self.name,
+                               self.guess+value)
 
     def _multiply(self, value):
         return BoundedGaussian(self.mu*value, self.sd*value,
                                self.lower_bound*value, self.upper_bound*value,
-                               self.name)
+                               self.name, self.guess*value)
 
     def __neg__(self):
         return BoundedGaussian(-self.mu, self.sd, -self.upper_bound,
-                               -self.lower_bound, self.name)
+                               -self.lower_bound, self.name, -self.guess)
 
 
 class ComplexPrior(Prior):
@@ -401,6 +420,36 @@ def updated(prior, v, extra_uncertainty=0):
         return Gaussian(v.guess, sd, prior.name)
 
 
+def recentered(prior, guess, step=None):
+    """
+    Copy of prior with a new guess, for warm-starting a fit
+
+    Gaussian priors keep their type, mean, width and bounds, and only
+    their guess moves. Any other prior is returned as a Uniform prior.
+
+    Parameters
+    ----------
+    guess : float
+        The new guess, clipped to the bounds of prior
+    step : float or None
+        If given, the new Uniform prior extends no further than step on
+        either side of guess. Otherwise it keeps the bounds of prior, and
+        priors that are neither Uniform nor Gaussian are returned
+        unchanged. Gaussian priors ignore step.
+    """
+    lower = getattr(prior, 'lower_bound', -np.inf)
+    upper = getattr(prior, 'upper_bound', np.inf)
+    guess = min(max(guess, lower), upper)
+    if isinstance(prior, Gaussian):
+        return prior.like_me(guess=guess)
+    if step is None and not isinstance(prior, Uniform):
+        return prior
+    if step is not None:
+        lower = max(lower, guess - step)
+        upper = min(upper, guess + step)
+    return Uniform(lower, upper, guess, name=prior.name)
+
+
 def generate_guess(parameters, nguess=1, scaling=1, seed=None):
     def scaled_sample(prior):
         raw_sample = prior.sample(size=nguess)
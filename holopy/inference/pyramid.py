@@ -0,0 +1,113 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Fit a model coarse to fine, on growing subsets of the pixels of the data.
+"""
+import time
+from copy import copy
+
+import numpy as np
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import make_subset_data
+from holopy.inference.result import FitResult
+
+
+class PyramidStrategy(HoloPyObject):
+    """
+    Fit with another fit strategy on random subsets of the pixels that
+    grow from stage to stage, starting each stage from the best fit of
+    the one before.
+
+    Most iterations are then spent on a few hundred pixels, and only the
+    last stage, which polishes the fit, uses npixels of the data.
+
+    Parameters
+    ----------
+    strategy : fit strategy or string, optional
+        Strategy used for each stage, as for Model.fit. It should fit
+        all the pixels it is given (npixels=None). Default is the
+        model's default fit strategy.
+    npixels : int, optional
+        Number of pixels fit in the last stage. Default is all of them.
+    min_pixels : int, optional
+        Number of pixels fit in the first stage. Default is npixels/20.
+    stages : int
+        Number of stages before the last one. The number of pixels grows
+        geometrically from min_pixels to npixels.
+    seed : int, optional
+        Random seed for choosing the pixels of each stage.
+    """
+    def __init__(self, strategy=None, npixels=None, min_pixels=None,
+                 stages=3, seed=None):
+        self.strategy = strategy
+        self.npixels = npixels
+        self.min_pixels = min_pixels
+        self.stages = stages
+        self.seed = seed
+
+    def stage_pixels(self, total_pixels):
+        """
+        Number of pixels fit in each stage, for data with total_pixels
+        """
+        npixels = total_pixels if self.npixels is None else self.npixels
+        min_pixels = self.min_pixels
+        if min_pixels is None:
+            min_pixels = npixels / 20
+        pixels = np.logspace(np.log10(min_pixels), np.log10(npixels),
+                             self.stages + 1)
+        return [int(round(n)) for n in pixels[:-1]] + [npixels]
+
+    def fit(self, model, data):
+        """
+        fit a model to some data
+
+        Parameters
+        ----------
+        model : :class:`~holopy.inference.model.Model` object
+            A model describing the scattering system which leads to your
+            data and the parameters to vary to fit it to the data
+        data : xarray.DataArray
+            The data to fit
+
+        Returns
+        -------
+        result : :class:`FitResult`
+            The result of the last stage
+        """
+        time_start = time.time()
+        strategy = model.validate_strategy(self.strategy, 'fit')
+        total_pixels = data.size
+        stage_model = model
+        for i, npixels in enumerate(self.stage_pixels(total_pixels)):
+            stage = copy(strategy)
+            if i > 0 and hasattr(stage, 'walker_initial_pos'):
+                # start the population around the new guess
+                stage.walker_initial_pos = None
+            seed = None if self.seed is None else self.seed + i
+            if npixels < total_pixels:
+                stage_data = make_subset_data(data, pixels=npixels,
+                                              seed=seed)
+            else:
+                stage_data = data
+            result = stage.fit(stage_model, stage_data)
+            stage_model = model.with_guesses(result.parameters)
+
+        kwargs = {key: getattr(result, key) for key in result._kwargs_keys}
+        d_time = time.time() - time_start
+        return FitResult(result.data, model, self, d_time, kwargs)
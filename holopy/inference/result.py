@@ -68,6 +68,9 @@ class FitResult(HoloPyObject):
         self.model = model
         self.strategy = strategy
         if hasattr(strategy, 'parallel') and hasattr(strategy.parallel, 'map'):
+            # pools can't be saved; leave the caller's strategy (and pool)
+            # usable for further calculations
+            self.strategy = copy(strategy)
             self.strategy.parallel = 'external_pool'
         self.time = time
         self._kwargs_keys = []
@@ -231,7 +234,7 @@ class FitResult(HoloPyObject):
             warn(warn_text)
         except:
             pass
-        for key in ['lnprobs', 'samples', '_best_fit']:
+        for key in ['lnprobs', 'samples', 'covariance', '_best_fit']:
             try:
                 kwargs[key] = getattr(ds, key)
                 try:
@@ -303,6 +306,8 @@ GROUPNAME = 'stage_results[{}]'
 class TemperedSamplingResult(SamplingResult):
     def __init__(self, end_result, stage_results, strategy, time):
         kwargs = {'lnprobs': end_result.lnprobs, 'samples': end_result.samples}
+        if hasattr(end_result, 'convergence'):
+            kwargs['convergence'] = end_result.convergence
         super().__init__(end_result.data, end_result.model, strategy, time,
                          kwargs)
         self.stage_results = stage_results
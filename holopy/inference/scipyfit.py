@@ -10,18 +10,42 @@ from scipy.optimize import least_squares
 
 from holopy.core.holopy_object import HoloPyObject
 from holopy.core.metadata import flat, make_subset_data
+from holopy.core.utils import choose_pool, broadcast, NonePool
 from holopy.scattering.errors import  MissingParameter
 from holopy.inference.result import FitResult, UncertainValue
 
 
 class LeastSquaresScipyStrategy(HoloPyObject):
+    """
+    Levenberg-Marquardt minimizer, from scipy.optimize.least_squares.
+
+    Parameters
+    ----------
+    ftol, xtol, gtol: float
+        Convergence criteria, passed to least_squares
+    max_nfev: int
+        Maximum number of residual evaluations, passed to least_squares
+    npixels: None
+        Fit only a randomly selected fraction of the data points in data
+    parallel: None, integer, 'all', 'mpi', 'auto', or pool object
+        Pool through which the columns of each finite-difference Jacobian
+        are calculated together (see choose_pool), with the same steps
+        MINPACK takes. Every pool gives the same fit. Default is None,
+        which calculates them one after another.
+
+    Notes
+    -----
+    If the model provides analytic derivatives (see Model.jacobian),
+    they are used instead of finite differences, and parallel is ignored.
+    """
     def __init__(self, ftol=1e-10, xtol=1e-10, gtol=1e-10, max_nfev=None,
-                 npixels=None):
+                 npixels=None, parallel=None):
         self.ftol = ftol
         self.xtol = xtol
         self.gtol = gtol
         self.max_nfev = max_nfev
         self.npixels = npixels
+        self.parallel = parallel
         self._optimizer_kwargs = {
             'ftol': self.ftol,
             'xtol': self.xtol,
@@ -65,21 +89,17 @@ class LeastSquaresScipyStrategy(HoloPyObject):
             data = flat(data)
         else:
             data = make_subset_data(data, pixels=self.npixels)
-        guess_lnprior = model.lnprior(
-            {par.name:par.guess for par in parameters})
-
-        def residual(rescaled_values):
-            unscaled_values = self.unscale_pars_from_minimizer(
-                parameters, rescaled_values)
-            noise = model._find_noise(unscaled_values, data)
-            residuals = model._residuals(unscaled_values, data, noise)
-            ln_prior = model.lnprior(unscaled_values) - guess_lnprior
-            zscore_prior = np.sqrt(2 * -ln_prior)
-            np.append(residuals, zscore_prior)
-            return residuals
+        residual = ScaledResiduals(model.compile_plan(data), parameters)
 
         # The only work here
-        fitted_pars, minimizer_info = self.minimize(parameters, residual)
+        if residual.has_jacobian:
+            fitted_pars, minimizer_info = self.minimize(parameters, residual)
+        else:
+            pool = choose_pool(self.parallel)
+            fitted_pars, minimizer_info = self.minimize(
+                parameters, residual, pool)
+            if pool is not self.parallel:
+                pool.close()
 
         if not minimizer_info.success:
             warnings.warn("Minimizer Convergence Failed, your results \
@@ -99,10 +119,21 @@ class LeastSquaresScipyStrategy(HoloPyObject):
         kwargs = {'intervals': intervals, 'minimizer_info': minimizer_info}
         return FitResult(data, model, self, d_time, kwargs)
 
-    def minimize(self, parameters, residuals_function):
+    def minimize(self, parameters, residuals_function, pool=None):
         initial_parameter_guess = [par.scale(par.guess) for par in parameters]
-        fitresult = least_squares(residuals_function, initial_parameter_guess,
-                                  **self._optimizer_kwargs)
+        if getattr(residuals_function, 'has_jacobian', False):
+            kwargs = dict(self._optimizer_kwargs,
+                          jac=residuals_function.jacobian)
+            fitresult = least_squares(
+                residuals_function, initial_parameter_guess, **kwargs)
+        else:
+            if pool is None:
+                pool = NonePool()
+            with broadcast(residuals_function, pool) as residuals_function:
+                jacobian = ForwardDifferenceJacobian(residuals_function, pool)
+                kwargs = dict(self._optimizer_kwargs, jac=jacobian)
+                fitresult = least_squares(
+                    jacobian.residuals_at, initial_parameter_guess, **kwargs)
         result_pars = self.unscale_pars_from_minimizer(parameters, fitresult.x)
         return result_pars, fitresult
 
@@ -113,3 +144,71 @@ class LeastSquaresScipyStrategy(HoloPyObject):
         jtjinv = np.linalg.inv(jtj)
         return np.sqrt(np.diag(jtjinv))
 
+
+class ScaledResiduals(object):
+    """
+    Residuals of a compiled model as a function of the rescaled parameter
+    values the minimizer works with.
+
+    Unlike a closure, this can be pickled and sent to a pool.
+    """
+    def __init__(self, plan, parameters):
+        self.plan = plan
+        self.parameters = parameters
+
+    def __call__(self, rescaled_values):
+        unscaled_values = [par.unscale(value) for par, value in
+                           zip(self.parameters, rescaled_values)]
+        return self.plan.residuals(unscaled_values)
+
+    @property
+    def has_jacobian(self):
+        return self.plan.analytic_jacobian
+
+    def jacobian(self, rescaled_values):
+        """
+        Derivatives of the residuals with respect to each rescaled value,
+        from the model's analytic derivatives.
+        """
+        unscaled_values = [par.unscale(value) for par, value in
+                           zip(self.parameters, rescaled_values)]
+        scale_factors = np.array([par.scale_factor
+                                  for par in self.parameters])
+        return self.plan.residuals_jacobian(unscaled_values) * scale_factors
+
+
+class ForwardDifferenceJacobian(object):
+    """
+    Jacobian of residuals by forward differences, with the step MINPACK's
+    lmdif (scipy's least_squares with method='lm') uses, evaluating the
+    perturbed residuals together through pool.map.
+
+    The minimizer should evaluate residuals through residuals_at, so that
+    the Jacobian at the last point evaluated reuses its residuals.
+    """
+    def __init__(self, residuals, pool):
+        self.residuals = residuals
+        self.pool = pool
+        self._last = None
+
+    def residuals_at(self, x):
+        f = self.residuals(x)
+        self._last = (np.array(x, dtype=float), f)
+        return f
+
+    def __call__(self, x):
+        x = np.array(x, dtype=float)
+        eps = np.sqrt(np.finfo(float).eps)
+        h = eps * np.abs(x)
+        h[h == 0] = eps
+        points = []
+        for j in range(len(x)):
+            xp = x.copy()
+            xp[j] = x[j] + h[j]
+            points.append(xp)
+        reuse = self._last is not None and np.array_equal(self._last[0], x)
+        if not reuse:
+            points.insert(0, x)
+        results = list(self.pool.map(self.residuals, points))
+        f = self._last[1] if reuse else results.pop(0)
+        return np.column_stack([(fp - f) / hj for fp, hj in zip(results, h)])
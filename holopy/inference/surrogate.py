@@ -0,0 +1,373 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Fit models that are expensive to calculate by Bayesian optimization
+
+A Gaussian process surrogate of the log-posterior is fit to the
+evaluations so far, and each batch of new evaluations goes where the
+expected improvement over the best fit is largest [Jones1998]_. Batches
+are chosen from a trust region around the best fit that grows while
+the fit improves and shrinks when it does not [Eriksson2019]_.
+
+.. [Jones1998] D. R. Jones, M. Schonlau and W. J. Welch, "Efficient
+   Global Optimization of Expensive Black-Box Functions", J. Global
+   Optim. 13, 455 (1998).
+"""
+import time
+
+import numpy as np
+import xarray as xr
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+from scipy.stats import norm
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import make_subset_data
+from holopy.core.utils import choose_pool, broadcast
+from holopy.inference.result import FitResult, UncertainValue
+
+
+class SurrogateStrategy(HoloPyObject):
+    """
+    Bayesian optimization of the posterior, for models whose forward
+    calculation takes seconds or more (such as DDA or large Multisphere
+    clusters).
+
+    The posterior is evaluated at n_initial points drawn from the prior
+    (and at the guess), then in batches of batch_size points chosen by
+    expected improvement on a Gaussian process surrogate fit in the
+    scaled parameter space of Prior.scale. The search stops early
+    (stop_condition 'tolx') once the trust region the batches are chosen
+    from has shrunk to 1/128 of the search bounds. Each batch is evaluated
+    through the parallel pool. Uniform priors bound the search and
+    Gaussian priors are searched to 4 standard deviations from their
+    mean. Where a prior is unbounded, the search extends one scale factor
+    (see Prior.scale) beyond its guess.
+
+    Parameters
+    ----------
+    max_evaluations : int
+        Largest number of posterior evaluations
+    batch_size : int
+        Number of points evaluated together in each iteration
+    n_initial : int, optional
+        Number of evaluations before the surrogate is used. Default is
+        2 * nparameters + 1.
+    tolfun : float
+        Stop when the expected improvement of the log-posterior is below
+        tolfun
+    npixels : int, optional
+        Number of pixels in the image to fit. Default fits all.
+    parallel : None, integer, 'all', 'mpi', 'auto', or pool object
+        Pool through which each batch is evaluated (see choose_pool)
+    seed : int, optional
+        Random seed
+    """
+    def __init__(self, max_evaluations=100, batch_size=4, n_initial=None,
+                 tolfun=1e-3, npixels=None, parallel='auto', seed=None):
+        self.max_evaluations = max_evaluations
+        self.batch_size = batch_size
+        self.n_initial = n_initial
+        self.tolfun = tolfun
+        self.npixels = npixels
+        self.parallel = parallel
+        self.seed = seed
+
+    def fit(self, model, data):
+        """
+        fit a model to some data
+
+        Parameters
+        ----------
+        model : :class:`~holopy.inference.model.Model` object
+            A model describing the scattering system which leads to your
+            data and the parameters to vary to fit it to the data
+        data : xarray.DataArray
+            The data to fit
+
+        Returns
+        -------
+        result : :class:`FitResult`
+            Contains the best fit parameters and information about the fit
+        """
+        time_start = time.time()
+        parameters = model._parameters
+        if self.npixels is not None:
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+        random = np.random.RandomState(self.seed)
+        bounds = np.array([_scaled_bounds(par) for par in parameters])
+        n_initial = self.n_initial
+        if n_initial is None:
+            n_initial = 2 * len(parameters) + 1
+
+        initial = random.uniform(bounds[:, 0], bounds[:, 1],
+                                 (n_initial - 1, len(parameters)))
+        guess = [par.scale(par.guess) for par in parameters]
+        points = np.vstack([guess, initial])
+
+        plan = model.compile_plan(data)
+        pool = choose_pool(self.parallel)
+        with broadcast(plan.lnposterior, pool) as lnposterior:
+            def evaluate(scaled_points):
+                return np.array(list(pool.map(lnposterior, [
+                    [par.unscale(value) for par, value in zip(parameters, x)]
+                    for x in scaled_points])), dtype=float)
+
+            lnprobs = evaluate(points)
+            if not np.isfinite(lnprobs).any():
+                raise ValueError('the posterior is zero at every initial '
+                                 'point')
+            region = TrustRegion(bounds, self.batch_size)
+            stop = 'max_evaluations'
+            while len(points) < self.max_evaluations:
+                batch_size = min(self.batch_size,
+                                 self.max_evaluations - len(points))
+                batch, improvement = propose_batch(
+                    points, lnprobs, region.around(points[np.argmax(lnprobs)]),
+                    batch_size, random)
+                if improvement < self.tolfun:
+                    stop = 'tolfun'
+                    break
+                batch_lnprobs = evaluate(batch)
+                region.update(np.max(batch_lnprobs) > np.max(lnprobs))
+                points = np.vstack([points, batch])
+                lnprobs = np.append(lnprobs, batch_lnprobs)
+                if region.length < region.min_length:
+                    stop = 'tolx'
+                    break
+        if pool is not self.parallel:
+            pool.close()
+
+        best = np.argmax(lnprobs)
+        errors = _surrogate_errors(points, lnprobs, bounds, points[best])
+        intervals = [
+            UncertainValue(par.unscale(value), par.unscale(error),
+                           name=par.name)
+            for par, value, error in zip(parameters, points[best], errors)]
+        names = [par.name for par in parameters]
+        samples = xr.DataArray(
+            [[[par.unscale(value) for par, value in zip(parameters, x)]
+              for x in points]], dims=['walker', 'chain', 'parameter'],
+            coords={'parameter': names})
+        lnprobs = xr.DataArray([lnprobs], dims=['walker', 'chain'])
+        d_time = time.time() - time_start
+        kwargs = {'intervals': intervals, 'samples': samples,
+                  'lnprobs': lnprobs, 'stop_condition': stop}
+        return FitResult(data, model, self, d_time, kwargs)
+
+
+class TrustRegion(object):
+    """
+    Box around the best point that batches are chosen from, as in TuRBO
+    [Eriksson2019]_. Its side, a fraction length of the search bounds,
+    doubles after 3 batches in a row improve the fit and halves after
+    as many failures as there are parameters per batch size (at least 4
+    evaluations).
+
+    .. [Eriksson2019] D. Eriksson et al., "Scalable Global Optimization
+       via Local Bayesian Optimization", NeurIPS (2019).
+    """
+    def __init__(self, bounds, batch_size, length=0.8, min_length=2**-7,
+                 max_length=1.6):
+        self.bounds = bounds
+        self.length = length
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_failures = int(np.ceil(max(4, len(bounds)) / batch_size))
+        self.successes = 0
+        self.failures = 0
+
+    def around(self, point):
+        half = 0.5 * self.length * (self.bounds[:, 1] - self.bounds[:, 0])
+        return np.column_stack([np.maximum(point - half, self.bounds[:, 0]),
+                                np.minimum(point + half, self.bounds[:, 1])])
+
+    def update(self, improved):
+        if improved:
+            self.successes += 1
+            self.failures = 0
+        else:
+            self.successes = 0
+            self.failures += 1
+        if self.successes == 3:
+            self.length = min(2 * self.length, self.max_length)
+            self.successes = 0
+        elif self.failures == self.max_failures:
+            self.length /= 2
+            self.failures = 0
+
+
+class GaussianProcess(object):
+    """
+    Gaussian process regression with a Matern 5/2 kernel with one length
+    scale per dimension, fit by maximizing the marginal likelihood.
+
+    Targets are standardized before fitting, so predictions are in the
+    units of y.
+    """
+    def __init__(self, x, y, length_bounds, nugget=1e-6):
+        self.x = np.array(x, dtype=float)
+        self.y_mean = np.mean(y)
+        self.y_sd = np.std(y) if np.std(y) > 0 else 1.
+        self.y = (np.array(y, dtype=float) - self.y_mean) / self.y_sd
+        self.nugget = nugget
+        self.length_bounds = np.array(length_bounds, dtype=float)
+        self.lengths = self._fit_lengths()
+        self._factor()
+
+    def kernel(self, a, b):
+        d = np.sqrt(((a[:, np.newaxis, :] - b[np.newaxis, :, :])**2 /
+                     self.lengths**2).sum(axis=-1)) * np.sqrt(5)
+        return (1 + d + d**2 / 3) * np.exp(-d)
+
+    def predict(self, x):
+        """
+        Mean and standard deviation of the process at points x
+        """
+        x = np.atleast_2d(x)
+        k = self.kernel(x, self.x)
+        mean = k @ self.alpha
+        v = cho_solve(self.factor, k.T)
+        var = np.clip(1 + self.nugget - (k * v.T).sum(axis=1), 1e-12, None)
+        return (self.y_mean + self.y_sd * mean, self.y_sd * np.sqrt(var))
+
+    def with_observations(self, x, y):
+        """
+        The same process, without refitting the length scales, conditioned
+        on more observations
+        """
+        new = object.__new__(GaussianProcess)
+        new.__dict__.update(self.__dict__)
+        new.x = np.vstack([self.x, x])
+        new.y = np.append(self.y, (np.array(y) - self.y_mean) / self.y_sd)
+        new._factor()
+        return new
+
+    def _factor(self):
+        covariance = self.kernel(self.x, self.x)
+        covariance[np.diag_indices_from(covariance)] += self.nugget
+        self.factor = cho_factor(covariance, lower=True)
+        self.alpha = cho_solve(self.factor, self.y)
+
+    def _neg_log_marginal_likelihood(self, log_lengths):
+        self.lengths = np.exp(log_lengths)
+        try:
+            self._factor()
+        except np.linalg.LinAlgError:
+            return np.inf
+        return (0.5 * self.y @ self.alpha +
+                np.log(np.diag(self.factor[0])).sum())
+
+    def _fit_lengths(self):
+        log_bounds = np.log(self.length_bounds)
+        start = log_bounds.mean(axis=1)
+        result = minimize(self._neg_log_marginal_likelihood, start,
+                          method='L-BFGS-B', bounds=log_bounds)
+        return np.exp(result.x)
+
+
+def expected_improvement(mean, sd, best):
+    z = (mean - best) / sd
+    return (mean - best) * norm.cdf(z) + sd * norm.pdf(z)
+
+
+def propose_batch(points, lnprobs, region, batch_size, random,
+                  ncandidates=1000):
+    """
+    Choose batch_size new points in region, an array of (lower, upper)
+    bounds, each where the expected improvement is largest once the
+    points before it in the batch are taken to have the values the
+    surrogate predicts for them. The surrogate is fit to the points in
+    region and around it (at least 2 per dimension), where the
+    log-posterior is smooth enough for one length scale per parameter.
+
+    Returns the batch and the expected improvement of its first point.
+    """
+    widths = region[:, 1] - region[:, 0]
+    center = region.mean(axis=1)
+    distance = np.abs(points - center) / widths
+    local = (distance <= 1).all(axis=1)
+    if local.sum() < 2 * len(region) + 1:
+        local = np.argsort(distance.max(axis=1))[:2 * len(region) + 1]
+    points, lnprobs = points[local], lnprobs[local]
+    # points forbidden by the prior count as the worst point found
+    finite = np.isfinite(lnprobs)
+    targets = np.where(finite, lnprobs, lnprobs[finite].min())
+    best = targets.max()
+    targets = targets - best
+    gp = GaussianProcess(points, targets,
+                         np.column_stack([widths / 100, widths * 10]))
+
+    batch = []
+    first_improvement = None
+    for i in range(batch_size):
+        candidates = random.uniform(region[:, 0], region[:, 1],
+                                    (ncandidates, len(region)))
+        improvement = expected_improvement(*gp.predict(candidates), 0)
+        result = minimize(
+            lambda x: -expected_improvement(*gp.predict(x), 0)[0],
+            candidates[np.argmax(improvement)], method='L-BFGS-B',
+            bounds=region)
+        if first_improvement is None:
+            first_improvement = -result.fun
+        batch.append(result.x)
+        gp = gp.with_observations([result.x], gp.predict(result.x)[0])
+    return np.array(batch), first_improvement
+
+
+def _scaled_bounds(prior):
+    lower = getattr(prior, 'lower_bound', -np.inf)
+    upper = getattr(prior, 'upper_bound', np.inf)
+    if hasattr(prior, 'sd'):
+        lower = max(lower, prior.mu - 4 * prior.sd)
+        upper = min(upper, prior.mu + 4 * prior.sd)
+    lower, upper = sorted([prior.scale(lower), prior.scale(upper)])
+    # unbounded priors are searched to one scale factor from their guess
+    guess = prior.scale(prior.guess)
+    if not np.isfinite(lower):
+        lower = guess - 1
+    if not np.isfinite(upper):
+        upper = guess + 1
+    return [lower, upper]
+
+
+def _surrogate_errors(points, lnprobs, bounds, best_point):
+    # curvature of a surrogate of the log-posterior itself about the best
+    # point, from the points nearest it
+    finite = np.isfinite(lnprobs)
+    points, lnprobs = points[finite], lnprobs[finite]
+    nearest = np.argsort(-lnprobs)[:max(4 * len(bounds), 10)]
+    widths = bounds[:, 1] - bounds[:, 0]
+    gp = GaussianProcess(points[nearest], lnprobs[nearest],
+                         np.column_stack([widths / 1000, widths * 10]))
+    h = widths * 1e-3
+    hessian = np.empty((len(bounds), len(bounds)))
+    for i in range(len(bounds)):
+        for j in range(len(bounds)):
+            shift_i = np.eye(len(bounds))[i] * h[i]
+            shift_j = np.eye(len(bounds))[j] * h[j]
+            f = [gp.predict(best_point + si + sj)[0][0]
+                 for si, sj in [(shift_i, shift_j), (shift_i, -shift_j),
+                                (-shift_i, shift_j), (-shift_i, -shift_j)]]
+            hessian[i, j] = (f[0] - f[1] - f[2] + f[3]) / (4 * h[i] * h[j])
+    try:
+        covariance = np.linalg.inv(-hessian)
+    except np.linalg.LinAlgError:
+        return np.zeros(len(bounds))
+    variance = np.diag(covariance)
+    return np.where(variance > 0, np.sqrt(np.abs(variance)), 0)
@@ -0,0 +1,234 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Sample multimodal posteriors by parallel tempering
+
+The sampler runs an affine-invariant ensemble (as in emcee) at each of a
+ladder of temperatures, swaps walkers between neighbouring temperatures
+and adapts the ladder so that swaps are accepted equally often
+everywhere [Vousden2016]_.
+
+.. [Vousden2016] W. D. Vousden, W. M. Farr and I. Mandel, "Dynamic
+   temperature selection for parallel tempering in Markov chain Monte
+   Carlo simulations", MNRAS 455, 1919 (2016).
+"""
+import time
+
+import numpy as np
+import xarray as xr
+
+from holopy.core.holopy_object import HoloPyObject
+from holopy.core.metadata import make_subset_data
+from holopy.core.utils import choose_pool, broadcast
+from holopy.inference.result import SamplingResult
+
+
+class ParallelTemperingStrategy(HoloPyObject):
+    """
+    Sample a posterior with an ensemble of walkers at each of ntemps
+    temperatures.
+
+    The walkers at temperature T sample prior * likelihood**(1/T). Hot
+    walkers cross between the modes of the posterior and hand their
+    positions down the ladder by swaps, so the cold (T = 1) ensemble,
+    which is what the result reports, is not stuck in the mode it
+    started in. Temperatures are spaced geometrically up to max_temp and,
+    if adapt is True, moved during the run (with a rate decaying over
+    adaptation_lag steps) so neighbouring temperatures swap equally often.
+
+    All proposals of one step, for every temperature, are evaluated
+    together through the parallel pool.
+    """
+    def __init__(self, nwalkers=100, nsamples=1000, ntemps=5, max_temp=1e3,
+                 npixels=None, walker_initial_pos=None, parallel='auto',
+                 seed=None, adapt=True, adaptation_lag=1000,
+                 adaptation_time=100):
+        self.nwalkers = nwalkers
+        self.nsamples = nsamples
+        self.ntemps = ntemps
+        self.max_temp = max_temp
+        self.npixels = npixels
+        self.walker_initial_pos = walker_initial_pos
+        self.parallel = parallel
+        self.seed = seed
+        self.adapt = adapt
+        self.adaptation_lag = adaptation_lag
+        self.adaptation_time = adaptation_time
+
+    @property
+    def initial_betas(self):
+        return self.max_temp ** -np.linspace(0, 1, self.ntemps)
+
+    def sample(self, model, data):
+        time_start = time.time()
+        if self.npixels is not None:
+            data = make_subset_data(data, pixels=self.npixels, seed=self.seed)
+        ndim = len(model._parameters)
+        if self.walker_initial_pos is None:
+            walker_initial_pos = model.generate_guess(
+                self.nwalkers * self.ntemps, seed=self.seed).reshape(
+                    (self.ntemps, self.nwalkers, ndim))
+        else:
+            walker_initial_pos = self.walker_initial_pos
+        walker_initial_pos = np.broadcast_to(
+            walker_initial_pos, (self.ntemps, self.nwalkers, ndim))
+
+        plan = model.compile_plan(data)
+        pool = choose_pool(self.parallel)
+        with broadcast(plan.lnprior_and_lnlike, pool) as lnprior_and_lnlike:
+            sampler = TemperedEnsembleSampler(
+                lnprior_and_lnlike, pool, self.initial_betas,
+                np.random.RandomState(self.seed), self.adaptation_lag,
+                self.adaptation_time)
+            sampler.run(walker_initial_pos, self.nsamples, self.adapt)
+        if pool is not self.parallel:
+            pool.close()
+
+        names = [par.name for par in model._parameters]
+        attrs = {'acceptance_fraction': sampler.acceptance_fraction}
+        samples = xr.DataArray(sampler.chain,
+                               dims=['walker', 'chain', 'parameter'],
+                               coords={'parameter': names}, attrs=attrs)
+        lnprobs = xr.DataArray(sampler.lnprobs, dims=['walker', 'chain'],
+                               attrs=attrs)
+        kwargs = {'lnprobs': lnprobs, 'samples': samples,
+                  'temperatures': [float(1 / beta) for beta in sampler.betas],
+                  'swap_acceptance_fraction':
+                      [float(f) for f in sampler.swap_acceptance_fraction]}
+        d_time = time.time() - time_start
+        return SamplingResult(data, model, self, d_time, kwargs)
+
+
+class TemperedEnsembleSampler(object):
+    """
+    Parallel-tempered ensemble sampler.
+
+    lnprior_and_lnlike maps a parameter vector to its log-prior and
+    log-likelihood and is evaluated through pool.map. After run, chain
+    and lnprobs hold the cold ensemble with the same layout as emcee's
+    get_chain() and get_log_prob().
+    """
+    def __init__(self, lnprior_and_lnlike, pool, betas, random_state,
+                 adaptation_lag=1000, adaptation_time=100, stretch=2.0):
+        self.lnprior_and_lnlike = lnprior_and_lnlike
+        self.pool = pool
+        self.betas = np.array(betas, dtype=float)
+        self.random = random_state
+        self.adaptation_lag = adaptation_lag
+        self.adaptation_time = adaptation_time
+        self.stretch = stretch
+
+    def evaluate(self, positions):
+        """
+        log-prior and log-likelihood of an array of parameter vectors,
+        each with shape positions.shape[:-1]
+        """
+        vectors = positions.reshape((-1, positions.shape[-1]))
+        results = np.array(list(self.pool.map(self.lnprior_and_lnlike,
+                                              vectors)), dtype=float)
+        shape = positions.shape[:-1]
+        return results[:, 0].reshape(shape), results[:, 1].reshape(shape)
+
+    def run(self, initial_pos, nsteps, adapt=True):
+        positions = np.array(initial_pos, dtype=float)
+        lnprior, lnlike = self.evaluate(positions)
+        ntemps, nwalkers, ndim = positions.shape
+        self.chain = np.empty((nsteps, nwalkers, ndim))
+        self.lnprobs = np.empty((nsteps, nwalkers))
+        accepted = np.zeros(ntemps)
+        swaps = np.zeros(ntemps - 1)
+        for step in range(nsteps):
+            accepted += self._stretch_move(positions, lnprior, lnlike)
+            swapped = self._swap(positions, lnprior, lnlike)
+            swaps += swapped
+            if adapt and ntemps > 2:
+                self._adapt_ladder(swapped, step)
+            self.chain[step] = positions[0]
+            self.lnprobs[step] = lnprior[0] + lnlike[0]
+        self.acceptance_fraction = float(accepted[0] / max(nsteps, 1))
+        self.swap_acceptance_fraction = swaps / max(nsteps, 1)
+        return positions
+
+    def _tempered(self, lnprior, lnlike):
+        # avoid 0 * -inf where a walker is outside the prior
+        tempered = lnprior + self.betas[:, np.newaxis] * lnlike
+        return np.where(lnprior == -np.inf, -np.inf, tempered)
+
+    def _stretch_move(self, positions, lnprior, lnlike):
+        """
+        Update each half of every ensemble in turn by the stretch move,
+        in place. Returns the fraction of walkers accepted per
+        temperature.
+        """
+        ntemps, nwalkers, ndim = positions.shape
+        halves = np.array_split(np.arange(nwalkers), 2)
+        accepted = np.zeros(ntemps)
+        for active, partners in [halves, halves[::-1]]:
+            a = self.stretch
+            z = ((a - 1) * self.random.uniform(
+                size=(ntemps, len(active))) + 1)**2 / a
+            chosen = self.random.randint(len(partners),
+                                         size=(ntemps, len(active)))
+            partner_pos = positions[:, partners][
+                np.arange(ntemps)[:, np.newaxis], chosen]
+            current = positions[:, active]
+            proposal = (partner_pos +
+                        z[..., np.newaxis] * (current - partner_pos))
+            new_prior, new_like = self.evaluate(proposal)
+            lnratio = ((ndim - 1) * np.log(z) +
+                       self._tempered(new_prior, new_like) -
+                       self._tempered(lnprior[:, active], lnlike[:, active]))
+            accept = np.log(self.random.uniform(size=lnratio.shape)) < lnratio
+            positions[:, active] = np.where(accept[..., np.newaxis],
+                                            proposal, current)
+            lnprior[:, active] = np.where(accept, new_prior,
+                                          lnprior[:, active])
+            lnlike[:, active] = np.where(accept, new_like, lnlike[:, active])
+            accepted += accept.sum(axis=1)
+        return accepted / nwalkers
+
+    def _swap(self, positions, lnprior, lnlike):
+        """
+        Propose swapping randomly paired walkers of neighbouring
+        temperatures, hottest pair first, in place. Returns the fraction
+        of swaps accepted for each pair of temperatures.
+        """
+        ntemps, nwalkers, ndim = positions.shape
+        accepted = np.zeros(ntemps - 1)
+        for i in range(ntemps - 1, 0, -1):
+            hot = self.random.permutation(nwalkers)
+            cold = self.random.permutation(nwalkers)
+            lnratio = ((self.betas[i - 1] - self.betas[i]) *
+                       (lnlike[i, hot] - lnlike[i - 1, cold]))
+            accept = np.log(self.random.uniform(size=nwalkers)) < lnratio
+            hot, cold = hot[accept], cold[accept]
+            for array in [positions, lnprior, lnlike]:
+                array[i, hot], array[i - 1, cold] = (array[i - 1, cold],
+                                                     array[i, hot])
+            accepted[i - 1] = accept.mean()
+        return accepted
+
+    def _adapt_ladder(self, swapped, step):
+        # Vousden et al. (2016): widen the temperature gap where swaps are
+        # accepted more often than above it. The coldest and hottest
+        # temperatures stay fixed.
+        kappa = (self.adaptation_lag / (step + self.adaptation_lag) /
+                 self.adaptation_time)
+        gaps = np.diff(1 / self.betas[:-1])
+        gaps *= np.exp(kappa * (swapped[:-1] - swapped[1:]))
+        self.betas[1:-1] = 1 / (np.cumsum(gaps) + 1 / self.betas[0])
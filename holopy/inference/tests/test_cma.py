@@ -16,10 +16,13 @@
 # You should have received a copy of the GNU General Public License
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
+import cma
 import numpy as np
-from numpy.testing import assert_allclose, assert_equal
+from numpy.testing import assert_allclose, assert_equal, assert_raises
 
-from holopy.inference.cmaes import run_cma, CmaStrategy
+from holopy.inference.cmaes import (run_cma, CmaStrategy,
+                                    evaluate_generation_async)
+from holopy.core.utils import WorkerPool
 from holopy.inference.model import Model
 from holopy.inference import prior
 from holopy.inference.tests.common import SimpleModel
@@ -57,3 +60,66 @@ def test_default_popsize():
     strat.fit(mod, data)
     assert_equal(strat.popsize, int(2 + npars + np.sqrt(npars)))
 
+
+def fails_above(x):
+    if x[0] > 0.8:
+        return np.inf
+    return -simplefunc(x)
+
+def raises(x):
+    raise ValueError('evaluation failed')
+
+def test_evaluate_generation_async_replaces_failures():
+    popsize = 8
+    strategy = cma.CMAEvolutionStrategy([0.8, 0.5], 0.3,
+                                        {'seed': 3, 'verbose': -9})
+    with WorkerPool(2) as pool:
+        solutions, func_vals = evaluate_generation_async(
+            strategy, fails_above, pool, popsize, oversample=2)
+    assert_equal(solutions.shape, (popsize, 2))
+    assert np.all(np.isfinite(func_vals))
+    assert_equal(func_vals, [fails_above(x) for x in solutions])
+
+def test_evaluate_generation_async_raises_errors():
+    strategy = cma.CMAEvolutionStrategy([0.5, 0.5], 0.3,
+                                        {'seed': 3, 'verbose': -9})
+    with WorkerPool(2) as pool:
+        assert_raises(ValueError, evaluate_generation_async, strategy,
+                      raises, pool, 4)
+
+class SerialAsyncPool(object):
+    def __init__(self, processes):
+        self._processes = processes
+        self.ncalls = 0
+
+    def apply_async(self, function, args, callback, error_callback):
+        self.ncalls += 1
+        callback(function(*args))
+        return SerialAsyncResult()
+
+
+class SerialAsyncResult(object):
+    def ready(self):
+        return True
+
+    def wait(self):
+        pass
+
+def test_evaluate_generation_async_oversamples_only_free_workers():
+    for workers, expected in [(4, 4), (6, 6), (20, 7)]:
+        strategy = cma.CMAEvolutionStrategy([0.5, 0.5], 0.3,
+                                            {'seed': 3, 'verbose': -9})
+        pool = SerialAsyncPool(workers)
+        pending = []
+        evaluate_generation_async(strategy, simplefunc, pool, 4,
+                                  oversample=3, pending=pending)
+        assert_equal(pool.ncalls, expected)
+        assert_equal(pending, [])
+
+def test_asynchronous_run_cma():
+    pars = [prior.Uniform(0, 1), prior.Uniform(0, 1)]
+    p0 = np.random.RandomState(1).uniform(0, 0.8, size=(10, 2))
+    with WorkerPool(2) as pool:
+        r = run_cma(fails_above, pars, p0, weightfunc, {'maxiter': 30},
+                    seed=1, parallel=pool, asynchronous=True, oversample=2)
+    assert_allclose(r.result.xbest, 0.5, atol=0.01)
@@ -17,6 +17,8 @@
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
 
+import os
+import tempfile
 import warnings
 import unittest
 
@@ -24,13 +26,16 @@ import numpy as np
 from numpy.testing import assert_equal, assert_allclose
 from nose.plugins.attrib import attr
 
-from holopy.inference import prior, TemperedStrategy
+from holopy.inference import prior, TemperedStrategy, WorkerPool
 from holopy.core.process import normalize
 from holopy.core.tests.common import assert_obj_close, get_example_data
-from holopy.scattering import Sphere, Mie
+from holopy.scattering import Sphere, Mie, calc_holo
+from holopy.core.metadata import detector_grid
 from holopy.inference import prior
-from holopy.inference.model import AlphaModel, Model, PerfectLensModel
-from holopy.inference.emcee import sample_emcee, EmceeStrategy
+from holopy.inference.model import (AlphaModel, Model, PerfectLensModel,
+                                    ExactModel)
+from holopy.inference.emcee import (sample_emcee, EmceeStrategy,
+                                    open_chain_file)
 from holopy.inference.tests.common import SimpleModel
 
 
@@ -71,8 +76,98 @@ class testEmcee(unittest.TestCase):
         r = strat.sample(mod, data)
         assert_allclose(r._parameters, .5, rtol=.001)
 
+    @attr("medium")
+    def test_vectorized_sampling_matches_serial(self):
+        detector = detector_grid(10, 0.2)
+        holo = calc_holo(detector, Sphere(n=1.59, r=0.5, center=(1, 1, 6)),
+                         1.33, 0.66, (1, 0))
+        scat = Sphere(n=prior.Uniform(1.5, 1.7), r=prior.Uniform(0.3, 0.7),
+                      center=[prior.Uniform(0.5, 1.5), prior.Uniform(0.5, 1.5),
+                              prior.Uniform(4, 8)])
+        mod = ExactModel(scat, noise_sd=0.1, medium_index=1.33,
+                         illum_wavelen=0.66, illum_polarization=(1, 0))
+        p0 = mod.generate_guess(12, seed=1)
+        serial = sample_emcee(mod, holo, 12, 5, p0, parallel=None, seed=2)
+        vectorized = sample_emcee(mod, holo, 12, 5, p0, parallel=None,
+                                  seed=2, vectorize=True)
+        assert_equal(vectorized.get_chain(), serial.get_chain())
+        assert_equal(vectorized.get_log_prob(), serial.get_log_prob())
+
+    @attr("fast")
+    def test_resume_from_chain_file(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        p0 = np.linspace(0, 1, 10).reshape((10, 1))
+        with tempfile.TemporaryDirectory() as tempdir:
+            full_file = os.path.join(tempdir, 'full.h5')
+            full = sample_emcee(mod, data, 10, 20, p0, parallel=None,
+                                seed=40, chain_file=full_file)
+            part_file = os.path.join(tempdir, 'part.h5')
+            sample_emcee(mod, data, 10, 12, p0, parallel=None, seed=40,
+                         chain_file=part_file)
+            resumed = sample_emcee(mod, data, 10, 20, p0, parallel=None,
+                                   seed=40, chain_file=part_file)
+            assert_equal(resumed.get_chain(), full.get_chain())
+            assert_equal(resumed.get_log_prob(), full.get_log_prob())
+
+    @attr("fast")
+    def test_thinned_chain_file(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        with tempfile.TemporaryDirectory() as tempdir:
+            chain_file = os.path.join(tempdir, 'chain.h5')
+            strat = EmceeStrategy(10, 20, parallel=None, seed=48,
+                                  chain_file=chain_file, thin=5)
+            strat.sample(mod, data)
+            backend = open_chain_file(chain_file, 10, 1)
+            self.assertEqual(backend.iteration, 4)
+            backend = open_chain_file(chain_file, 10, 1, resume=False)
+            self.assertEqual(backend.iteration, 0)
+
+    @attr("medium")
+    def test_stops_when_converged(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        strat = EmceeStrategy(10, 5000, parallel=None, seed=48,
+                              tau_factor=10, check_every=50)
+        r = strat.sample(mod, data)
+        convergence = r.convergence
+        self.assertTrue(convergence['converged'])
+        self.assertLess(convergence['steps'], 5000)
+        self.assertEqual(convergence['steps'], len(r.lnprobs))
+        self.assertGreater(
+            convergence['steps'],
+            10 * convergence['autocorrelation_time']['x'])
+
+    @attr("fast")
+    def test_unconverged_run_is_flagged(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        strat = EmceeStrategy(10, 20, parallel=None, seed=48,
+                              tau_factor=50, check_every=10)
+        r = strat.sample(mod, data)
+        self.assertFalse(r.convergence['converged'])
+        self.assertEqual(r.convergence['steps'], 20)
+
 
 class TestSubsetTempering(unittest.TestCase):
+    @attr("medium")
+    def test_stages_share_one_pool(self):
+        data = np.array(.5)
+        mod = SimpleModel(1)
+        with WorkerPool(2) as pool:
+            strat = TemperedStrategy(nwalkers=6, nsamples=5, stage_len=3,
+                                     parallel=pool, seed=4)
+            for stage in strat.stage_strategies:
+                # SimpleModel data has no pixels to take subsets of
+                stage.npixels = None
+            strat.sample(mod, data)
+            strat.sample(mod, data)
+            # the strategies must not have closed the shared pool
+            self.assertEqual(pool.map(abs, [-1, 2]), [1, 2])
+            for stage in strat.stage_strategies:
+                self.assertTrue(stage.parallel is pool)
+
     @attr("slow")
     def test_alpha_subset_tempering(self):
         holo = normalize(get_example_data('image0001'))
@@ -0,0 +1,130 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.plugins.attrib import attr
+
+from holopy.core import detector_grid
+from holopy.core.metadata import make_subset_data
+from holopy.core.process import local_contrast
+from holopy.core.tests.common import assert_read_matches_write
+from holopy.scattering import Sphere, Mie, calc_holo
+from holopy.inference import (
+    prior, AlphaModel, LaplaceStrategy, NmpfitStrategy, SamplingResult)
+from holopy.inference.laplace import (
+    finite_difference_hessian, gaussian_covariance)
+
+
+class MieCopy(Mie):
+    # Mie, but without the analytic derivatives
+    pass
+
+
+class TestLaplaceStrategy(unittest.TestCase):
+    def setUp(self):
+        detector = detector_grid(30, 0.1)
+        self.data = calc_holo(detector,
+                              Sphere(n=1.59, r=0.5, center=(1.5, 1.5, 8)),
+                              1.33, 0.66, (1, 0), scaling=0.8)
+        self.sphere = Sphere(n=prior.Uniform(1.5, 1.7, 1.58),
+                             r=prior.Uniform(0.3, 0.7, 0.51),
+                             center=[prior.Uniform(1, 2, 1.45),
+                                     prior.Uniform(1, 2, 1.55),
+                                     prior.Gaussian(8, 0.5)])
+
+    @attr('fast')
+    def test_finite_difference_hessian(self):
+        hessian = np.array([[-2., 0.5, 0.], [0.5, -1., 0.2], [0., 0.2, -3.]])
+
+        def quadratic(x):
+            return 0.5 * x @ hessian @ x + x.sum()
+        assert_allclose(finite_difference_hessian(
+            quadratic, np.array([0.1, 1., -2.]), np.array([1e-3] * 3)),
+            hessian, atol=1e-6)
+
+    @attr('fast')
+    def test_finite_difference_hessian_at_bounds(self):
+        lower, upper = np.array([0., -1., 0.]), np.array([1., 1., 0.5])
+
+        def cubic(x):
+            assert np.all(x >= lower) and np.all(x <= upper)
+            return x[0]**3 + x[0] * x[1] * x[2] - x[1]**2 + 2 * x[2]**3
+        values = np.array([0., 0.3, 0.5])
+        expected = np.array([[0., 0.5, 0.3], [0.5, -2., 0.], [0.3, 0., 6.]])
+        assert_allclose(finite_difference_hessian(
+            cubic, values, np.array([1e-4] * 3), lower_bounds=lower,
+            upper_bounds=upper), expected, atol=1e-6)
+
+    @attr('fast')
+    def test_covariance_needs_a_peak(self):
+        hessian = np.array([[-4., 0.], [0., -1.]])
+        assert_allclose(gaussian_covariance(hessian), [[0.25, 0], [0, 1]])
+        self.assertRaises(ValueError, gaussian_covariance, -hessian)
+        hessian[0, 0] = np.nan
+        self.assertRaises(ValueError, gaussian_covariance, hessian)
+
+    @attr('medium')
+    def test_sample(self):
+        model = AlphaModel(self.sphere, noise_sd=0.05,
+                           alpha=prior.Uniform(0.5, 1, 0.75))
+        strategy = LaplaceStrategy(nsamples=500, parallel=None, seed=1)
+        result = model.sample(self.data, strategy)
+        self.assertTrue(isinstance(result, SamplingResult))
+        best_fit = NmpfitStrategy().fit(model, self.data)
+        for name, value in best_fit.parameters.items():
+            assert_allclose(result.parameters[name], value)
+        self.assertEqual(result.samples.shape, (500, 1, 6))
+        self.assertEqual(np.argmax(result.lnprobs.values), 0)
+        errors = [interval.plus for interval in result.intervals]
+        assert_allclose(np.sqrt(np.diag(result.covariance)), errors)
+        assert_allclose(result.samples.std(dim=['walker', 'chain']), errors,
+                        rtol=0.15)
+        assert_read_matches_write(result)
+
+        # finite differences of the posterior agree with the analytic
+        # derivatives
+        model = AlphaModel(self.sphere, noise_sd=0.05, theory=MieCopy(),
+                           alpha=prior.Uniform(0.5, 1, 0.75))
+        self.assertFalse(model.compile_plan(self.data).analytic_jacobian)
+        finite = strategy.sample(model, self.data)
+        assert_allclose([interval.plus for interval in finite.intervals],
+                        errors, rtol=1e-2)
+
+    @attr('medium')
+    def test_fitted_noise(self):
+        data = self.data.copy(data=self.data.values + np.random.RandomState(
+            0).normal(0, 0.05, self.data.shape))
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.75),
+                           noise_sd=prior.Uniform(0.01, 0.2, 0.03))
+        result = LaplaceStrategy(nsamples=10, parallel=None).sample(
+            model, data)
+        assert_allclose(result.parameters['noise_sd'], 0.05, rtol=0.05)
+        self.assertTrue(result.intervals[5].plus < 0.005)
+
+        # residuals of an importance-weighted subset are weighted too
+        subset = make_subset_data(data, 400, seed=1,
+                                  weights=local_contrast(data))
+        result = LaplaceStrategy(nsamples=10, parallel=None).sample(
+            model, subset)
+        assert_allclose(result.parameters['noise_sd'], 0.05, rtol=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
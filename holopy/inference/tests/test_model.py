@@ -29,6 +29,7 @@ from nose.plugins.attrib import attr
 from numpy.testing import assert_raises
 
 from holopy.core import detector_grid, update_metadata, holopy_object
+from holopy.core.metadata import make_subset_data
 from holopy.core.tests.common import assert_equal, assert_obj_close
 from holopy.scattering import Sphere, Spheres, Mie, calc_holo
 from holopy.scattering.scatterer.scatterer import _interpret_parameters
@@ -36,9 +37,11 @@ from holopy.scattering.errors import MissingParameter
 from holopy.core.tests.common import assert_read_matches_write
 from holopy.inference import (prior, AlphaModel, ExactModel,
                               NmpfitStrategy, EmceeStrategy,
+                              ParallelTemperingStrategy,
                               available_fit_strategies,
                               available_sampling_strategies)
 from holopy.inference.model import Model, PerfectLensModel
+from holopy.inference.laplace import finite_difference_hessian
 from holopy.inference.tests.common import SimpleModel
 
 
@@ -126,10 +129,10 @@ class TestModelFittingMethods(unittest.TestCase):
                 self.assertEqual(strategy(), strategy_by_name)
 
     @attr('fast')
-    def test_parallel_tempering_not_implemented(self):
+    def test_parallel_tempering_by_name(self):
         model = Model(Sphere())
-        self.assertRaises(ValueError, model.validate_strategy,
-                          'parallel tempering', 'sample')
+        strategy = model.validate_strategy('parallel tempering', 'sample')
+        self.assertIsInstance(strategy, ParallelTemperingStrategy)
 
     @attr('medium')
     def test_model_fit_method_identical_to_strategy_method(self):
@@ -215,6 +218,203 @@ class TestPerfectLensModel(unittest.TestCase):
             lens_angle=lens_angle_xarray)
 
 
+class TestForwardPlan(unittest.TestCase):
+    def setUp(self):
+        detector = detector_grid(20, 0.1)
+        holo = calc_holo(detector, Sphere(n=1.59, r=0.5, center=(1, 1, 6)),
+                         1.33, 0.66, (1, 0), scaling=0.8)
+        self.data = update_metadata(
+            holo, medium_index=1.33, illum_wavelen=0.66,
+            illum_polarization=(1, 0), noise_sd=0.05)
+        self.sphere = Sphere(
+            n=prior.Uniform(1.5, 1.7, 1.6), r=prior.Uniform(0.3, 0.7, 0.5),
+            center=[prior.Uniform(0.5, 1.5, 1), prior.Uniform(0.5, 1.5, 1),
+                    prior.Uniform(4, 8, 6)])
+
+    def check_plan_matches_model(self, model, data=None, compiled=True):
+        data = self.data if data is None else data
+        plan = model.compile_plan(data)
+        self.assertEqual(plan.compiled, compiled)
+        values = [par.guess * 1.01 for par in model._parameters]
+        pars = {par.name: val for par, val in zip(model._parameters, values)}
+        self.assertEqual(plan.lnposterior(values),
+                         model.lnposterior(pars, data))
+        self.assertEqual(plan.lnlike(values), model.lnlike(pars, data))
+        noise = model._find_noise(pars, data)
+        np.testing.assert_equal(
+            plan.residuals(values),
+            model._residuals(pars, data, noise).ravel())
+
+    @attr('fast')
+    def test_alpha_model(self):
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8))
+        self.check_plan_matches_model(model)
+
+    @attr('fast')
+    def test_fitted_noise(self):
+        model = AlphaModel(self.sphere, alpha=0.8,
+                           noise_sd=prior.Uniform(0.01, 0.1, 0.05))
+        self.check_plan_matches_model(model)
+
+    @attr('fast')
+    def test_exact_and_perfect_lens_models(self):
+        self.check_plan_matches_model(ExactModel(self.sphere))
+        self.check_plan_matches_model(
+            PerfectLensModel(self.sphere, lens_angle=0.8))
+
+    @attr('fast')
+    def test_subset_data(self):
+        model = AlphaModel(self.sphere, alpha=0.8)
+        subset = make_subset_data(self.data, pixels=50, seed=1)
+        self.check_plan_matches_model(model, subset)
+
+    @attr('fast')
+    def test_fitted_optics_fall_back_to_model(self):
+        model = AlphaModel(self.sphere, alpha=0.8,
+                           medium_index=prior.Uniform(1.3, 1.35, 1.33))
+        self.check_plan_matches_model(model, compiled=False)
+
+    @attr('fast')
+    def test_forbidden_by_prior(self):
+        model = AlphaModel(self.sphere, alpha=0.8)
+        plan = model.compile_plan(self.data)
+        values = [0.9 if name == 'r' else par.guess
+                  for name, par in zip(plan.names, model._parameters)]
+        self.assertEqual(plan.lnposterior(values), -np.inf)
+
+    @attr('fast')
+    def test_lnposterior_many(self):
+        for noise_sd in [None, prior.Uniform(0.01, 0.1, 0.05)]:
+            model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8),
+                               noise_sd=noise_sd)
+            plan = model.compile_plan(self.data)
+            values = model.generate_guess(6, seed=1)
+            values[2, plan.names.index('r')] = 0.9
+            lnposteriors = plan.lnposterior_many(values)
+            np.testing.assert_equal(
+                lnposteriors, [plan.lnposterior(vals) for vals in values])
+            self.assertEqual(lnposteriors[2], -np.inf)
+
+    @attr('fast')
+    def test_lnprior_and_lnlike(self):
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8))
+        plan = model.compile_plan(self.data)
+        values = [par.guess * 1.01 for par in model._parameters]
+        self.assertEqual(plan.lnprior_and_lnlike(values),
+                         (plan.lnprior(values), plan.lnlike(values)))
+        values[plan.names.index('r')] = 0.9
+        self.assertEqual(plan.lnprior_and_lnlike(values), (-np.inf, 0))
+
+    @attr('fast')
+    def test_residuals_jacobian(self):
+        sphere = Sphere(n=prior.ComplexPrior(prior.Uniform(1.5, 1.7, 1.6),
+                                             prior.Uniform(0, 0.01, 0.001)),
+                        r=prior.Uniform(0.3, 0.7, 0.5),
+                        center=self.sphere.center)
+        for model in [
+                AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8)),
+                AlphaModel(sphere, alpha=0.8,
+                           noise_sd=prior.Uniform(0.01, 0.1, 0.05))]:
+            plan = model.compile_plan(self.data)
+            self.assertTrue(plan.analytic_jacobian)
+            values = np.array([par.guess * 1.01 for par in model._parameters])
+            jacobian = plan.residuals_jacobian(values)
+            for i, name in enumerate(plan.names):
+                step = np.zeros(len(values))
+                step[i] = 1e-6
+                expected = (plan.residuals(values + step) -
+                            plan.residuals(values - step)) / 2e-6
+                np.testing.assert_allclose(jacobian[:, i], expected,
+                                           rtol=1e-4, atol=1e-4, err_msg=name)
+
+    @attr('fast')
+    def test_lnlike_hessian(self):
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8),
+                           noise_sd=prior.Uniform(0.01, 0.1, 0.05))
+        plan = model.compile_plan(self.data)
+        # at the true parameters, where the Gauss-Newton terms are exact
+        values = np.array([1.59, 0.5, 1, 1, 6, 0.05, 0.8])
+        self.assertEqual(plan.names[5], 'noise_sd')
+        steps = np.array([par.unscale(1e-4) for par in model._parameters])
+        expected = finite_difference_hessian(plan.lnlike, values, steps)
+        scale = np.sqrt(np.abs(np.outer(np.diag(expected),
+                                        np.diag(expected))))
+        np.testing.assert_allclose(plan.lnlike_hessian(values) / scale,
+                                   expected / scale, atol=1e-3)
+
+    @attr('fast')
+    def test_weighted_subset(self):
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8))
+        weights = np.sqrt(model.information_map(self.data))
+        subset = make_subset_data(self.data, 40, seed=1, weights=weights)
+        self.check_plan_matches_model(model, subset)
+        plan = model.compile_plan(subset)
+        values = np.array([par.guess * 1.01 for par in model._parameters])
+        pixel_weights = subset.attrs['pixel_weights']
+        unweighted = subset.copy()
+        del unweighted.attrs['pixel_weights']
+        residuals = model.compile_plan(unweighted).residuals(values)
+        expected = (pixel_weights * (-0.5 * np.log(2 * np.pi) -
+                                     np.log(0.05) - 0.5 * residuals**2)).sum()
+        self.assertAlmostEqual(plan.lnlike(values), expected)
+        np.testing.assert_allclose(
+            plan.lnposterior_many([values, values * 1.01]),
+            [plan.lnposterior(values), plan.lnposterior(values * 1.01)])
+        jacobian = plan.residuals_jacobian(values)
+        step = np.zeros(len(values))
+        step[0] = 1e-6
+        np.testing.assert_allclose(
+            jacobian[:, 0], (plan.residuals(values + step) -
+                             plan.residuals(values - step)) / 2e-6,
+            rtol=1e-4, atol=1e-4)
+
+    @attr('fast')
+    def test_information_map(self):
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8),
+                           noise_sd=prior.Uniform(0.01, 0.1, 0.05))
+        information = model.information_map(self.data)
+        self.assertEqual(information.dims, self.data.dims)
+        self.assertEqual(information.shape, self.data.shape)
+        # one for each parameter but noise_sd
+        self.assertAlmostEqual(float(information.sum()), 6)
+
+        class MieCopy(Mie):
+            pass
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8),
+                           noise_sd=prior.Uniform(0.01, 0.1, 0.05),
+                           theory=MieCopy())
+        self.assertFalse(model.compile_plan(self.data).analytic_jacobian)
+        np.testing.assert_allclose(model.information_map(self.data),
+                                   information, rtol=1e-3, atol=1e-8)
+
+    @attr('fast')
+    def test_analytic_jacobian_only_for_single_spheres(self):
+        for model in [
+                AlphaModel(Spheres([self.sphere]), alpha=0.8),
+                AlphaModel(self.sphere, alpha=0.8,
+                           medium_index=prior.Uniform(1.3, 1.35, 1.33)),
+                PerfectLensModel(self.sphere, lens_angle=0.8)]:
+            plan = model.compile_plan(self.data)
+            self.assertFalse(plan.analytic_jacobian)
+            values = [par.guess for par in model._parameters]
+            self.assertRaises(NotImplementedError, plan.forward_jacobian,
+                              values)
+
+    @attr('fast')
+    def test_model_jacobian(self):
+        model = AlphaModel(self.sphere, alpha=prior.Uniform(0.5, 1, 0.8))
+        pars = {par.name: par.guess for par in model._parameters}
+        jacobian = model.jacobian(pars, self.data)
+        self.assertEqual(jacobian.dims, ('flat', 'parameter'))
+        self.assertEqual(list(jacobian.parameter.values),
+                         model.compile_plan(self.data).names)
+        hologram = model.forward(pars, self.data)
+        step = dict(pars, r=pars['r'] + 1e-7)
+        expected = (model.forward(step, self.data) - hologram).values / 1e-7
+        np.testing.assert_allclose(jacobian.sel(parameter='r').values,
+                                   expected.ravel(), rtol=1e-4, atol=1e-4)
+
+
 def make_sphere():
     index = prior.Uniform(1.4, 1.6)
     radius = prior.Uniform(0.2, 0.8)
@@ -31,7 +31,7 @@ from holopy.core.tests.common import (
 from holopy.scattering.errors import OverlapWarning
 from holopy.inference import (
     LimitOverlaps, ExactModel, AlphaModel, NmpfitStrategy,
-    LeastSquaresScipyStrategy)
+    LeastSquaresScipyStrategy, WorkerPool)
 from holopy.inference.prior import ComplexPrior, Uniform
 
 gold_alpha = .6497
@@ -117,6 +117,27 @@ def test_fit_random_subset():
     assert_read_matches_write(result)
 
 
+@attr('medium')
+def test_parallel_jacobian_matches_serial():
+    holo = normalize(get_example_data('image0001'))
+    s = Sphere(center=(Uniform(0, 1e-5, guess=.567e-5),
+                       Uniform(0, 1e-5, .567e-5), Uniform(1e-5, 2e-5)),
+               r=Uniform(1e-8, 1e-5, 8.5e-7), n=Uniform(1, 2, 1.59))
+    # a cluster has no analytic derivatives, so the Jacobian is found by
+    # finite differences
+    model = AlphaModel(Spheres([s]), theory=Mie(False),
+                       alpha=Uniform(.1, 1, .6))
+
+    serial = NmpfitStrategy(npixels=300, maxiter=3, seed=40).fit(model, holo)
+    with WorkerPool(2) as pool:
+        parallel = NmpfitStrategy(npixels=300, maxiter=3, seed=40,
+                                  parallel=pool).fit(model, holo)
+    assert_equal(parallel.mpfit_details.params, serial.mpfit_details.params)
+    assert_equal(parallel.mpfit_details.covar, serial.mpfit_details.covar)
+    assert_equal(parallel.mpfit_details.nfev, serial.mpfit_details.nfev)
+    assert_equal(parallel.strategy.parallel, 'external_pool')
+
+
 def test_n():
     sph = Sphere(.5, 1.6, (5,5,5))
     sch = detector_grid(shape=[100, 100], spacing=[0.1, 0.1])
@@ -26,7 +26,7 @@ import numpy as np
 from nose.plugins.attrib import attr
 
 from holopy.inference.prior import (Prior, Gaussian, Uniform, BoundedGaussian,
-    ComplexPrior, make_center_priors, updated, generate_guess)
+    ComplexPrior, make_center_priors, updated, generate_guess, recentered)
 from holopy.inference.result import UncertainValue
 from holopy.core.metadata import data_grid
 from holopy.scattering.errors import ParameterSpecificationError
@@ -91,6 +91,12 @@ class TestUniform(unittest.TestCase):
         self.assertEqual(u.lnprob(2), -np.inf)
         self.assertTrue(np.allclose(u.lnprob(1), -np.log(np.diff(bounds))))
 
+    @attr("fast")
+    def test_lnprob_array(self):
+        u = Uniform(0, 1)
+        values = np.array([-0.5, 0.5, 1.5])
+        assert_equal(u.lnprob(values), [u.lnprob(v) for v in values])
+
     @attr("fast")
     def test_sample_shape(self):
         n_samples = 7
@@ -165,6 +171,7 @@ class TestGaussian(unittest.TestCase):
         g = Gaussian(mean, 1)
         self.assertEqual(g.guess, mean)
         self.assertRaises(AttributeError, setattr, g, 'guess', 2)  # property
+        self.assertEqual(Gaussian(mean, 1, guess=2).guess, 2)
 
     @attr("fast")
     def test_prob(self):
@@ -221,6 +228,12 @@ class TestBoundedGaussian(unittest.TestCase):
         self.assertEqual(bg.lnprob(-2), -np.inf)
         self.assertEqual(bg.lnprob(3), -np.inf)
 
+    @attr("fast")
+    def test_lnprob_array(self):
+        bg = BoundedGaussian(0.5, 0.2, 0, 1)
+        values = np.array([-0.5, 0.2, 0.7, 1.5])
+        assert_equal(bg.lnprob(values), [bg.lnprob(v) for v in values])
+
     @attr("fast")
     def test_prob(self):
         mean, sd = np.random.rand(2)
@@ -493,6 +506,15 @@ def test_generate_guess():
     assert_allclose(guess2, gold2, atol=1e-5)
 
 
+def test_recentered_beyond_bound():
+    assert_equal(recentered(Uniform(0, 10), 12, step=1), Uniform(9, 10, 10))
+    assert_equal(recentered(Uniform(0, 10), -3), Uniform(0, 10, 0))
+    assert_equal(recentered(Gaussian(1, 2, 'x'), 3, step=1),
+                 Gaussian(1, 2, 'x', guess=3))
+    assert_equal(recentered(BoundedGaussian(1, 2, 0, 2), 3),
+                 BoundedGaussian(1, 2, 0, 2, guess=2))
+
+
 class TestMakeCenterPriors(unittest.TestCase):
     @property
     def image(self):
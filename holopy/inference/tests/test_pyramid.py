@@ -0,0 +1,80 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.plugins.attrib import attr
+
+from holopy.core import detector_grid
+from holopy.scattering import Sphere, calc_holo
+from holopy.inference import (
+    prior, AlphaModel, NmpfitStrategy, LeastSquaresScipyStrategy,
+    PyramidStrategy)
+
+
+class TestPyramidStrategy(unittest.TestCase):
+    def setUp(self):
+        detector = detector_grid(40, 0.1)
+        self.data = calc_holo(detector, Sphere(n=1.59, r=0.5, center=(2, 2, 8)),
+                              1.33, 0.66, (1, 0), scaling=0.8)
+        sphere = Sphere(n=prior.Uniform(1.5, 1.7, 1.57),
+                        r=prior.Uniform(0.3, 0.7, 0.48),
+                        center=[prior.Uniform(1, 3, 2.05),
+                                prior.Uniform(1, 3, 1.95),
+                                prior.Uniform(5, 12, 7.8)])
+        self.model = AlphaModel(sphere, noise_sd=0.05,
+                                alpha=prior.Uniform(0.5, 1, 0.75))
+
+    @attr('fast')
+    def test_stage_pixels(self):
+        strategy = PyramidStrategy(min_pixels=100, stages=2)
+        self.assertEqual(strategy.stage_pixels(10000), [100, 1000, 10000])
+        strategy = PyramidStrategy(npixels=2000, stages=3)
+        self.assertEqual(strategy.stage_pixels(10000),
+                         [100, 271, 737, 2000])
+
+    @attr('fast')
+    def test_model_with_guesses(self):
+        guesses = {'n': 1.6, 'r': 0.9, 'center.0': 2, 'center.1': 2,
+                   'center.2': 8, 'alpha': 0.8}
+        parameters = self.model.with_guesses(guesses).parameters
+        self.assertEqual(parameters['n'].guess, 1.6)
+        self.assertEqual(parameters['n'].lower_bound, 1.5)
+        # guesses are kept within the bounds of the priors
+        self.assertEqual(parameters['r'].guess, 0.7)
+        self.assertEqual(self.model.parameters['n'].guess, 1.57)
+
+    @attr('medium')
+    def test_fit_matches_full_fit(self):
+        for strategy in [NmpfitStrategy(), LeastSquaresScipyStrategy()]:
+            full = strategy.fit(self.model, self.data)
+            pyramid = PyramidStrategy(strategy, min_pixels=50, stages=2,
+                                      seed=1)
+            result = pyramid.fit(self.model, self.data)
+            for name, value in full.parameters.items():
+                assert_allclose(result.parameters[name], value, rtol=1e-5)
+            self.assertEqual(result.model, self.model)
+            self.assertIs(result.strategy, pyramid)
+            self.assertEqual(result.data.size, self.data.size)
+            self.assertEqual(len(result.intervals), len(full.intervals))
+
+
+if __name__ == '__main__':
+    unittest.main()
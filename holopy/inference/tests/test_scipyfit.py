@@ -5,11 +5,13 @@ import numpy as np
 from nose.plugins.attrib import attr
 
 import holopy
-from holopy.scattering import Sphere, Mie, calc_holo
+from holopy.scattering import Sphere, Spheres, Mie, calc_holo
 from holopy.core.process import normalize
+from holopy.core.utils import NonePool
 from holopy.inference import (
-    AlphaModel, LeastSquaresScipyStrategy, NmpfitStrategy)
+    AlphaModel, LeastSquaresScipyStrategy, NmpfitStrategy, WorkerPool)
 from holopy.inference.prior import Uniform
+from holopy.inference.scipyfit import ForwardDifferenceJacobian
 
 
 SPHERE = Sphere(n=1.59, r=8e-7, center=(5.7e-6, 5.7e-6, 15e-6))
@@ -56,6 +58,42 @@ class TestLeastSquaresScipyStrategy(unittest.TestCase):
             np.isclose(result.parameters['alpha'], CORRECT_ALPHA, rtol=0.1))
         self.assertEqual(model, result.model)
 
+    @attr('medium')
+    def test_parallel_fit_matches_serial(self):
+        data = make_fake_data()
+        # a cluster has no analytic derivatives, so the Jacobian is found
+        # by finite differences
+        model = make_model()
+        model = AlphaModel(Spheres([model.scatterer]), theory=model.theory,
+                           alpha=model._parameters[-1])
+
+        np.random.seed(40)
+        serial = LeastSquaresScipyStrategy(
+            npixels=300, max_nfev=3).fit(model, data)
+        with WorkerPool(2) as pool:
+            np.random.seed(40)
+            parallel = LeastSquaresScipyStrategy(
+                npixels=300, max_nfev=3, parallel=pool).fit(model, data)
+        self.assertTrue(np.array_equal(
+            serial.minimizer_info.x, parallel.minimizer_info.x))
+        self.assertTrue(np.array_equal(
+            serial.minimizer_info.jac, parallel.minimizer_info.jac))
+
+    @attr('fast')
+    def test_forward_difference_jacobian(self):
+        def residuals(x):
+            return np.array([x[0]**2, x[0] * x[1], np.sin(x[1])])
+        x = np.array([0.5, 0.])
+        jacobian = ForwardDifferenceJacobian(residuals, NonePool())
+        expected = [[1, 0], [0, 0.5], [0, 1]]
+        self.assertTrue(np.allclose(jacobian(x), expected, atol=1e-7))
+        # a Jacobian at the last point evaluated reuses its residuals
+        calls = []
+        jacobian.residuals = lambda x: calls.append(x) or residuals(x)
+        jacobian.residuals_at(x)
+        jacobian(x)
+        self.assertEqual(len(calls), 1 + len(x))
+
     @attr('medium')
     def test_fitted_parameters_similar_to_nmpfit(self):
         data = make_fake_data()
@@ -0,0 +1,119 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+from nose.plugins.attrib import attr
+
+from holopy.core import detector_grid
+from holopy.scattering import Sphere, calc_holo
+from holopy.inference import prior, AlphaModel, SurrogateStrategy
+from holopy.inference.interface import make_default_model
+from holopy.inference.surrogate import (
+    GaussianProcess, TrustRegion, propose_batch)
+
+
+class TestGaussianProcess(unittest.TestCase):
+    @attr('fast')
+    def test_interpolates_observations(self):
+        x = np.linspace(0, 1, 8)[:, np.newaxis]
+        y = np.sin(4 * x[:, 0])
+        gp = GaussianProcess(x, y, [[0.01, 10]])
+        mean, sd = gp.predict(x)
+        assert_allclose(mean, y, atol=1e-4)
+        self.assertTrue((sd < 1e-2).all())
+        mean, sd = gp.predict([[0.53]])
+        assert_allclose(mean, np.sin(4 * 0.53), atol=1e-2)
+        # uncertain far from the observations
+        self.assertTrue(gp.predict([[3]])[1] > 10 * sd)
+
+    @attr('fast')
+    def test_with_observations(self):
+        x = np.array([[0.], [1.]])
+        gp = GaussianProcess(x, [0, 1], [[0.1, 10]])
+        more = gp.with_observations([[0.5]], [3])
+        assert_allclose(more.predict([[0.5]])[0], 3, atol=1e-4)
+        assert_allclose(more.lengths, gp.lengths)
+        self.assertEqual(len(gp.x), 2)
+
+
+class TestBayesianOptimization(unittest.TestCase):
+    @attr('fast')
+    def test_trust_region(self):
+        bounds = np.array([[0., 1.], [0., 4.]])
+        region = TrustRegion(bounds, batch_size=2)
+        assert_allclose(region.around([0.5, 0.5]), [[0.1, 0.9], [0, 2.1]])
+        for i in range(3):
+            region.update(True)
+        self.assertEqual(region.length, 1.6)
+        region.update(False)
+        region.update(False)
+        self.assertEqual(region.length, 0.8)
+
+    @attr('fast')
+    def test_batch_in_region(self):
+        random = np.random.RandomState(0)
+        points = random.uniform(0, 1, (10, 2))
+        lnprobs = -((points - 0.3)**2).sum(axis=1) * 100
+        lnprobs[0] = -np.inf
+        region = np.array([[0.2, 0.6], [0.1, 0.5]])
+        batch, improvement = propose_batch(points, lnprobs, region, 3,
+                                           random)
+        self.assertEqual(batch.shape, (3, 2))
+        self.assertTrue((batch >= region[:, 0]).all())
+        self.assertTrue((batch <= region[:, 1]).all())
+        self.assertTrue(improvement > 0)
+
+    @attr('medium')
+    def test_fit(self):
+        detector = detector_grid(30, 0.1)
+        data = calc_holo(detector, Sphere(n=1.59, r=0.5, center=(1.5, 1.5, 8)),
+                         1.33, 0.66, (1, 0), scaling=0.8)
+        sphere = Sphere(n=1.59, r=0.5,
+                        center=[prior.Uniform(1, 2, 1.4),
+                                prior.Uniform(1, 2, 1.6), 8])
+        model = AlphaModel(sphere, noise_sd=0.1,
+                           alpha=prior.Uniform(0.5, 1, 0.7))
+        strategy = SurrogateStrategy(max_evaluations=40, parallel=None,
+                                     seed=1)
+        result = strategy.fit(model, data)
+        assert_allclose(result.scatterer.center, [1.5, 1.5, 8], atol=0.02)
+        assert_allclose(result.parameters['alpha'], 0.8, atol=0.05)
+        self.assertEqual(result.samples.shape[-1], 3)
+        self.assertTrue(result.samples.shape[1] <= 40)
+        self.assertEqual(result.lnprobs.max(), result.max_lnprob)
+        self.assertEqual(len(result.intervals), 3)
+
+    @attr('medium')
+    def test_fit_default_model(self):
+        # the default model has unbounded priors on the center
+        detector = detector_grid(30, 0.1)
+        data = calc_holo(detector, Sphere(n=1.59, r=0.5, center=(1.5, 1.5, 8)),
+                         1.33, 0.66, (1, 0), scaling=0.8)
+        model = make_default_model(
+            Sphere(n=1.59, r=0.5, center=(1.4, 1.5, 8)), ['x'])
+        strategy = SurrogateStrategy(max_evaluations=30, parallel=None,
+                                     seed=1)
+        result = strategy.fit(model, data)
+        assert_allclose(result.scatterer.center[0], 1.5, atol=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
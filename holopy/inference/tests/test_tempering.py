@@ -0,0 +1,82 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+import numpy as np
+from numpy.testing import assert_equal
+from nose.plugins.attrib import attr
+
+from holopy.inference import prior, ParallelTemperingStrategy
+from holopy.inference.model import Model
+from holopy.inference.result import SamplingResult
+from holopy.inference.tempering import TemperedEnsembleSampler
+from holopy.core.utils import NonePool
+
+
+class BimodalModel(Model):
+    # two narrow, well-separated modes at x = +-2
+    def __init__(self):
+        self._parameters = [prior.Uniform(-5, 5, name='x')]
+        self.constraints = []
+        self.noise_sd = 1
+
+    def lnlike(self, pars, data):
+        x = pars['x']
+        return np.logaddexp(-(x - 2)**2 / (2 * 0.05**2),
+                            -(x + 2)**2 / (2 * 0.05**2))
+
+
+class TestParallelTempering(unittest.TestCase):
+    @attr("medium")
+    def test_crosses_between_modes(self):
+        model = BimodalModel()
+        # every walker starts in the upper mode
+        initial = np.random.RandomState(1).normal(2, 0.05, (20, 1))
+        strategy = ParallelTemperingStrategy(
+            nwalkers=20, nsamples=400, ntemps=6, max_temp=1e4,
+            walker_initial_pos=initial, parallel=None, seed=3)
+        result = strategy.sample(model, np.array(0))
+        self.assertIsInstance(result, SamplingResult)
+        self.assertEqual(result.samples.shape, (400, 20, 1))
+        upper_fraction = (result.samples.values[100:] > 0).mean()
+        self.assertTrue(0.3 < upper_fraction < 0.7)
+        self.assertEqual(len(result.temperatures), 6)
+        self.assertEqual(result.temperatures[0], 1)
+        self.assertTrue(np.all(np.diff(result.temperatures) > 0))
+
+    @attr("fast")
+    def test_seed_reproduces_chain(self):
+        model = BimodalModel()
+        strategy = ParallelTemperingStrategy(
+            nwalkers=6, nsamples=10, ntemps=3, parallel=None, seed=4)
+        first = strategy.sample(model, np.array(0))
+        second = strategy.sample(model, np.array(0))
+        assert_equal(first.samples.values, second.samples.values)
+
+    @attr("fast")
+    def test_swap_keeps_walker_bookkeeping(self):
+        def lnprior_and_lnlike(x):
+            return 0., -x[0]**2
+        sampler = TemperedEnsembleSampler(
+            lnprior_and_lnlike, NonePool(), [1, 0.1, 0.01],
+            np.random.RandomState(2))
+        positions = np.random.RandomState(3).normal(size=(3, 8, 1))
+        lnprior, lnlike = sampler.evaluate(positions)
+        sampler._swap(positions, lnprior, lnlike)
+        assert_equal(lnlike, -positions[..., 0]**2)
@@ -0,0 +1,139 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+import tempfile
+
+import numpy as np
+import xarray as xr
+from numpy.testing import assert_allclose
+from nose.plugins.attrib import attr
+
+import holopy as hp
+from holopy.core import detector_grid
+from holopy.scattering import Sphere, calc_holo
+from holopy.inference import (
+    prior, AlphaModel, NmpfitStrategy, TrackingStrategy)
+
+
+class TestTrackingStrategy(unittest.TestCase):
+    def setUp(self):
+        sphere = Sphere(n=prior.Uniform(1.5, 1.7, 1.58),
+                        r=prior.Uniform(0.3, 0.7, 0.52),
+                        center=[prior.Uniform(1, 5, 2.45),
+                                prior.Uniform(1, 5, 3.05),
+                                prior.Gaussian(8, 1)])
+        self.model = AlphaModel(sphere, noise_sd=0.05,
+                                alpha=prior.Uniform(0.5, 1, 0.75))
+
+    @attr('fast')
+    def test_first_frame_uses_model(self):
+        strategy = TrackingStrategy()
+        self.assertIs(strategy.frame_model(self.model, []), self.model)
+
+    @attr('fast')
+    def test_frame_model_predicts_center(self):
+        strategy = TrackingStrategy(max_step={'center.0': 0.3,
+                                              'center.2': 0.5})
+        history = [{'n': 1.59, 'r': 0.5, 'center.0': 2.5, 'center.1': 3,
+                    'center.2': 8, 'alpha': 0.8},
+                   {'n': 1.6, 'r': 0.5, 'center.0': 2.6, 'center.1': 2.9,
+                    'center.2': 8.2, 'alpha': 0.8}]
+        parameters = strategy.frame_model(self.model, history).parameters
+        # the center moves on at constant velocity, the rest stays put
+        assert_allclose(parameters['center.0'].guess, 2.7)
+        assert_allclose(parameters['center.1'].guess, 2.8)
+        assert_allclose(parameters['n'].guess, 1.6)
+        assert_allclose([parameters['center.0'].lower_bound,
+                         parameters['center.0'].upper_bound], [2.4, 3.0])
+        # a Gaussian prior only takes the new guess
+        self.assertEqual(type(parameters['center.2']), prior.Gaussian)
+        self.assertEqual(parameters['center.2'].mu, 8)
+        assert_allclose(parameters['center.2'].guess, 8.4)
+        # parameters without a step keep the bounds of their priors
+        self.assertEqual(parameters['center.1'].lower_bound, 1)
+        self.assertEqual(parameters['n'].upper_bound, 1.7)
+        # and the model itself is unchanged
+        self.assertEqual(self.model.parameters['center.0'].guess, 2.45)
+
+        strategy.velocity = False
+        parameters = strategy.frame_model(self.model, history).parameters
+        assert_allclose(parameters['center.0'].guess, 2.6)
+
+    @attr('fast')
+    def test_frame_model_saves_its_priors(self):
+        strategy = TrackingStrategy(max_step={'center.0': 0.1})
+        history = [{'n': 1.6, 'r': 0.5, 'center.0': 2.5, 'center.1': 3,
+                    'center.2': 8.2, 'alpha': 0.8}]
+        frame_model = strategy.frame_model(self.model, history)
+        self.assertEqual(frame_model.scatterer.center[0],
+                         frame_model.parameters['center.0'])
+        self.assertNotEqual(frame_model, self.model)
+        with tempfile.NamedTemporaryFile(suffix='.h5') as tempf:
+            hp.save(tempf.name, frame_model)
+            loaded = hp.load(tempf.name)
+        self.assertEqual(loaded, frame_model)
+        self.assertEqual(loaded.parameters, frame_model.parameters)
+        self.assertEqual(loaded.parameters['alpha'].guess, 0.8)
+
+    @attr('fast')
+    def test_frame_model_near_bound(self):
+        strategy = TrackingStrategy(max_step={'center.0': 0.3})
+        history = [{'n': 1.6, 'r': 0.5, 'center.0': 4.6, 'center.1': 3,
+                    'center.2': 8, 'alpha': 0.8},
+                   {'n': 1.6, 'r': 0.5, 'center.0': 4.9, 'center.1': 3,
+                    'center.2': 8, 'alpha': 0.8}]
+        parameters = strategy.frame_model(self.model, history).parameters
+        # the prediction of 5.2 is beyond the bound of the prior at 5
+        self.assertEqual(parameters['center.0'].guess, 5)
+        assert_allclose([parameters['center.0'].lower_bound,
+                         parameters['center.0'].upper_bound], [4.7, 5])
+
+    @attr('medium')
+    def test_tracks_moving_sphere(self):
+        detector = detector_grid(40, 0.1)
+        centers = [(1.8 + 0.1 * t, 2.2 - 0.05 * t, 8) for t in range(4)]
+        frames = [calc_holo(detector, Sphere(n=1.59, r=0.5, center=center),
+                            1.33, 0.66, (1, 0), scaling=0.8)
+                  for center in centers]
+        video = xr.concat(frames, dim='time')
+        sphere = Sphere(n=prior.Uniform(1.5, 1.7, 1.58),
+                        r=prior.Uniform(0.3, 0.7, 0.52),
+                        center=[prior.Uniform(1, 3, 1.75),
+                                prior.Uniform(1, 3, 2.25),
+                                prior.Uniform(5, 12, 7.9)])
+        model = AlphaModel(sphere, noise_sd=0.05,
+                           alpha=prior.Uniform(0.5, 1, 0.75))
+        strategy = TrackingStrategy(
+            NmpfitStrategy(), max_step={'center.0': 0.3, 'center.1': 0.3})
+        results = strategy.track(model, video)
+        self.assertFalse(isinstance(results, list))
+        results = list(results)
+        self.assertEqual(len(results), len(centers))
+        for result, center in zip(results, centers):
+            assert_allclose(result.scatterer.center, center, atol=1e-3)
+        iterations = [result.mpfit_details.niter for result in results]
+        self.assertTrue(iterations[-1] < iterations[0])
+
+        # a list of frames is tracked the same way
+        results = list(strategy.track(model, frames[:2]))
+        assert_allclose(results[1].scatterer.center, centers[1], atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -469,6 +469,7 @@ Perform Levenberg-Marquardt least-squares minimization, based on MINPACK-1.
 #import numerixenv
 #numerixenv.check()
 
+import functools
 import numpy
 import types
 
@@ -663,7 +664,7 @@ class mpfit(Serializable):
                                             damp=0., maxiter=200, factor=100., nprint=1,
                                             iterfunct='default', iterkw={}, nocovar=0,
                                             fastnorm=0, rescale=0, autoderivative=1, quiet=0,
-                                            diag=None, epsfcn=None, debug=0):
+                                            diag=None, epsfcn=None, debug=0, pool=None):
         """
 Inputs:
 fcn:
@@ -794,6 +795,13 @@ parinfo
 
         Default value: None  All parameters are free and unconstrained.
 
+pool:
+        An object with a map method (such as a multiprocessing.Pool) through
+        which the perturbed parameter vectors of each finite-difference
+        Jacobian are evaluated together.  fcn must then be picklable.  The
+        Jacobian is the same as the one computed serially.
+        Default value: None  Evaluate fcn one perturbation at a time.
+
 quiet:
         Set this keyword when no textual output should be printed by MPFIT
 
@@ -1121,7 +1129,8 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
             fjac = self.fdjac2(fcn, x, fvec, step, qulim, ulim, dside,
                                                     epsfcn=epsfcn,
                                                     autoderivative=autoderivative, dstep=dstep,
-                                                    functkw=functkw, ifree=ifree, xall=self.params)
+                                                    functkw=functkw, ifree=ifree, xall=self.params,
+                                                    pool=pool)
             if (fjac is None):
                 self.errmsg = 'WARNING: premature termination by FDJAC2'
                 return
@@ -1491,7 +1500,7 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
         if (self.debug): print('Entering call...')
         if (self.qanytied): x = self.tie(x, self.ptied)
         self.nfev = self.nfev + 1
-        if (fjac == None):
+        if fjac is None:
             [status, f] = fcn(x, fjac=fjac, **functkw)
 
             if (self.damp > 0):
@@ -1504,6 +1513,19 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
             return(fcn(x, fjac=fjac, **functkw))
 
 
+    def call_many(self, fcn, xs, functkw, pool):
+        ## Same as call, for a list of parameter vectors evaluated with
+        ## pool.map. Results come back in the order of xs.
+        if (self.debug): print('Entering call_many...')
+        if (self.qanytied): xs = [self.tie(x, self.ptied) for x in xs]
+        self.nfev = self.nfev + len(xs)
+        results = list(pool.map(functools.partial(fcn, **functkw), xs))
+        if (self.damp > 0):
+            results = [[status, numpy.tanh(f/self.damp)]
+                       for status, f in results]
+        return(results)
+
+
     def enorm(self, vec):
 
         if (self.debug): print('Entering enorm...')
@@ -1537,7 +1559,8 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
 
     def fdjac2(self, fcn, x, fvec, step=None, ulimited=None, ulimit=None, dside=None,
                                     epsfcn=None, autoderivative=1,
-                                    functkw=None, xall=None, ifree=None, dstep=None):
+                                    functkw=None, xall=None, ifree=None, dstep=None,
+                                    pool=None):
 
         if (self.debug): print('Entering fdjac2...')
         machep = self.machar.machep
@@ -1554,24 +1577,21 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
         ## Compute analytical derivative if requested
         if (autoderivative == 0):
             mperr = 0
-            fjac = numpy.zeros(nall, numpy.float)
+            fjac = numpy.zeros(nall, float)
             numpy.put(fjac, ifree, 1.0)  ## Specify which parameters need derivatives
-            [status, fp] = self.call(fcn, xall, functkw, fjac=fjac)
+            [status, fp, pderiv] = self.call(fcn, xall, functkw, fjac=fjac)
+            pderiv = numpy.asarray(pderiv, dtype=float)
 
-            if len(fjac) != m*nall:
+            if status < 0 or pderiv.shape != (m, nall):
                 print('ERROR: Derivative matrix was not computed properly.')
                 return(None)
 
             ## This definition is c1onsistent with CURVEFIT
             ## Sign error found (thanks Jesus Fernandez <fernande@irm.chu-caen.fr>)
-            fjac.shape = [m,nall]
-            fjac = -fjac
+            fjac = -pderiv
 
             ## Select only the free parameters
-            if len(ifree) < nall:
-                fjac = fjac[:,ifree]
-                fjac.shape = [m, n]
-                return(fjac)
+            return(fjac[:, ifree])
 
         fjac = numpy.zeros([m, n], numpy.float)
 
@@ -1603,6 +1623,30 @@ e.g. mpfit.status, mpfit.errmsg, mpfit.params, npfit.niter, mpfit.covar.
             wh = (numpy.nonzero(mask))[0]
 
             if len(wh) > 0: numpy.put(h, wh, -numpy.take(h, wh))
+
+        if pool is not None:
+            ## Evaluate every perturbed point at once through the pool
+            points = []
+            for j in range(n):
+                xp = xall.copy()
+                xp[ifree[j]] = xp[ifree[j]] + h[j]
+                points.append(xp)
+                if abs(dside[j]) > 1:
+                    xm = xall.copy()
+                    xm[ifree[j]] = xall[ifree[j]] - h[j]
+                    points.append(xm)
+            results = iter(self.call_many(fcn, points, functkw, pool))
+            for j in range(n):
+                [status, fp] = next(results)
+                if (status < 0): return(None)
+                if abs(dside[j]) <= 1:
+                    fjac[0:,j] = (fp-fvec)/h[j]
+                else:
+                    [status, fm] = next(results)
+                    if (status < 0): return(None)
+                    fjac[0:,j] = (fp-fm)/(2*h[j])
+            return(fjac)
+
         ## Loop through parameters, computing the derivative for each
         for j in range(n):
             xp = xall.copy()
@@ -0,0 +1,111 @@
+# Copyright 2011-2019, Vinothan N. Manoharan, Thomas G. Dimiduk,
+# Rebecca W. Perry, Jerome Fung, Ryan McGorty, Anna Wang, Solomon Barkley
+#
+# This file is part of HoloPy.
+#
+# HoloPy is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# HoloPy is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Fit a model to each frame of a hologram video, starting each fit from the
+previous frames.
+"""
+import xarray as xr
+
+from holopy.core.holopy_object import HoloPyObject
+
+
+class TrackingStrategy(HoloPyObject):
+    """
+    Fit a sequence of holograms, seeding each frame with the best fit to
+    the frames before it.
+
+    The first frame is fit with the priors of the model. For every later
+    frame the guess of each parameter is its best fit in the previous
+    frame or, if velocity is True, the center is extrapolated from the two
+    previous frames at constant velocity. Parameters named in max_step are
+    limited to within max_step of that guess (and the bounds of their
+    priors), so the fit only searches as far as the scatterer can move
+    between frames.
+
+    Parameters
+    ----------
+    strategy : fit strategy or string, optional
+        Strategy used to fit each frame, as for Model.fit. Default is
+        the model's default fit strategy.
+    max_step : dict, optional
+        Largest change of each named parameter from one frame to the
+        next, e.g. {'center.0': 0.2, 'center.1': 0.2, 'center.2': 0.5}.
+        Parameters not named keep the bounds of their priors.
+    velocity : bool
+        If True (default), predict the center coordinates in each frame
+        from the change between the two frames before it.
+    frame_dim : string
+        Dimension of data enumerating the frames, if data is a single
+        DataArray. Default is 'time'.
+    """
+    def __init__(self, strategy=None, max_step=None, velocity=True,
+                 frame_dim='time'):
+        self.strategy = strategy
+        self.max_step = max_step
+        self.velocity = velocity
+        self.frame_dim = frame_dim
+
+    def track(self, model, data):
+        """
+        Fit model to each frame of data in turn
+
+        Parameters
+        ----------
+        model : :class:`~holopy.inference.model.Model` object
+            Model to fit to the first frame
+        data : xarray.DataArray or iterable of xarray.DataArray
+            The frames, either along frame_dim of one DataArray or as a
+            sequence of holograms
+
+        Yields
+        ------
+        result : :class:`FitResult`
+            The fit to each frame, as soon as it is done
+        """
+        strategy = model.validate_strategy(self.strategy, 'fit')
+        history = []
+        for frame in self._frames(data):
+            frame_model = self.frame_model(model, history)
+            result = strategy.fit(frame_model, frame)
+            history = (history + [result.parameters])[-2:]
+            yield result
+
+    def frame_model(self, model, history):
+        """
+        Model for the next frame, given the best fit parameters of (up to)
+        the two frames before it
+        """
+        if len(history) == 0:
+            return model
+        predicted = dict(history[-1])
+        if self.velocity and len(history) == 2:
+            for name in predicted:
+                if _is_center(name):
+                    predicted[name] = 2 * history[1][name] - history[0][name]
+        return model.with_guesses(predicted, self.max_step)
+
+    def _frames(self, data):
+        if isinstance(data, xr.DataArray):
+            return (data.isel({self.frame_dim: i})
+                    for i in range(len(data[self.frame_dim])))
+        return iter(data)
+
+
+def _is_center(name):
+    return name.split(':')[-1].startswith('center')
+
@@ -16,5 +16,6 @@
 # You should have received a copy of the GNU General Public License
 # along with HoloPy.  If not, see <http://www.gnu.org/licenses/>.
 
-from holopy.propagation.convolution_propagation import propagate
+from holopy.propagation.convolution_propagation import (
+    propagate, calc_holo_zsweep)
 from holopy.propagation.point_source_propagate import ps_propagate
@@ -30,9 +30,11 @@ import xarray as xr
 
 from ..core.process import fft, ifft
 from ..core.utils import ensure_array
-from ..core.metadata import update_metadata, copy_metadata
+from ..core.metadata import update_metadata, copy_metadata, get_spacing
 from ..core.process.fourier import ft_coord
 from ..scattering.errors import MissingParameter
+from ..scattering.interface import (
+    calc_holo, calc_field, interpret_theory, prep_schema)
 
 # May eventually want to have this function take a propagation model
 # so that we can do things other than convolution
@@ -113,6 +115,138 @@ def propagate(data, d, medium_index=None, illum_wavelen=None, cfsp=0,
     return copy_metadata(data, res)
 
 
+def calc_holo_zsweep(detector, scatterer, zs, medium_index=None,
+                     illum_wavelen=None, illum_polarization=None,
+                     theory='auto', scaling=1.0, padding=None,
+                     reference_z=None, estimate_error=False):
+    """
+    Calculates holograms of a scatterer at several heights by propagating
+    its scattered field.
+
+    The scattered field is calculated once, with the scatterer at
+    `reference_z`, on a padded copy of the detector. The field for each z
+    in `zs` is then found by angular-spectrum propagation of the x and y
+    field components, using the transfer function of `trans_func`, so each
+    additional height costs one FFT pair per component instead of a full
+    scattering calculation.
+
+    Parameters
+    ----------
+    detector : xarray.DataArray
+        A uniformly spaced detector grid with a single z and a single
+        illumination.
+    scatterer : :class:`.scatterer` object
+        The scatterer. Its z is replaced by each of `zs` in turn.
+    zs : list of floats
+        The z positions of the scatterer's center.
+    medium_index, illum_wavelen, illum_polarization, theory, scaling
+        As for `calc_holo`.
+    padding : int (optional)
+        Number of pixels to pad the detector by on each side when
+        calculating the reference field. The padding is smoothly tapered
+        to zero over its outer half to suppress wrap-around. Default is
+        half the larger dimension of the detector.
+    reference_z : float (optional)
+        z of the scatterer's center for the directly calculated field.
+        Default is the element of `zs` nearest their midpoint, which
+        minimizes the propagation distances.
+    estimate_error : bool (optional)
+        If True, also calculate the hologram at the z farthest from
+        `reference_z` directly and return the largest absolute
+        difference from the propagated hologram there.
+
+    Returns
+    -------
+    holos : xarray.DataArray
+        The holograms, as from `calc_holo`, stacked along a new
+        dimension 'particle_z'.
+    error : float
+        Only returned if `estimate_error` is True.
+
+    Notes
+    -----
+    The propagation is exact for the field on an infinite plane; the
+    error comes from the finite, padded window, and grows with the
+    propagation distance and the angular spread of the scattered light.
+    """
+    theory = interpret_theory(scatterer, theory)
+    uschema = prep_schema(
+        detector, medium_index, illum_wavelen, illum_polarization)
+    if len(ensure_array(uschema.illum_wavelen)) > 1:
+        raise ValueError("calc_holo_zsweep needs a single illumination")
+    if 'z' in uschema.dims and len(uschema.z) > 1:
+        raise ValueError("calc_holo_zsweep needs a detector with a single z")
+    zs = ensure_array(zs).astype('float')
+    if reference_z is None:
+        reference_z = zs[np.argmin(np.abs(zs - 0.5 * (zs.min() + zs.max())))]
+    if padding is None:
+        padding = max(len(uschema.x), len(uschema.y)) // 2
+    spacing = get_spacing(uschema)
+    med_wavelen = uschema.illum_wavelen / uschema.medium_index
+    wavevec = 2 * np.pi / med_wavelen
+
+    # Scattered field on the padded detector, with the scatterer at
+    # reference_z, tapered to 0 at the edges:
+    padded_coords = {
+        dim: (uschema[dim].values[0] + spacing[axis] *
+              np.arange(-padding, len(uschema[dim]) + padding))
+        for axis, dim in enumerate(['x', 'y'])}
+    padded_schema = uschema.reindex(padded_coords, fill_value=0)
+    shift = np.array([0, 0, reference_z - scatterer.center[2]])
+    field = calc_field(padded_schema, scatterer.translated(shift),
+                       theory=theory)
+    field = field.sel(vector=['x', 'y']).transpose('vector', 'x', 'y', ...)
+    field = field.values.reshape(field.shape[:3]) * scaling
+    taper = [_edge_taper(len(padded_coords[dim]), padding // 2)
+             for dim in ['x', 'y']]
+    field_ft = np.fft.fft2(field * np.outer(*taper), axes=(1, 2))
+
+    frequencies = [np.fft.fftfreq(len(padded_coords[dim]), spacing[axis])
+                   for axis, dim in enumerate(['x', 'y'])]
+    reference = uschema.illum_polarization.sel(vector=['x', 'y']).values
+    # calc_holo returns holograms with x and y leading
+    image = uschema.transpose('x', 'y', ...)
+    crop = (slice(None), slice(padding, padding + len(uschema.x)),
+            slice(padding, padding + len(uschema.y)))
+    holos = []
+    for z in zs:
+        # Moving the scatterer by dz propagates its field by -dz; holopy
+        # references the scattered phase to the scatterer's z, which
+        # gives the exp(-i k dz).
+        dz = z - reference_z
+        g = _trans_func_at_frequencies(
+            frequencies[0], frequencies[1], -dz, med_wavelen)
+        g = g.transpose('z', 'm', 'n').values
+        propagated = np.fft.ifft2(field_ft * g, axes=(1, 2))[crop]
+        propagated *= np.exp(-1j * wavevec * dz)
+        total = propagated + reference.reshape(2, 1, 1)
+        holo = (np.abs(total)**2).sum(axis=0)
+        holos.append(copy_metadata(
+            uschema, image.copy(data=holo.reshape(image.shape)),
+            do_coords=False))
+    holos = xr.concat(holos, dim='particle_z').assign_coords(particle_z=zs)
+
+    if not estimate_error:
+        return holos
+    farthest = zs[np.argmax(np.abs(zs - reference_z))]
+    direct = calc_holo(
+        uschema, scatterer.translated(
+            np.array([0, 0, farthest - scatterer.center[2]])),
+        theory=theory, scaling=scaling)
+    error = float(np.abs(
+        holos.sel(particle_z=farthest).values - direct.values).max())
+    return holos, error
+
+
+def _edge_taper(npts, width):
+    taper = np.ones(npts)
+    if width > 0:
+        ramp = 0.5 - 0.5 * np.cos(np.pi * (np.arange(width) + 0.5) / width)
+        taper[:width] = ramp
+        taper[npts - width:] = ramp[::-1]
+    return taper
+
+
 def trans_func(schema, d, med_wavelen, cfsp=0, gradient_filter=0):
     """
     Calculates the optical transfer function to use in reconstruction
@@ -152,6 +286,17 @@ def trans_func(schema, d, med_wavelen, cfsp=0, gradient_filter=0):
 
     .. [2] Kreis, Optical Engineering 41(8):1829, section 5
 
+    """
+    m, n = ft_coord(schema.x), ft_coord(schema.y)
+    return _trans_func_at_frequencies(
+        m, n, d, med_wavelen, cfsp=cfsp, gradient_filter=gradient_filter)
+
+
+def _trans_func_at_frequencies(m, n, d, med_wavelen, cfsp=0,
+                               gradient_filter=0):
+    """
+    The transfer function of `trans_func`, at spatial frequencies `m`
+    (along x) and `n` (along y), in any order.
     """
     if not hasattr(d, 'z'):
         d = xr.DataArray(ensure_array(d), dims=['z'], coords={'z': ensure_array(d)})
@@ -160,7 +305,6 @@ def trans_func(schema, d, med_wavelen, cfsp=0, gradient_filter=0):
         cfsp = int(abs(cfsp))  # should be nonnegative integer
         d = d / cfsp
 
-    m, n = ft_coord(schema.x), ft_coord(schema.y)
     m = xr.DataArray(m, dims='m', coords={'m': m})
     n = xr.DataArray(n, dims='n', coords={'n': n})
 
@@ -22,8 +22,8 @@ import numpy as np
 from nose.plugins.attrib import attr
 
 from holopy.core import detector_grid
-from holopy.scattering import Mie, Sphere, calc_field
-from holopy.propagation import propagate
+from holopy.scattering import Mie, Sphere, calc_field, calc_holo
+from holopy.propagation import propagate, calc_holo_zsweep
 from holopy.core.tests.common import assert_obj_close, verify, get_example_data
 
 
@@ -66,3 +66,43 @@ def test_propagate_0_distance():
 
     rec = propagate(im, [0, 3e-6])
     verify(rec, 'recon_multiple_with_0')
+
+
+@attr("medium")
+def test_zsweep_matches_direct_calculation():
+    detector = detector_grid(64, 0.1)
+    zs = [9, 9.5, 10, 10.5, 11]
+    holos = calc_holo_zsweep(detector, Sphere(1.59, .5, (3.2, 3.2, 10)), zs,
+                             1.33, .66, (1, 0), scaling=.9)
+    assert holos.dims[0] == 'particle_z'
+    for z in zs:
+        direct = calc_holo(detector, Sphere(1.59, .5, (3.2, 3.2, z)),
+                           1.33, .66, (1, 0), scaling=.9)
+        propagated = holos.sel(particle_z=z)
+        assert propagated.dims == direct.dims
+        np.testing.assert_allclose(propagated.values, direct.values,
+                                   atol=2e-3)
+
+
+@attr("fast")
+def test_zsweep_reference_plane_is_exact():
+    detector = detector_grid(32, 0.1)
+    sphere = Sphere(1.59, .5, (1.6, 1.6, 10))
+    holos = calc_holo_zsweep(detector, sphere, [9, 10, 11], 1.33, .66,
+                             (1, 0), reference_z=10)
+    direct = calc_holo(detector, sphere, 1.33, .66, (1, 0))
+    np.testing.assert_allclose(holos.sel(particle_z=10).values,
+                               direct.values, atol=1e-12)
+
+
+@attr("fast")
+def test_zsweep_estimates_error():
+    detector = detector_grid(32, 0.1)
+    sphere = Sphere(1.59, .5, (1.6, 1.6, 10))
+    holos, error = calc_holo_zsweep(detector, sphere, [9.5, 10, 11], 1.33,
+                                    .66, (1, 0), estimate_error=True)
+    assert holos.shape[0] == 3
+    direct = calc_holo(detector, Sphere(1.59, .5, (1.6, 1.6, 11)),
+                       1.33, .66, (1, 0))
+    assert_obj_close(
+        error, np.abs(holos.sel(particle_z=11).values - direct.values).max())
@@ -43,5 +43,6 @@ from holopy.scattering.scatterer import (Scatterer, Scatterers, Sphere,
     LayeredSphere, Spheres, RigidCluster, Ellipsoid, Capsule, Cylinder,
     Bisphere, Spheroid, JanusSphere_Uniform, JanusSphere_Tapered)
 from holopy.scattering.interface import (calc_holo, calc_field,
-    calc_intensity, calc_cross_sections, calc_scat_matrix)
+    calc_intensity, calc_cross_sections, calc_scat_matrix,
+    calc_holo_trajectory)
 from holopy.scattering.theory import Mie, MieLens, Multisphere, DDA, Tmatrix
@@ -26,11 +26,12 @@ from warnings import warn
 
 import xarray as xr
 import numpy as np
+from scipy import ndimage
 
 from holopy.core.holopy_object import SerializableMetaclass
 from holopy.core.metadata import (
     vector, illumination, update_metadata, to_vector, copy_metadata, from_flat,
-    dict_to_array)
+    dict_to_array, get_spacing)
 from holopy.core.utils import dict_without, ensure_array
 from holopy.scattering.scatterer import (
     Sphere, Spheres, Spheroid, Cylinder, _expand_parameters,
@@ -100,6 +101,13 @@ def finalize(detector, result):
     return copy_metadata(detector, result, do_coords=False)
 
 
+def add_calculation_attrs(result, theory, scatterer, schema, far_field=False):
+    attrs = theory._calculation_attrs(scatterer, schema, far_field)
+    if attrs:
+        result = result.assign_attrs(**attrs)
+    return result
+
+
 # Some comments on why `determine_default_theory_for` exists, rather than each
 # Scatterer class knowing what a good default theory is.
 # The problem is that the theories (Mie etc) import Sphere to see if
@@ -129,7 +137,7 @@ def determine_default_theory_for(scatterer):
 
 
 def calc_intensity(detector, scatterer, medium_index=None, illum_wavelen=None,
-                   illum_polarization=None, theory='auto'):
+                   illum_polarization=None, theory='auto', block_size=None):
     """
     Calculate intensity from the scattered field at a set of locations
 
@@ -150,20 +158,32 @@ def calc_intensity(detector, scatterer, medium_index=None, illum_wavelen=None,
         optional if there is a clear choice of theory for your scatterer.
         If there is not a clear choice, calc_intensity will error out and
         ask you to specify a theory
+    block_size : int (optional)
+        If given, the detector is calculated in blocks of about this many
+        pixels, so that peak memory scales with the block size instead of
+        the detector size. Default is to calculate all pixels at once.
     Returns
     -------
     inten : xarray.DataArray
         scattered intensity
     """
-    field = calc_field(detector, scatterer, medium_index=medium_index,
-                       illum_wavelen=illum_wavelen,
-                       illum_polarization=illum_polarization, theory=theory)
-    intensity = (np.abs(field.sel(vector=['x', 'y']))**2).sum(dim=vector)
-    return finalize(detector, intensity)
+    theory = interpret_theory(scatterer, theory)
+    uschema = prep_schema(
+        detector, medium_index=medium_index, illum_wavelen=illum_wavelen,
+        illum_polarization=illum_polarization)
+
+    def calculate(schema):
+        field = theory.calculate_scattered_field(scatterer.guess, schema)
+        intensity = (np.abs(field.sel(vector=['x', 'y']))**2).sum(dim=vector)
+        return finalize(schema, intensity)
+    return add_calculation_attrs(
+        calculate_in_blocks(calculate, uschema, block_size),
+        theory, scatterer.guess, uschema)
 
 
 def calc_holo(detector, scatterer, medium_index=None, illum_wavelen=None,
-              illum_polarization=None, theory='auto', scaling=1.0):
+              illum_polarization=None, theory='auto', scaling=1.0,
+              block_size=None):
     """
     Calculate hologram formed by interference between scattered
     fields and a reference wave
@@ -186,6 +206,11 @@ def calc_holo(detector, scatterer, medium_index=None, illum_wavelen=None,
         If there is not a clear choice, `calc_holo` will error out and
         ask you to specify a theory
     scaling : scaling value (alpha) for amplitude of reference wave
+    block_size : int (optional)
+        If given, the detector is calculated in blocks of about this many
+        pixels, so that peak memory scales with the block size instead of
+        the detector size; only the final hologram is stored for the
+        whole detector. Default is to calculate all pixels at once.
 
     Returns
     -------
@@ -204,12 +229,126 @@ def calc_holo(detector, scatterer, medium_index=None, illum_wavelen=None,
     scaling = _interpret_parameters(scaling)['alpha']
     scaling = dict_to_array(detector, scaling)
 
-    scattered_field = theory.calculate_scattered_field(
-        scatterer.guess, uschema)
-    reference_field = uschema.illum_polarization
-    holo = scattered_field_to_hologram(
-        scattered_field * scaling, reference_field)
-    return finalize(uschema, holo)
+    def calculate(schema):
+        scattered_field = theory.calculate_scattered_field(
+            scatterer.guess, schema)
+        reference_field = schema.illum_polarization
+        holo = scattered_field_to_hologram(
+            scattered_field * scaling, reference_field)
+        return finalize(schema, holo)
+    return add_calculation_attrs(
+        calculate_in_blocks(calculate, uschema, block_size),
+        theory, scatterer.guess, uschema)
+
+
+def calc_holo_trajectory(detector, scatterer, centers, medium_index=None,
+                         illum_wavelen=None, illum_polarization=None,
+                         theory='auto', scaling=1.0, interpolation_order=5):
+    """
+    Calculate holograms of a scatterer moving along a trajectory.
+
+    Translating a scatterer in x and y only translates its hologram, so
+    the hologram is calculated once for each distinct z in `centers`, on
+    a detector padded to cover every x-y position at that z. Each frame
+    is then cut out of this padded hologram, shifted by the sub-pixel
+    remainder with a spline interpolation. Frames are generated one at
+    a time, and each padded hologram is discarded after the last frame
+    that uses it.
+
+    Parameters
+    ----------
+    detector : xarray object
+        A uniformly spaced detector grid, with a single z.
+    scatterer : :class:`.scatterer` object
+        (possibly composite) scatterer to move along the trajectory
+    centers : array_like, shape (n_frames, 3)
+        The center of the scatterer in each frame.
+    medium_index : float or complex
+        Refractive index of the medium in which the scatter is imbedded
+    illum_wavelen : float or ndarray(float)
+        Wavelength of illumination light.
+    theory : :class:`.theory` object (optional)
+        Scattering theory object to use for the calculation.
+    scaling : scaling value (alpha) for amplitude of reference wave
+    interpolation_order : int (optional)
+        Order of the spline used for the sub-pixel shifts. The default
+        of 5 gives errors ~1e-6 of the hologram contrast for fringes
+        sampled by a few pixels.
+
+    Yields
+    ------
+    holo : xarray.DataArray
+        The hologram for each center in turn, as from `calc_holo`.
+    """
+    theory = interpret_theory(scatterer, theory)
+    uschema = prep_schema(
+        detector, medium_index, illum_wavelen, illum_polarization)
+    if 'z' in uschema.dims and len(uschema.z) > 1:
+        raise ValueError("Trajectories need a detector with a single z")
+    spacing = get_spacing(uschema)
+    centers = np.atleast_2d(np.asarray(centers, dtype='float'))
+
+    # Pixel shifts of each frame relative to the first frame at its z.
+    zs = centers[:, 2]
+    reference_index = {z: np.flatnonzero(zs == z)[0] for z in np.unique(zs)}
+    last_index = {z: np.flatnonzero(zs == z)[-1] for z in reference_index}
+    pixel_shifts = np.array(
+        [(center[:2] - centers[reference_index[center[2]], :2]) / spacing
+         for center in centers])
+
+    margin = 2 * interpolation_order + 4
+    padded = {}
+    for frame, (center, shift) in enumerate(zip(centers, pixel_shifts)):
+        z = center[2]
+        if z not in padded:
+            padded[z] = _calc_padded_holo(
+                uschema, scatterer.guess, centers[reference_index[z]],
+                pixel_shifts[zs == z], spacing, margin, theory, scaling)
+        padded_holo, pad_before = padded[z]
+        yield _shift_padded_holo(
+            padded_holo, pad_before, shift, margin, uschema,
+            interpolation_order)
+        if frame == last_index[z]:
+            del padded[z]
+
+
+def _calc_padded_holo(schema, scatterer, center, pixel_shifts, spacing,
+                      margin, theory, scaling):
+    # frame[i] = padded[i + pad_before - shift], so the padded grid
+    # needs the most positive shift before the detector and the most
+    # negative one after it, plus a margin for the interpolation.
+    pad_before = np.ceil(pixel_shifts.max(axis=0)).astype(int) + margin
+    pad_after = margin - np.floor(pixel_shifts.min(axis=0)).astype(int)
+    coords = {}
+    for axis, dim in enumerate(['x', 'y']):
+        n_pixels = len(schema[dim]) + pad_before[axis] + pad_after[axis]
+        coords[dim] = (schema[dim].values[0] + spacing[axis] *
+                       (np.arange(n_pixels) - pad_before[axis]))
+    padded_schema = schema.reindex(coords, fill_value=0)
+    padded_schema = padded_schema.assign_coords(**coords)
+    centered = scatterer.translated(*(center - scatterer.center))
+    holo = calc_holo(padded_schema, centered, theory=theory, scaling=scaling)
+    return holo, pad_before
+
+
+def _shift_padded_holo(padded_holo, pad_before, shift, margin, schema,
+                       order):
+    whole_pixels = np.floor(shift).astype(int)
+    start = pad_before - whole_pixels - margin
+    stop = start + np.array([len(schema.x), len(schema.y)]) + 2 * margin
+    window = padded_holo.isel(x=slice(start[0], stop[0]),
+                              y=slice(start[1], stop[1]))
+    axes = [window.dims.index('x'), window.dims.index('y')]
+    subpixel_shift = np.zeros(window.ndim)
+    subpixel_shift[axes] = shift - whole_pixels
+    shifted = ndimage.shift(
+        window.values, subpixel_shift, order=order, mode='nearest')
+    crop = [slice(None)] * window.ndim
+    for axis in axes:
+        crop[axis] = slice(margin, -margin)
+    frame = window.isel(x=slice(margin, -margin), y=slice(margin, -margin))
+    frame = frame.copy(data=shifted[tuple(crop)])
+    return frame.assign_coords(x=schema.x, y=schema.y)
 
 
 def calc_cross_sections(scatterer, medium_index=None, illum_wavelen=None,
@@ -282,11 +421,12 @@ def calc_scat_matrix(detector, scatterer, medium_index=None, illum_wavelen=None,
         detector, medium_index=medium_index, illum_wavelen=illum_wavelen,
         illum_polarization=False)
     result = theory.calculate_scattering_matrix(scatterer.guess, uschema)
-    return finalize(uschema, result)
+    return add_calculation_attrs(finalize(uschema, result), theory,
+                                 scatterer.guess, uschema, far_field=True)
 
 
 def calc_field(detector, scatterer, medium_index=None, illum_wavelen=None,
-               illum_polarization=None, theory='auto'):
+               illum_polarization=None, theory='auto', block_size=None):
     """
     Calculate the scattered fields from a scatterer illuminated by
     a reference wave.
@@ -308,6 +448,11 @@ def calc_field(detector, scatterer, medium_index=None, illum_wavelen=None,
         optional if there is a clear choice of theory for your scatterer.
         If there is not a clear choice, `calc_field` will error out and
         ask you to specify a theory
+    block_size : int (optional)
+        If given, the detector is calculated in blocks of about this many
+        pixels, so that intermediate arrays scale with the block size
+        instead of the detector size. Default is to calculate all pixels
+        at once.
 
     Returns
     -------
@@ -318,8 +463,76 @@ def calc_field(detector, scatterer, medium_index=None, illum_wavelen=None,
     uschema = prep_schema(
         detector, medium_index=medium_index, illum_wavelen=illum_wavelen,
         illum_polarization=illum_polarization)
-    result = theory.calculate_scattered_field(scatterer.guess, uschema)
-    return finalize(uschema, result)
+
+    def calculate(schema):
+        result = theory.calculate_scattered_field(scatterer.guess, schema)
+        return finalize(schema, result)
+    return add_calculation_attrs(
+        calculate_in_blocks(calculate, uschema, block_size),
+        theory, scatterer.guess, uschema)
+
+
+def calculate_in_blocks(calculate, schema, block_size=None):
+    """
+    Evaluate a calculation over a detector in blocks of pixels.
+
+    The detector is split along its first dimension ('flat', 'point' or
+    'x') into blocks of about `block_size` pixels. Each block is passed
+    through `calculate` in turn and its values are written into a
+    single output array, so only one block's intermediate arrays exist
+    at a time.
+
+    Parameters
+    ----------
+    calculate : function
+        Takes a detector xarray and returns the finalized result for it,
+        with the detector's dimensions.
+    schema : xarray object
+        The (prepared) detector to calculate over.
+    block_size : int (optional)
+        Approximate number of pixels per block. If None, `calculate` is
+        called once on the whole detector.
+
+    Returns
+    -------
+    result : xarray.DataArray
+        Same as ``calculate(schema)``.
+    """
+    if block_size is None:
+        return calculate(schema)
+    dim = next(d for d in ['flat', 'point', 'x'] if d in schema.dims)
+    if dim == 'x' and not schema.indexes['x'].is_monotonic_increasing:
+        # unstacking sorts x, so blocks must be taken in sorted order
+        schema = schema.sortby('x')
+    n_total = schema.sizes[dim]
+    pixels_per_slice = schema.size // n_total
+    step = max(1, int(block_size) // pixels_per_slice)
+
+    values = None
+    for start in range(0, n_total, step):
+        block = calculate(schema.isel({dim: slice(start, start + step)}))
+        if values is None:
+            axis = block.dims.index(dim)
+            shape = list(block.shape)
+            shape[axis] = n_total
+            values = np.empty(shape, dtype=block.dtype)
+            template = block
+        index = [slice(None)] * values.ndim
+        index[axis] = slice(start, start + step)
+        values[tuple(index)] = block.values
+
+    levels = []
+    if dim in schema.indexes and schema.indexes[dim].nlevels > 1:
+        levels = schema.indexes[dim].names
+    coords = {}
+    for name, coord in template.coords.items():
+        if dim not in coord.dims:
+            coords[name] = coord
+        elif name not in levels:
+            coords[name] = schema[name]
+    result = xr.DataArray(values, dims=template.dims, coords=coords,
+                          attrs=template.attrs, name=template.name)
+    return result
 
 
 # this is pulled out separate from the calc_holo method because
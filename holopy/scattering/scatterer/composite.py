@@ -31,6 +31,7 @@ import warnings
 import numpy as np
 
 from holopy.scattering.scatterer.scatterer import Scatterer
+from holopy.core.holopy_object import HoloPyObject
 from holopy.core.math import rotate_points
 from holopy.core.utils import ensure_array, dict_without
 
@@ -216,6 +217,22 @@ class Scatterers(Scatterer):
         self_dict['scatterers'] = scatterers
         return type(self)(**self_dict)
 
+    def compile_parameters(self, names, overwrite=False):
+        """
+        Compile a fast equivalent of from_parameters for fixed names
+
+        See Scatterer.compile_parameters. Ties are resolved and each name
+        is routed to its component scatterers once, here.
+        """
+        return ScatterersParameterMap(self, names, overwrite)
+
+    def _with_scatterers(self, scatterers):
+        # Like from_parameters' type(self)(**self_dict), for components that
+        # came from a ScatterersParameterMap and so already satisfy the ties
+        new = copy(self)
+        new.scatterers = scatterers
+        return new
+
     def _prettystr(self, level, indent="  "):
         '''
         Generate pretty string representation of object by recursion.
@@ -313,3 +330,36 @@ class Scatterers(Scatterer):
         new = copy(self)
         new.scatterers = [s.select(keys) for s in self.scatterers]
         return new
+
+
+class ScatterersParameterMap(HoloPyObject):
+    """
+    ParameterMap for Scatterers: values are routed to a compiled map for
+    each component, following the template's ties.
+    """
+    def __init__(self, template, names, overwrite=False):
+        self.template = template
+        self.names = list(names)
+        self.overwrite = overwrite
+        sources = {}
+        for i, name in enumerate(self.names):
+            sources[name] = i
+        for tied_name, raw_names in template.ties.items():
+            if tied_name in sources:
+                sources.update({raw: sources[tied_name] for raw in raw_names})
+        component_names = [[] for scatterer in template.scatterers]
+        self._indices = [[] for scatterer in template.scatterers]
+        for key, i in sources.items():
+            parts = key.split(':', 1)
+            if len(parts) == 2:
+                component_names[int(parts[0])].append(parts[1])
+                self._indices[int(parts[0])].append(i)
+        self._maps = [
+            scatterer.compile_parameters(component_names[n], overwrite)
+            for n, scatterer in enumerate(template.scatterers)]
+
+    def __call__(self, values):
+        scatterers = [
+            parameter_map([values[i] for i in indices])
+            for parameter_map, indices in zip(self._maps, self._indices)]
+        return self.template._with_scatterers(scatterers)
@@ -249,6 +249,27 @@ class CenteredScatterer(Scatterer):
                     all_pars[key] = parameters[key]
         return type(self)(**_interpret_parameters(all_pars))
 
+    def compile_parameters(self, names, overwrite=False):
+        """
+        Compile a fast equivalent of from_parameters for fixed names
+
+        Parameters
+        ----------
+        names: list of str
+            Parameter names, of the form returned by Scatterer.parameters
+        overwrite: boolean
+            As for from_parameters
+
+        Returns
+        -------
+        parameter_map: callable
+            parameter_map(values) returns the same scatterer as
+            self.from_parameters(dict(zip(names, values)), overwrite), but
+            the parameter names are parsed once, here, instead of on
+            every call.
+        """
+        return ParameterMap(self, names, overwrite)
+
     def select(self, keys):
         """
         Select certain parts of a Scatterer with multiple parameter values
@@ -276,6 +297,97 @@ class CenteredScatterer(Scatterer):
         return type(self)(**params)
 
 
+class ParameterMap(HoloPyObject):
+    """
+    Builds scatterers like template.from_parameters from value sequences
+
+    The layout of the template's parameters is compiled into a tree of
+    slot indices (mirroring _interpret_parameters) when the map is made,
+    so that a call only copies a list of slot values, writes the new
+    values into it by index and calls the scatterer's constructor.
+    """
+    def __init__(self, template, names, overwrite=False):
+        self.template = template
+        self.names = list(names)
+        self.overwrite = overwrite
+        all_pars = template.parameters
+        keys = list(all_pars.keys())
+        self._slots = [val.guess if hasattr(val, 'guess') else val
+                       for val in all_pars.values()]
+        self._targets = [
+            (i, keys.index(name)) for i, name in enumerate(self.names)
+            if name in all_pars and
+            (not isinstance(all_pars[name], Number) or overwrite)]
+        self._layout = _compile_layout(
+            {key: slot for slot, key in enumerate(keys)})
+
+    def __call__(self, values):
+        slots = list(self._slots)
+        for i, slot in self._targets:
+            slots[slot] = values[i]
+        return type(self.template)(**_fill_layout(self._layout, slots))
+
+
+class FallbackParameterMap(HoloPyObject):
+    """
+    ParameterMap interface for scatterers whose from_parameters cannot be
+    compiled; each call goes through from_parameters.
+    """
+    def __init__(self, template, names, overwrite=False):
+        self.template = template
+        self.names = list(names)
+        self.overwrite = overwrite
+
+    def __call__(self, values):
+        return self.template.from_parameters(
+            dict(zip(self.names, values)), self.overwrite)
+
+
+def _compile_layout(slots):
+    # Same parsing as _interpret_parameters, but on a dict of
+    # {key: slot index}, returning a tree that _fill_layout evaluates.
+    layout = {}
+    subkeys = set(
+        [key.split('.', 1)[0].split(':', 1)[0] for key in slots.keys()])
+    for subkey in subkeys:
+        if subkey in slots.keys():
+            layout[subkey] = slots[subkey]
+            continue
+        clip = len(subkey)
+        for delimchar in '.:':
+            subset = {key[clip+1:]: slot for key, slot in slots.items()
+                      if key.startswith(subkey + delimchar)}
+            if len(subset) > 0:
+                break
+        if len(subset) == 0:
+            msg = "Cannot interpret parameter {0}.".format(subkey)
+            raise ParameterSpecificationError(msg)
+        sublayout = _compile_layout(subset)[1]
+        if delimchar == '.' and '0' in sublayout.keys():
+            layout[subkey] = (
+                'list', [sublayout[str(i)] for i in range(len(sublayout))])
+        elif delimchar == '.' and set(sublayout.keys()) == {'real', 'imag'}:
+            layout[subkey] = ('complex', sublayout['real'],
+                              sublayout['imag'])
+        else:
+            layout[subkey] = ('dict', sublayout)
+    return ('dict', layout)
+
+
+def _fill_layout(layout, slots):
+    if isinstance(layout, int):
+        return slots[layout]
+    kind = layout[0]
+    if kind == 'dict':
+        return {key: _fill_layout(sub, slots)
+                for key, sub in layout[1].items()}
+    elif kind == 'list':
+        return [_fill_layout(sub, slots) for sub in layout[1]]
+    else:
+        return (1.0 * _fill_layout(layout[1], slots) +
+                1.0j * _fill_layout(layout[2], slots))
+
+
 def _interpret_parameters(raw_pars, keep_priors = False):
 # doesn't really have anything to do with scatterer - shouldn't be in this file
     out_dict = {}
@@ -32,6 +32,7 @@ from numbers import Number
 
 from holopy.scattering.scatterer.sphere import Sphere
 from holopy.scattering.scatterer.composite import Scatterers
+from holopy.scattering.scatterer.scatterer import FallbackParameterMap
 from holopy.scattering.errors import OverlapWarning, InvalidScatterer
 from holopy.core.math import cartesian_distance, rotate_points
 from holopy.core.utils import ensure_array, dict_without, ensure_listlike
@@ -73,6 +74,12 @@ class Spheres(Scatterers):
         if self.overlaps and self.warn:
             warnings.warn(OverlapWarning(self, self.overlaps))
 
+    def _with_scatterers(self, scatterers):
+        new = super()._with_scatterers(scatterers)
+        if new.overlaps and new.warn:
+            warnings.warn(OverlapWarning(new, new.overlaps))
+        return new
+
     @property
     def overlaps(self):
         overlaps = []
@@ -178,3 +185,6 @@ class RigidCluster(Spheres):
         spheres = self.spheres.from_parameters(parameters, overwrite)
         return spheres.rotated(rotation).translated(translation)
 
+    def compile_parameters(self, names, overwrite=False):
+        return FallbackParameterMap(self, names, overwrite)
+
@@ -30,6 +30,7 @@ from nose.plugins.attrib import attr
 from holopy.scattering import (Sphere, Spheres, Mie, Multisphere,
                                Spheroid, Cylinder, Tmatrix)
 from holopy.core import detector_grid
+from holopy.core.metadata import detector_points, make_subset_data
 from holopy.core.tests.common import assert_obj_close
 from holopy.scattering.interface import *
 from holopy.scattering.errors import MissingParameter
@@ -194,5 +195,103 @@ class TestInterpretTheory(unittest.TestCase):
         theory_ok = type(theory) == Mie
         self.assertTrue(theory_ok)
 
+class TestCalculateInBlocks(unittest.TestCase):
+    detector = detector_grid(shape=(12, 7), spacing=0.5)
+    scatterer = Sphere(n=1.6, r=.5, center=(3, 2, 5))
+
+    def _check_blocks_match(self, calc_func, detector, **kwargs):
+        whole = calc_func(detector, self.scatterer, MED_INDEX, WAVELEN, POL,
+                          **kwargs)
+        for block_size in [1, 10, 29, 10000]:
+            blocked = calc_func(detector, self.scatterer, MED_INDEX, WAVELEN,
+                                POL, block_size=block_size, **kwargs)
+            self.assertTrue(whole.equals(blocked))
+            self.assertEqual(whole.dims, blocked.dims)
+            self.assertEqual(set(whole.attrs), set(blocked.attrs))
+
+    @attr('fast')
+    def test_calc_holo_in_blocks_same_as_whole(self):
+        self._check_blocks_match(calc_holo, self.detector, scaling=0.8)
+
+    @attr('fast')
+    def test_calc_field_in_blocks_same_as_whole(self):
+        self._check_blocks_match(calc_field, self.detector)
+
+    @attr('fast')
+    def test_calc_intensity_in_blocks_same_as_whole(self):
+        self._check_blocks_match(calc_intensity, self.detector)
+
+    @attr('fast')
+    def test_blocks_of_flattened_detector(self):
+        subset = make_subset_data(self.detector, pixels=30, seed=2)
+        self._check_blocks_match(calc_holo, subset)
+
+    @attr('fast')
+    def test_blocks_of_detector_points(self):
+        points = detector_points(
+            x=np.linspace(0, 4, 25), y=np.linspace(0, 2, 25), z=np.zeros(25))
+        self._check_blocks_match(calc_holo, points)
+
+    @attr('fast')
+    def test_blocks_calculate_each_pixel_once(self):
+        calls = []
+
+        def calculate(schema):
+            calls.append(schema.size)
+            return schema.astype('float')
+        schema = self.detector
+        result = calculate_in_blocks(calculate, schema, block_size=20)
+        self.assertEqual(sum(calls), schema.size)
+        self.assertTrue(max(calls) <= 20)
+        self.assertTrue(result.equals(schema.astype('float')))
+
+
+class TestCalcHoloTrajectory(unittest.TestCase):
+    detector = detector_grid(shape=(30, 24), spacing=0.1)
+    scatterer = Sphere(n=1.59, r=.5, center=(1.5, 1.2, 8))
+    centers = np.array([[1.5, 1.2, 8.], [1.63, 1.07, 8.], [1.21, 1.55, 8.],
+                        [1.4, 1.3, 9.], [1.77, 1.01, 8.]])
+
+    @attr('medium')
+    def test_frames_same_as_calc_holo(self):
+        frames = calc_holo_trajectory(
+            self.detector, self.scatterer, self.centers, MED_INDEX, WAVELEN,
+            POL, scaling=0.9)
+        for center, frame in zip(self.centers, frames):
+            holo = calc_holo(
+                self.detector, self.scatterer.translated(
+                    *(center - self.scatterer.center)),
+                MED_INDEX, WAVELEN, POL, scaling=0.9)
+            self.assertEqual(frame.dims, holo.dims)
+            self.assertTrue(np.allclose(frame.x, holo.x))
+            self.assertTrue(np.allclose(frame.y, holo.y))
+            self.assertTrue(np.allclose(frame.values, holo.values,
+                                        atol=1e-5, rtol=0))
+
+    @attr('fast')
+    def test_calculates_once_per_distinct_z(self):
+        calls = []
+
+        class CountingMie(Mie):
+            def _raw_fields(self, *args, **kwargs):
+                calls.append(1)
+                return super()._raw_fields(*args, **kwargs)
+
+        frames = calc_holo_trajectory(
+            self.detector, self.scatterer, self.centers, MED_INDEX, WAVELEN,
+            POL, theory=CountingMie())
+        self.assertEqual(len(calls), 0)
+        self.assertEqual(len(list(frames)), len(self.centers))
+        self.assertEqual(len(calls), 2)
+
+    @attr('fast')
+    def test_raises_error_for_multiple_detector_z(self):
+        detector = detector_grid(shape=4, spacing=0.1)
+        detector = detector.reindex(z=[0, 1.0], fill_value=0)
+        frames = calc_holo_trajectory(
+            detector, self.scatterer, self.centers, MED_INDEX, WAVELEN, POL)
+        self.assertRaises(ValueError, next, frames)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -42,7 +42,7 @@ import numpy as np
 from numpy import sqrt, dot, pi, conj, real, imag, exp
 from nose.plugins.attrib import attr
 from nose.plugins.skip import SkipTest
-from scipy.special import spherical_jn, spherical_yn
+from scipy.special import spherical_jn, spherical_yn, jv, yv
 
 from holopy.core.utils import SuppressOutput
 from holopy.scattering.theory.mie_f import (
@@ -331,6 +331,31 @@ def test_dn1_lentz():
         lentz_illconditioned = mieangfuncs.lentz_dn1(z, nstop, 1., eps2)
         assert_allclose(lentz_illconditioned, lentz_start, rtol = 1e-12)
 
+@attr('fast')
+def test_riccati_psi_xi_large_x():
+    for x in [2e3, 8e3]:
+        nstop = miescatlib.nstop(x)
+        psi, xi = mie_specfuncs.riccati_psi_xi(x, nstop)
+        n = np.arange(nstop + 1)
+        psi_ref = sqrt(pi * x / 2) * jv(n + 0.5, x)
+        chi_ref = sqrt(pi * x / 2) * yv(n + 0.5, x)
+        assert_allclose(psi, psi_ref, rtol=0, atol=1e-9)
+        assert_allclose(xi.imag, chi_ref, rtol=1e-7)
+        assert np.isfinite(miescatlib.scatcoeffs(1.05 + 1e-4j, x, nstop)).all()
+
+
+@attr('fast')
+def test_sbesjy_up():
+    x = 2.5e4
+    lmax = 2000
+    n = np.arange(lmax + 1)
+    j, y, jp, yp = mieangfuncs.sbesjy_up(x, lmax)
+    assert_allclose(j, spherical_jn(n, x), rtol=0, atol=1e-16)
+    assert_allclose(y, spherical_yn(n, x), rtol=0, atol=1e-16)
+    assert_allclose(jp, spherical_jn(n, x, True), rtol=0, atol=1e-16)
+    assert_allclose(yp, spherical_yn(n, x, True), rtol=0, atol=1e-16)
+
+
 @attr("fast")
 def test_asm():
     centers = np.array([[ 0.,  0.,  1.], [ 0.,  0., -1.]])
@@ -33,6 +33,7 @@ from nose.plugins.attrib import attr
 from holopy.scattering.scatterer import (
     Sphere, Spheres, Ellipsoid, LayeredSphere)
 from holopy.scattering.theory import Mie
+from holopy.scattering.theory.mie_f import miescatlib
 from holopy.scattering.errors import TheoryNotCompatibleError, InvalidScatterer
 from holopy.core.metadata import (
     detector_grid, detector_points, to_vector, update_metadata)
@@ -65,6 +66,22 @@ def test_single_sphere():
     # large radius (calculation not attempted because it would take forever
     assert_raises(InvalidScatterer, calc_holo, xschema, Sphere(r=1, n = 1.59, center = (5,5,5)), medium_index=index, illum_wavelen=wavelen)
 
+@attr('fast')
+def test_size_parameter_beyond_1000():
+    # x is about 5000; large-particle extinction efficiency tends to 2
+    radius = 4e-4
+    large_sphere = Sphere(n=1.40, r=radius, center=(1e-5, 1e-5, 5e-3))
+    cross_sections = calc_cross_sections(
+        large_sphere, index, wavelen, xpolarization)
+    assert_allclose(cross_sections[2] / (np.pi * radius**2), 2, rtol=2e-2)
+    holo = calc_holo(detector_grid(4, 1e-5), large_sphere, index, wavelen,
+                     xpolarization)
+    assert np.isfinite(holo.values).all()
+    assert_raises(InvalidScatterer, calc_holo, xschema,
+                  Sphere(r=2e-3, n=1.59, center=(5, 5, 5)),
+                  medium_index=index, illum_wavelen=wavelen)
+
+
 @attr('medium')
 def test_farfield_holo():
     # Tests that a far field calculation gives a hologram that is
@@ -390,3 +407,117 @@ def test_j0_roots():
     h_close = calc_field(d,s_close)
 
     np.testing.assert_allclose(h_exact, h_close)
+
+
+@attr('medium')
+def test_threaded_fields_same_as_serial():
+    serial = calc_field(xschema, sphere, index, wavelen, xpolarization,
+                        theory=Mie(n_threads=1))
+    threaded = calc_field(xschema, sphere, index, wavelen, xpolarization,
+                          theory=Mie(n_threads=3))
+    everything = calc_field(xschema, sphere, index, wavelen, xpolarization,
+                            theory=Mie(n_threads='all'))
+    assert_equal(serial.values, threaded.values)
+    assert_equal(serial.values, everything.values)
+
+
+@attr('fast')
+def test_truncated_expansion_within_tolerance():
+    big_sphere = Sphere(n=1.59, r=1e-6, center=(5e-6, 5e-6, 20e-6))
+    detector = detector_grid(32, 0.3e-6)
+    full = calc_holo(detector, big_sphere, index, wavelen, xpolarization,
+                     theory=Mie())
+    all_orders = Mie()._scat_coeffs(
+        big_sphere, 2 * np.pi * index / wavelen, index).shape[1]
+    for tolerance in [1e-2, 1e-4]:
+        theory = Mie(truncation_tolerance=tolerance)
+        truncated = calc_holo(detector, big_sphere, index, wavelen,
+                              xpolarization, theory=theory)
+        assert truncated.attrs['multipole_order'] < all_orders
+        assert np.abs(truncated - full).max() < tolerance * full.max()
+        assert_equal(theory, Mie(truncation_tolerance=tolerance))
+
+
+@attr('fast')
+def test_truncated_order_reported_by_each_calculation():
+    big_sphere = Sphere(n=1.59, r=1e-6, center=(5e-6, 5e-6, 20e-6))
+    detector = detector_grid(32, 0.3e-6)
+    coarse = calc_holo(detector, big_sphere, index, wavelen, xpolarization,
+                       theory=Mie(truncation_tolerance=1e-2))
+    theory = Mie(truncation_tolerance=1e-6)
+    fine = calc_holo(detector, big_sphere, index, wavelen, xpolarization,
+                     theory=theory)
+    assert coarse.attrs['multipole_order'] < fine.attrs['multipole_order']
+    for calculated in [
+            calc_field(detector, big_sphere, index, wavelen, xpolarization,
+                       theory=theory),
+            calc_intensity(detector, big_sphere, index, wavelen,
+                           xpolarization, theory=theory),
+            calc_scat_matrix(detector, big_sphere, index, wavelen,
+                             theory=theory)]:
+        assert_equal(calculated.attrs['multipole_order'],
+                     fine.attrs['multipole_order'])
+
+
+@attr('fast')
+def test_truncation_tolerance_none_uses_all_orders():
+    theory = Mie()
+    holo = calc_holo(xschema, sphere, index, wavelen, xpolarization,
+                     theory=theory)
+    scat_coeffs = theory._scat_coeffs(sphere, 2 * np.pi * index / wavelen,
+                                      index)
+    x = 2 * np.pi * index / wavelen * sphere.r
+    assert_equal(theory._truncate_scat_coeffs(scat_coeffs, 1.), scat_coeffs)
+    assert scat_coeffs.shape[1] >= x
+    assert 'multipole_order' not in holo.attrs
+
+
+@attr('fast')
+def test_scat_coeff_derivatives():
+    m, x = 1.59 / 1.33 + 1e-3j, 8.
+    nstop = miescatlib.nstop(x)
+    coeffs = miescatlib.scatcoeffs_derivatives(m, x, nstop)
+    assert_equal(coeffs[0], miescatlib.scatcoeffs(m, x, nstop))
+    h = 1e-6
+    d_dx = (miescatlib.scatcoeffs(m, x + h, nstop) -
+            miescatlib.scatcoeffs(m, x - h, nstop)) / (2 * h)
+    d_dm = (miescatlib.scatcoeffs(m + h, x, nstop) -
+            miescatlib.scatcoeffs(m - h, x, nstop)) / (2 * h)
+    assert_allclose(coeffs[1], d_dx, atol=1e-8)
+    assert_allclose(coeffs[2], d_dm, atol=1e-8)
+
+
+@attr('fast')
+def test_raw_field_derivatives():
+    wavevec = 2 * np.pi / (wavelen / index)
+    pol = to_vector((1, 0.3))
+    center = np.array([5e-6, 5.5e-6, 10e-6])
+    detector = detector_points(x=[4e-6, 5e-6, 6.5e-6], y=[5e-6, 3e-6, 7e-6],
+                               z=0)
+    for theory in [Mie(), Mie(False, False)]:
+        def fields(scatterer, shift=np.zeros(3)):
+            positions = theory._transform_to_desired_coordinates(
+                detector, scatterer.center - shift, wavevec=wavevec)
+            return np.array(theory._raw_fields(
+                positions, scatterer, wavevec, index, pol))
+
+        sphere = Sphere(r=5e-7, n=1.59, center=center)
+        positions = theory._transform_to_desired_coordinates(
+            detector, center, wavevec=wavevec)
+        field, gradient, dfield_dr, dfield_dn = theory._raw_field_derivatives(
+            positions, sphere, wavevec, index, pol)
+        assert_allclose(field, fields(sphere), rtol=1e-6)
+
+        dr, dn, du = 1e-12, 1e-6, 1e-4
+        fd_dr = (fields(Sphere(r=sphere.r + dr, n=1.59, center=center)) -
+                 fields(Sphere(r=sphere.r - dr, n=1.59, center=center)))
+        fd_dn = (fields(Sphere(r=sphere.r, n=1.59 + dn, center=center)) -
+                 fields(Sphere(r=sphere.r, n=1.59 - dn, center=center)))
+        assert_allclose(dfield_dr, fd_dr / (2 * dr), rtol=1e-5, atol=1e-2)
+        assert_allclose(dfield_dn, fd_dn / (2 * dn), rtol=1e-5, atol=1e-8)
+        for i, sign in enumerate([1, 1, -1]):
+            # the positions are kx, ky and -kz relative to the sphere
+            shift = np.zeros(3)
+            shift[i] = sign * du / wavevec
+            fd_du = (fields(sphere, shift) - fields(sphere, -shift)) / (2 * du)
+            assert_allclose(gradient[i], fd_du, rtol=1e-5, atol=1e-9)
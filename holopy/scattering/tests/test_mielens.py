@@ -27,7 +27,7 @@ import unittest
 import numpy as np
 from nose.plugins.attrib import attr
 
-from holopy.core.metadata import detector_grid
+from holopy.core.metadata import detector_grid, detector_points
 from holopy.scattering.theory import Mie, MieLens, mielensfunctions
 from holopy.scattering.scatterer import Sphere, Spheres
 from holopy.scattering.interface import calc_holo
@@ -51,13 +51,77 @@ class TestMieLens(unittest.TestCase):
         self.assertTrue(holo is not None)
 
     @attr("fast")
-    def test_raises_error_if_multiple_z_values(self):
+    def test_raw_fields_accepts_multiple_z_values(self):
         theory = MieLens()
         np.random.seed(10)
         positions = np.random.randn(3, 10)  # the zs will differ by chance
-        self.assertRaises(
-            ValueError, theory._raw_fields, positions, sphere, 1.0, 1.33,
-            xschema.illum_polarization)
+        positions[0] = np.abs(positions[0])
+        fields = theory._raw_fields(
+            positions, sphere, 1.0, 1.33, xschema.illum_polarization)
+        self.assertEqual(fields.shape, (3, 10))
+        self.assertTrue(np.all(np.isfinite(fields)))
+
+    @attr("medium")
+    def test_multiple_z_planes_same_as_separate_planes(self):
+        theory = MieLens()
+        zs = [-5.0, 0.0, 7.5]
+        plane = detector_grid(8, 0.5)
+        x_plane = np.ravel(plane.x.values.reshape(-1, 1) + 0 * plane.y.values)
+        y_plane = np.ravel(0 * plane.x.values.reshape(-1, 1) + plane.y.values)
+        detector = detector_points(
+            x=np.tile(x_plane, len(zs)), y=np.tile(y_plane, len(zs)),
+            z=np.repeat(zs, x_plane.size))
+        scatterer = Sphere(n=1.59, r=0.5, center=(1.0, 1.5, 10.0))
+
+        holo_stack = calc_holo(
+            detector, scatterer, medium_index=1.33, illum_wavelen=0.66,
+            illum_polarization=(1, 0), theory=theory)
+        holo_planes = []
+        for z in zs:
+            this_detector = detector_points(x=x_plane, y=y_plane, z=z)
+            holo_planes.append(calc_holo(
+                this_detector, scatterer, medium_index=1.33,
+                illum_wavelen=0.66, illum_polarization=(1, 0),
+                theory=theory).values)
+        self.assertTrue(np.allclose(
+            holo_stack.values, np.concatenate(holo_planes), **TOLS))
+
+    @attr("medium")
+    def test_accuracy_setting_agrees_with_default_calculation(self):
+        theory_default = MieLens()
+        theory_tuned = MieLens(accuracy=1e-6)
+        holo_default = calc_holo(xschema, sphere, index, wavelen,
+                                 xpolarization, theory=theory_default)
+        holo_tuned = calc_holo(xschema, sphere, index, wavelen,
+                               xpolarization, theory=theory_tuned)
+        self.assertTrue(np.allclose(
+            holo_default.values, holo_tuned.values, atol=1e-5, rtol=0))
+
+    @attr("medium")
+    def test_accuracy_tuning_is_recorded_and_reused(self):
+        theory = MieLens(accuracy=1e-4)
+        calc_holo(xschema, sphere, index, wavelen, xpolarization,
+                  theory=theory)
+        self.assertEqual(len(theory.tuned_settings), 1)
+        settings = list(theory.tuned_settings.values())[0]
+        for key in ['quad_npts', 'interpolator_window_size',
+                    'interpolator_degree', 'tuning_seconds']:
+            self.assertIn(key, settings)
+
+        nearby_sphere = Sphere(
+            n=sphere.n, r=sphere.r * 0.999, center=sphere.center)
+        calc_holo(xschema, nearby_sphere, index, wavelen, xpolarization,
+                  theory=theory)
+        self.assertEqual(len(theory.tuned_settings), 1)
+
+    @attr("fast")
+    def test_calculator_accuracy_kwargs_override_tuned_settings(self):
+        theory = MieLens(
+            accuracy=1e-4, calculator_accuracy_kwargs={'quad_npts': 77})
+        kwargs = theory._get_calculator_accuracy_kwargs(
+            10.0, 1.2, 5.0, np.linspace(0, 100, 10))
+        self.assertEqual(kwargs['quad_npts'], 77)
+        self.assertIn('interpolator_degree', kwargs)
 
     @attr("fast")
     def test_desired_coordinate_system_is_cylindrical(self):
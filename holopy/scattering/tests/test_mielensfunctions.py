@@ -80,6 +80,43 @@ class TestMieLensCalculator(unittest.TestCase):
         fields = miecalculator.calculate_scattered_field(krho, kphi)
         self.assertTrue(fields is not None)
 
+    @attr("medium")
+    def test_large_rho_fields_same_as_fine_quadrature(self):
+        krho = np.linspace(400, 1500, 45)
+        phi = np.linspace(0, 2 * np.pi, krho.size)
+        # includes the edge of the defocused spot, kz * tan(lens_angle):
+        for particle_kz in [10.0, 620.0, -600.0]:
+            kwargs = {'particle_kz': particle_kz, 'index_ratio': 1.2,
+                      'size_parameter': 10.0, 'lens_angle': 1.0}
+            fine = mielensfunctions.MieLensCalculator(
+                quad_npts=4000, interpolate_integrals=False, **kwargs)
+            fields_fine = fine.calculate_scattered_field(krho, phi)
+            for interpolate_integrals in [True, False]:
+                asymptotic = mielensfunctions.MieLensCalculator(
+                    interpolate_integrals=interpolate_integrals, **kwargs)
+                fields_asymptotic = asymptotic.calculate_scattered_field(
+                    krho, phi)
+                for f_asymptotic, f_fine in zip(fields_asymptotic,
+                                                fields_fine):
+                    rescale = np.abs(f_fine).max()
+                    with self.subTest(particle_kz=particle_kz,
+                                      interpolate=interpolate_integrals):
+                        self.assertTrue(np.allclose(
+                            f_asymptotic / rescale, f_fine / rescale,
+                            **MEDTOLS))
+
+    @attr("fast")
+    def test_fields_continuous_at_large_rho_cutoff(self):
+        miecalculator = mielensfunctions.MieLensCalculator(
+            particle_kz=10, index_ratio=1.2, size_parameter=10.,
+            lens_angle=0.9)
+        cutoff = 3.9 * miecalculator.quad_npts
+        krho = cutoff + np.array([-1e-9, 1e-9])
+        field_x, field_y = miecalculator.calculate_scattered_field(
+            krho, np.full(krho.size, 0.25 * np.pi))
+        self.assertTrue(np.isclose(field_x[0], field_x[1], **MEDTOLS))
+        self.assertTrue(np.isclose(field_y[0], field_y[1], **MEDTOLS))
+
     @attr("medium")
     def test_central_lobe_is_bright_when_particle_is_above_focus(self):
         zs = np.linspace(2, 10, 11)
@@ -291,6 +328,60 @@ class TestMieLensCalculator(unittest.TestCase):
                 self.assertTrue(close_enough_x)
                 self.assertTrue(close_enough_y)
 
+    @attr("fast")
+    def test_multiple_particle_kz_same_as_one_calculator_per_plane(self):
+        kzs = [-30.0, 5.0, 60.0]
+        krho = np.linspace(0, 40, 101)
+        phi = np.linspace(0, 2 * np.pi, krho.size)
+        kwargs = {'index_ratio': 1.2, 'size_parameter': 5.0,
+                  'lens_angle': 0.9}
+        for interpolate_integrals in [True, False, 'check']:
+            stack_calculator = mielensfunctions.MieLensCalculator(
+                particle_kz=np.repeat(kzs, krho.size),
+                interpolate_integrals=interpolate_integrals, **kwargs)
+            stack_x, stack_y = stack_calculator.calculate_scattered_field(
+                np.tile(krho, len(kzs)), np.tile(phi, len(kzs)))
+            plane_fields = [
+                mielensfunctions.MieLensCalculator(
+                    particle_kz=kz,
+                    interpolate_integrals=interpolate_integrals,
+                    **kwargs).calculate_scattered_field(krho, phi)
+                for kz in kzs]
+            plane_x, plane_y = [np.concatenate(f) for f in zip(*plane_fields)]
+            with self.subTest(interpolate_integrals=interpolate_integrals):
+                self.assertTrue(np.allclose(stack_x, plane_x, **TOLS))
+                self.assertTrue(np.allclose(stack_y, plane_y, **TOLS))
+
+    @attr("fast")
+    def test_no_interpolation_when_every_particle_kz_differs(self):
+        krho = np.linspace(0, 40, 101)
+        phi = np.linspace(0, 2 * np.pi, krho.size)
+        kwargs = {'particle_kz': np.linspace(5, 15, krho.size),
+                  'index_ratio': 1.2, 'size_parameter': 5.0,
+                  'lens_angle': 0.9}
+        calculator = mielensfunctions.MieLensCalculator(
+            interpolate_integrals=True, **kwargs)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("built an interpolant for a single point")
+        calculator._interpolate_and_eval_mielens_i_n = fail
+        fields = calculator.calculate_scattered_field(krho, phi)
+        direct = mielensfunctions.MieLensCalculator(
+            interpolate_integrals=False,
+            **kwargs).calculate_scattered_field(krho, phi)
+        for field, expected in zip(fields, direct):
+            self.assertTrue(np.allclose(field, expected, **TOLS))
+
+    @attr("fast")
+    def test_raises_error_when_particle_kz_mismatched_size(self):
+        miecalculator = mielensfunctions.MieLensCalculator(
+            particle_kz=np.full(10, 10.0), index_ratio=1.2,
+            size_parameter=10.0, lens_angle=0.9)
+        krho = np.linspace(0, 30, 300)
+        phi = np.full(krho.size, 0.25 * np.pi)
+        self.assertRaises(
+            ValueError, miecalculator.calculate_scattered_field, krho, phi)
+
     @attr("medium")
     def test_energy_is_conserved(self):
 
@@ -509,6 +600,63 @@ class TestCalculation(unittest.TestCase):
         self.assertTrue(np.isclose(ratio, 1.0, **self._highna_tols))
 
 
+class TestMieLensAccuracyTuner(unittest.TestCase):
+    kwargs = {'particle_kz': 30.0,
+              'index_ratio': 1.2,
+              'size_parameter': 8.0,
+              'lens_angle': 0.8,
+              'krho_max': 200.0,
+              }
+
+    @attr("medium")
+    def test_tuned_settings_meet_accuracy(self):
+        accuracy = 1e-6
+        tuner = mielensfunctions.MieLensAccuracyTuner(accuracy=accuracy)
+        settings = tuner.tune(**self.kwargs)
+
+        calculator_kwargs = {k: v for k, v in self.kwargs.items()
+                             if k != 'krho_max'}
+        krho = np.linspace(0.5, self.kwargs['krho_max'], 301)
+        phi = np.full(krho.shape, 0.3)
+        reference = mielensfunctions.MieLensCalculator(
+            quad_npts=1000, interpolate_integrals=False,
+            **calculator_kwargs).calculate_scattered_field(krho, phi)
+        for interpolate in [True, False]:
+            tuned = mielensfunctions.MieLensCalculator(
+                interpolate_integrals=interpolate,
+                quad_npts=settings['quad_npts'],
+                interpolator_window_size=settings['interpolator_window_size'],
+                interpolator_degree=settings['interpolator_degree'],
+                **calculator_kwargs).calculate_scattered_field(krho, phi)
+            scale = np.abs(reference[0]).max()
+            for f_tuned, f_reference in zip(tuned, reference):
+                error = np.abs(f_tuned - f_reference).max() / scale
+                self.assertLess(error, 2 * accuracy)
+
+    @attr("medium")
+    def test_looser_accuracy_is_no_more_expensive(self):
+        loose = mielensfunctions.MieLensAccuracyTuner(
+            accuracy=1e-2).tune(**self.kwargs)
+        tight = mielensfunctions.MieLensAccuracyTuner(
+            accuracy=1e-10).tune(**self.kwargs)
+        self.assertLessEqual(loose['quad_npts'], tight['quad_npts'])
+        self.assertLessEqual(
+            (loose['interpolator_degree'] + 1) /
+            loose['interpolator_window_size'],
+            (tight['interpolator_degree'] + 1) /
+            tight['interpolator_window_size'])
+
+    @attr("fast")
+    def test_records_errors_and_cost(self):
+        settings = mielensfunctions.MieLensAccuracyTuner(
+            accuracy=1e-4).tune(**self.kwargs)
+        for key in ['quadrature_error', 'interpolation_error']:
+            self.assertLessEqual(settings[key], 1e-4)
+        for key in ['direct_seconds', 'interpolation_seconds',
+                    'tuning_seconds']:
+            self.assertGreater(settings[key], 0)
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #                           Interpolation Tests
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -251,6 +251,20 @@ def test_wrap_sphere():
     assert_array_equal(holo,holo_w)
 
 
+@attr('medium')
+def test_threaded_holo_same_as_serial():
+    sc = Spheres(scatterers=[Sphere(center=[7.1e-6, 7e-6, 10e-6],
+                                       n=1.5811+1e-4j, r=5e-07),
+                                Sphere(center=[6e-6, 7e-6, 10e-6],
+                                       n=1.5811+1e-4j, r=5e-07)])
+    holo = calc_holo(schema, sc, index, wavelen, xpolarization,
+                     theory=Multisphere(compute_escat_radial=True))
+    holo_threaded = calc_holo(
+        schema, sc, index, wavelen, xpolarization,
+        theory=Multisphere(compute_escat_radial=True, n_threads=3))
+    assert_array_equal(holo, holo_threaded)
+
+
 if __name__ == '__main__':
     unittest.main()
 
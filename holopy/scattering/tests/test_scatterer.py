@@ -155,6 +155,39 @@ def test_from_parameters():
     assert_equal(s_prior.from_parameters(pars, overwrite=True), s_new_nr)
 
 
+@attr('fast')
+def test_compiled_parameters_match_from_parameters():
+    scatterers = [
+        Sphere(n=ComplexPrior(Uniform(1.5, 1.7), 1e-3), r=Uniform(0.5, 0.7),
+               center=[10, 10, Uniform(5, 15)]),
+        Sphere(n={'red': Uniform(1.5, 1.7), 'green': 1.6}, r=0.6,
+               center=[10, 10, 10]),
+        Ellipsoid(n=1.5, r=[1, Uniform(1, 2), 1], center=[0, 0, 1])]
+    for scatterer in scatterers:
+        names = list(scatterer.parameters.keys()) + ['alpha']
+        values = [0.5 + 0.1 * i for i in range(len(names))]
+        for overwrite in [False, True]:
+            compiled = scatterer.compile_parameters(names, overwrite)
+            assert_equal(
+                compiled(values),
+                scatterer.from_parameters(dict(zip(names, values)),
+                                          overwrite))
+
+
+@attr('fast')
+def test_compiled_parameters_with_ties():
+    n1 = Uniform(1.59, 1.6, guess=1.59)
+    sc = Spheres(
+        [Sphere(n=n1, r=Uniform(0.5, 0.7), center=np.array([10., 10., 20.])),
+         Sphere(n=n1, r=Uniform(0.5, 0.7), center=np.array([9., 11., 21.]))])
+    names = ['n', '0:r', '1:r']
+    values = [1.595, 0.6, 0.65]
+    compiled = sc.compile_parameters(names)(values)
+    assert_equal(compiled, sc.from_parameters(dict(zip(names, values))))
+    assert_equal(compiled.ties, sc.ties)
+    assert_equal([s.n for s in compiled.scatterers], [1.595, 1.595])
+
+
 @attr('fast')
 def test_Composite_construction():
     # empty composite
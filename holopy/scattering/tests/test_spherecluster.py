@@ -75,6 +75,20 @@ def test_Spheres_ovelap_checking():
         assert len(w) > 0
 
 
+@attr('fast')
+def test_Spheres_compiled_parameters_check_overlaps():
+    s1 = Sphere(n=1.59, r=5e-7, center=(1e-6, -1e-6, 10e-6))
+    s2 = Sphere(n=1.59, r=5e-7, center=(3e-6, -1e-6, 10e-6))
+    compiled = Spheres([s1, s2]).compile_parameters(['1:center.0'],
+                                                    overwrite=True)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always', OverlapWarning)
+        compiled([4e-6])
+        assert len(w) == 0
+        compiled([1.5e-6])
+        assert len(w) > 0
+
+
 @attr("fast")
 def test_Spheres_parameters():
     s1 = Sphere(n = 1.59, r = 5e-7, center=[1e-6, -1e-6, 10e-6])
@@ -26,12 +26,17 @@ scattered field.
 .. moduleauthor:: Vinothan N. Manoharan <vnm@seas.harvard.edu>
 '''
 
+import os
+
 import numpy as np
+from scipy.special import spherical_jn, spherical_yn
 from holopy.core.utils import ensure_array
 from holopy.core.errors import DependencyMissing
+from holopy.core.metadata import illumination, update_metadata
 from holopy.scattering.errors import TheoryNotCompatibleError, InvalidScatterer
-from holopy.scattering.scatterer import Sphere, Spheres
-from holopy.scattering.theory.scatteringtheory import ScatteringTheory
+from holopy.scattering.scatterer import Sphere, Spheres, Scatterers
+from holopy.scattering.theory.scatteringtheory import (ScatteringTheory,
+                                                       get_wavevec_from)
 try:
     from holopy.scattering.theory.mie_f import (mieangfuncs, miescatlib,
                                                 scatcoeffs_multi)
@@ -59,11 +64,24 @@ class Mie(ScatteringTheory):
     which is nonradiative.
 
     Currently, in calculating the Lorenz-Mie scattering coefficients,
-    the maximum size parameter x = ka is limited to 1000.
+    the maximum size parameter x = ka is limited to 10000. Above x = 1000
+    the Riccati-Bessel functions are found from logarithmic-derivative
+    recursions (see mie_specfuncs.riccati_psi_xi), so the cost of the
+    coefficients stays linear in x; the cost of fields is proportional to
+    the number of orders, about x, per detector point.
+
+    The expansion is normally carried to the order given by the Wiscombe
+    criterion. If `truncation_tolerance` is set, fields and scattering
+    matrices are instead calculated with the fewest orders whose estimated
+    relative error in the field at the closest detector point is below the
+    tolerance. The largest number of orders used for any sphere is then
+    reported in the 'multipole_order' attribute of the results of
+    calc_field, calc_holo, calc_intensity and calc_scat_matrix.
     """
 
     def __init__(self, compute_escat_radial=True, full_radial_dependence=True,
-                 eps1=1e-2, eps2=1e-16):
+                 eps1=1e-2, eps2=1e-16, n_threads=1,
+                 truncation_tolerance=None):
         """
         Parameters
         ----------
@@ -72,11 +90,21 @@ class Mie(ScatteringTheory):
         full_radial dependence : bool
             determines if the full spherical Hankel function will be used,
             or if it will be approximated to be in the far field.
+        n_threads : int or 'all'
+            number of threads over which to split the detector points when
+            calculating fields. 'all' uses every core. Only has an effect
+            if the Fortran extensions were compiled with OpenMP.
+        truncation_tolerance : float or None
+            relative field error allowed from truncating the multipole
+            expansion. None (default) uses all orders up to the Wiscombe
+            criterion.
         """
         self.compute_escat_radial = compute_escat_radial
         self.full_radial_dependence = full_radial_dependence
         self.eps1 = eps1
         self.eps2 = eps2
+        self.n_threads = n_threads
+        self.truncation_tolerance = truncation_tolerance
         if not _COMPILED_FORTRAN:
             raise DependencyMissing("Mie theory", "This is probably "
                                     "due to a problem with compiling Fortran "
@@ -95,6 +123,7 @@ class Mie(ScatteringTheory):
         if self._can_handle(scatterer):
             scat_coeffs = self._scat_coeffs(
                 scatterer, medium_wavevec, medium_index)
+            scat_coeffs = self._truncate_scat_coeffs(scat_coeffs, np.inf)
 
             # In the mie solution the amplitude scattering matrix is
             # independent of phi
@@ -107,11 +136,55 @@ class Mie(ScatteringTheory):
             self, positions, scatterer, medium_wavevec, medium_index,
             illum_polarization):
         scat_coeffs = self._scat_coeffs(scatterer, medium_wavevec, medium_index)
+        scat_coeffs = self._truncate_scat_coeffs(
+            scat_coeffs, np.min(positions[0]))
+        n_threads = os.cpu_count() if self.n_threads == 'all' else self.n_threads
         fields = mieangfuncs.mie_fields(
             positions, scat_coeffs, illum_polarization.values[:2],
-            self.compute_escat_radial, self.full_radial_dependence)
+            self.compute_escat_radial, self.full_radial_dependence,
+            n_threads=n_threads)
         return fields
 
+    def _raw_field_derivatives(
+            self, positions, scatterer, medium_wavevec, medium_index,
+            illum_polarization):
+        '''
+        Scattered field of a single sphere, as from _raw_fields, with its
+        derivatives.
+
+        Returns
+        -------
+        fields : ndarray (3, n), complex
+            Scattered field
+        gradient : ndarray (3, 3, n), complex
+            Derivatives of the field with respect to the non-dimensional
+            position (kx, ky, kz) of the field points relative to the
+            sphere. gradient[i, j] is the derivative of field component j
+            with respect to coordinate i.
+        dfields_dr, dfields_dn : ndarray (3, n), complex
+            Derivatives of the field with respect to the sphere's radius
+            and (complex) refractive index
+        '''
+        if (not isinstance(scatterer, Sphere) or np.ndim(scatterer.r) > 0 or
+                np.ndim(scatterer.n) > 0):
+            raise TheoryNotCompatibleError(self, scatterer)
+        if scatterer.r == 0:
+            raise InvalidScatterer(scatterer, "Radius is zero")
+        x = medium_wavevec * scatterer.r
+        if x > 1e4:
+            msg = "radius too large, field calculation would take forever"
+            raise InvalidScatterer(scatterer, msg)
+        coeffs = miescatlib.scatcoeffs_derivatives(
+            scatterer.n / medium_index, x, miescatlib.nstop(x), self.eps1,
+            self.eps2)
+        order = self._truncate_scat_coeffs(
+            coeffs[0], np.min(positions[0])).shape[1]
+        fields, gradient = miescatlib.fields_and_gradient(
+            positions, coeffs[:, :, :order], illum_polarization.values[:2],
+            self.compute_escat_radial, self.full_radial_dependence)
+        return (fields[0], gradient, fields[1] * medium_wavevec,
+                fields[2] / medium_index)
+
     def _raw_internal_fields(
             self, positions, scatterer, medium_wavevec, medium_index,
             illum_polarization):
@@ -196,7 +269,7 @@ class Mie(ScatteringTheory):
         m_arr = ensure_array(ensure_array(s.n) / medium_index)
 
         # Check that the scatterer is in a range we can compute for
-        if x_arr.max() > 1e3:
+        if x_arr.max() > 1e4:
             msg =  "radius too large, field calculation would take forever"
             raise InvalidScatterer(s, msg)
 
@@ -209,6 +282,91 @@ class Mie(ScatteringTheory):
         else:
             return scatcoeffs_multi(m_arr, x_arr, self.eps1, self.eps2)
 
+    def _truncate_scat_coeffs(self, scat_coeffs, kr_min):
+        '''
+        Drop the highest orders of the Mie coefficients if the
+        truncation_tolerance allows.
+
+        Parameters
+        ----------
+        scat_coeffs : ndarray (2, n), complex
+            Lorenz-Mie scattering coefficients a_n and b_n
+        kr_min : float
+            Smallest non-dimensional distance kr from the scatterer at
+            which fields will be calculated; np.inf for far fields.
+
+        Returns
+        -------
+        ndarray (2, m), complex
+            The first m orders of `scat_coeffs`
+
+        Notes
+        -----
+        Order n is weighted by (2n + 1)(|a_n| + |b_n|), the size of its
+        far-field contribution, times kr |h_n(kr)| at kr_min, which is
+        1 in the far field and grows quickly once n exceeds kr. Orders are
+        dropped from the top while their summed weight stays below
+        truncation_tolerance times the total.
+        '''
+        norders = scat_coeffs.shape[1]
+        if self.truncation_tolerance is None:
+            return scat_coeffs
+        n = np.arange(1, norders + 1)
+        weights = (2 * n + 1) * np.abs(scat_coeffs).sum(axis=0)
+        if np.isfinite(kr_min):
+            with np.errstate(over='ignore', invalid='ignore'):
+                hankel = kr_min * np.abs(
+                    spherical_jn(n, kr_min) + 1j * spherical_yn(n, kr_min))
+            weights = weights * np.maximum(hankel, 1)
+        if not np.isfinite(weights).all():
+            # Hankel function overflow: a point is too close to the
+            # scatterer for any order to be dropped
+            return scat_coeffs
+        tail = np.cumsum(weights[::-1])[::-1]
+        # tail[i] is the weight of orders i+1 and up, so keep orders up
+        # to the first i where dropping the rest is within tolerance
+        within = np.nonzero(tail <= self.truncation_tolerance * tail[0])[0]
+        order = max(within[0], 1) if len(within) > 0 else norders
+        return scat_coeffs[:, :order]
+
+    def _calculation_attrs(self, scatterer, schema, far_field=False):
+        if self.truncation_tolerance is None:
+            return {}
+        return {'multipole_order':
+                self._multipole_order(scatterer, schema, far_field)}
+
+    def _multipole_order(self, scatterer, schema, far_field=False):
+        '''
+        Largest number of orders _truncate_scat_coeffs keeps for any
+        sphere of scatterer and any illumination of schema.
+        '''
+        if len(ensure_array(schema.illum_wavelen)) > 1:
+            return max(
+                self._multipole_order(
+                    scatterer.select({illumination: illum}),
+                    update_metadata(schema, illum_wavelen=ensure_array(
+                        schema.illum_wavelen.sel(
+                            illumination=illum).values)[0]),
+                    far_field)
+                for illum in schema.illum_wavelen.illumination.values)
+        wavevec = get_wavevec_from(schema)
+        if isinstance(scatterer, Scatterers):
+            spheres = scatterer.get_component_list()
+        else:
+            spheres = [scatterer]
+        orders = []
+        for sphere in spheres:
+            scat_coeffs = self._scat_coeffs(sphere, wavevec,
+                                            schema.medium_index)
+            kr_min = np.inf
+            if not far_field:
+                positions = self._transform_to_desired_coordinates(
+                    schema, sphere.center, wavevec=wavevec)
+                kr_min = np.min(positions[0])
+            orders.append(
+                self._truncate_scat_coeffs(scat_coeffs, kr_min).shape[1])
+        return max(orders)
+
     def _scat_coeffs_internal(self, s, medium_wavevec, medium_index):
         '''
         Calculate expansion coefficients for Lorenz-Mie electric field
@@ -218,7 +376,7 @@ class Mie(ScatteringTheory):
         m_arr = ensure_array(s.n) / medium_index
 
         # Check that the scatterer is in a range we can compute for
-        if x_arr.max() > 1e3:
+        if x_arr.max() > 1e4:
             msg = "radius too large, field calculation would take forever"
             raise InvalidScatterer(s, msg)
 
@@ -50,7 +50,11 @@ try:
 except ImportError:
     pass
 
-def riccati_psi_xi(x, nstop):
+# Above this size parameter scipy's riccati_jn loses or overflows its
+# high orders, so riccati_psi_xi switches to log-derivative recursion
+LARGE_SIZE_PARAMETER = 1e3
+
+def riccati_psi_xi(x, nstop, eps1 = 1e-3, eps2 = 1e-16):
     '''
     Calculate Riccati-Bessel functions psi and xi for real argument.
 
@@ -60,6 +64,9 @@ def riccati_psi_xi(x, nstop):
         Argument
     nstop : int
         Maximum order to calculate to
+    eps1, eps2 : float, optional
+        Lentz continued fraction parameters, used only when x is larger
+        than LARGE_SIZE_PARAMETER (see log_der_13)
 
     Returns
     -------
@@ -68,10 +75,16 @@ def riccati_psi_xi(x, nstop):
 
     Notes
     -----
-    Uses upwards recursion.
+    Uses upwards recursion. For x > LARGE_SIZE_PARAMETER, psi is found by
+    upward recursion of the ratio psi_n / psi_{n-1} = 1 / (D_n + n/x)
+    from the downward-recursed logarithmic derivative D_n, as in R_psi,
+    which stays stable for orders beyond x; the Riccati-Neumann part of
+    xi is recursed upwards directly.
     '''
     if np.imag(x) != 0.:
         raise TypeError('Cannot handle complex arguments.')
+    if x > LARGE_SIZE_PARAMETER:
+        return _riccati_psi_xi_large(np.real(x), nstop, eps1, eps2)
     psin = riccati_jn(nstop, x)
     # construct riccati hankel function of 1st kind by linear
     # combination of RB's based on j_n and y_n
@@ -80,6 +93,20 @@ def riccati_psi_xi(x, nstop):
     rbh = array([psin[0], xin])
     return rbh
 
+def _riccati_psi_xi_large(x, nstop, eps1, eps2):
+    n = arange(1, nstop + 1)
+    dn = dn_1_down(x, nstop + 1, nstop,
+                   lentz_dn1(x, nstop + 1, eps1, eps2)).real
+    psi = np.concatenate(([sin(x)], sin(x) * np.cumprod(1 / (dn[1:] + n / x))))
+    # x y_n(x), growing with n, so upward recursion is stable
+    chi = zeros(nstop + 1)
+    chi[0] = -cos(x)
+    if nstop > 0:
+        chi[1] = chi[0] / x - sin(x)
+    for i in range(2, nstop + 1):
+        chi[i] = (2 * i - 1) / x * chi[i - 1] - chi[i - 2]
+    return array([psi, psi + 1j * chi])
+
 def log_der_1(z, nmx, nstop):
     '''
     Computes logarithmic derivative of Riccati-Bessel function \psi_n(z)
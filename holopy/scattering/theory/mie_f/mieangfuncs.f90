@@ -64,7 +64,7 @@
 
 
       subroutine mie_fields(n_pts, calc_points, asbs, nstop, einc, rad, rad_dep, &
-           es_x, es_y, es_z)
+           es_x, es_y, es_z, n_threads)
         ! Calculate fields scattered by a sphere in the Lorenz-Mie solution,
         ! at a list of selected points.  Use for hologram calculations or
         ! general scattering.
@@ -87,13 +87,20 @@
         !     If .true., calculate radial component of the scattered field.
         !     Neglected in most scattering calculations b/c radial component
         !     falls off faster than 1/r.
+        ! n_threads: int, optional
+        !     Number of OpenMP threads to split the points among (default 1).
+        !     Ignored if compiled without OpenMP.
         !
         ! Returns
         ! -------
         ! es_x, es_y, es_z: complex array (n_pts)
         !     The three electric field components at points in calc_points
+        !
+        ! The GIL is released during the calculation.
         implicit none
-        integer, intent(in) :: n_pts, nstop
+!f2py threadsafe
+!f2py integer optional, intent(in) :: n_threads = 1
+        integer, intent(in) :: n_pts, nstop, n_threads
         real (kind = 8), intent(in), dimension(3, n_pts) :: calc_points
         logical, intent(in) :: rad, rad_dep
         complex (kind = 8), intent(out), dimension(n_pts) :: es_x, &
@@ -109,6 +116,9 @@
         integer :: i
 
         ! Main loop over field points.
+        !$omp parallel do num_threads(max(n_threads, 1)) schedule(static) &
+        !$omp default(shared) private(i, kr, theta, phi, einc_sph, &
+        !$omp asm_scat, escat_sph, escat_rect, erad_cart, escat_rad)
         do i = 1, n_pts, 1
            kr = calc_points(1, i)
            theta = calc_points(2, i)
@@ -141,6 +151,7 @@
            es_z(i) = escat_rect(3)
 
         end do
+        !$omp end parallel do
 
         return
         end
@@ -216,7 +227,7 @@
 
 
       subroutine tmatrix_fields(n_pts, calc_points, amn, lmax, euler_gamma, &
-           inc_pol, rad, es_x, es_y, es_z)
+           inc_pol, rad, es_x, es_y, es_z, n_threads)
         ! Calculate fields scattered by a cluster of spheres using
         ! D. Mackowski's code SCSMFO.
         !
@@ -241,14 +252,21 @@
         !     If .true., calculate radial component of the scattered field.
         !     Neglected in most scattering calculations b/c radial component
         !     falls off faster than 1/r.
+        ! n_threads: int, optional
+        !     Number of OpenMP threads to split the points among (default 1).
+        !     Ignored if compiled without OpenMP.
         !
         ! Returns
         ! -------
         ! es_x, es_y, es_z: complex array (n_pts)
         !     The three electric field components at points in calc_points
+        !
+        ! The GIL is released during the calculation.
 
         implicit none
-        integer, intent(in) :: n_pts, lmax
+!f2py threadsafe
+!f2py integer optional, intent(in) :: n_threads = 1
+        integer, intent(in) :: n_pts, lmax, n_threads
         real (kind = 8), intent(in), dimension(3, n_pts) :: calc_points
         complex (kind = 8), intent(in), dimension(2,lmax*(lmax+2),2) :: amn
         real (kind = 8), intent(in) :: euler_gamma
@@ -266,6 +284,10 @@
         integer :: i
 
         ! Main loop over hologram points
+        !$omp parallel do num_threads(max(n_threads, 1)) schedule(static) &
+        !$omp default(shared) private(i, kr, theta, phi, ascatmat, &
+        !$omp asreshape, einc_sph, escat_rect, erad_cart, escat_sph, &
+        !$omp rad_amplitude, escat_rad)
         do i = 1, n_pts, 1
            kr = calc_points(1, i)
            theta = calc_points(2, i)
@@ -300,6 +322,7 @@
            es_y(i) = escat_rect(2)
            es_z(i) = escat_rect(3)
         end do
+        !$omp end parallel do
 
         return
         end
@@ -370,7 +393,12 @@
 
         ! compute special functions (angular and spherical bessel)
         call pisandtaus(nstop, theta, pi_n, tau_n)
-        call sbesjy(kr, nstop, jn, yn, djn, dyn, ifail)
+        if (kr > 1.d4 .and. kr > nstop) then
+           ! sbesjy's continued fraction needs ~kr terms
+           call sbesjy_up(kr, nstop, jn, yn, djn, dyn)
+        else
+           call sbesjy(kr, nstop, jn, yn, djn, dyn, ifail)
+        end if
 
         ! main loop
         do n = 1, nstop, 1
@@ -503,7 +531,12 @@
 
         ! compute special functions (angular and spherical bessel)
         call pisandtaus(nstop, theta, pi_n, tau_n)
-        call sbesjy(kr, nstop, jn, yn, djn, dyn, ifail)
+        if (kr > 1.d4 .and. kr > nstop) then
+           ! sbesjy's continued fraction needs ~kr terms
+           call sbesjy_up(kr, nstop, jn, yn, djn, dyn)
+        else
+           call sbesjy(kr, nstop, jn, yn, djn, dyn, ifail)
+        end if
         st = dsin(theta)
 
         ! main loop
@@ -636,6 +669,43 @@
       end
 
 
+      subroutine sbesjy_up(x, lmax, j, y, jp, yp)
+! Spherical Bessel functions j_n, y_n and their derivatives from n = 0 to
+! lmax by upward recursion. Stable only for x > lmax, where it replaces
+! sbesjy at large x, whose continued fraction would take about x terms.
+! Inputs:
+!    x: real argument, must be larger than lmax
+!    lmax: maximum order
+! Outputs:
+!    j, y, jp, yp: j_n, y_n, j_n', y_n' from n = 0 to lmax
+        implicit none
+        integer, intent(in) :: lmax
+        real (kind = 8), intent(in) :: x
+        real (kind = 8), dimension(0:lmax), intent(out) :: j, y, jp, yp
+        real (kind = 8) :: xinv
+        integer :: l
+
+        xinv = 1.d0 / x
+        j(0) = xinv * dsin(x)
+        y(0) = -xinv * dcos(x)
+        if (lmax > 0) then
+           j(1) = xinv * j(0) + y(0)
+           y(1) = xinv * y(0) - j(0)
+        end if
+        do l = 2, lmax, 1
+           j(l) = (2.d0 * l - 1.d0) * xinv * j(l-1) - j(l-2)
+           y(l) = (2.d0 * l - 1.d0) * xinv * y(l-1) - y(l-2)
+        end do
+        jp(0) = -j(1)
+        yp(0) = -y(1)
+        do l = 1, lmax, 1
+           jp(l) = j(l-1) - (l + 1.d0) * xinv * j(l)
+           yp(l) = y(l-1) - (l + 1.d0) * xinv * y(l)
+        end do
+        return
+        end
+
+
       subroutine dn_1_down(z, nmx, nstop, start_val, Dn_out)
         ! Calculate logarithmic derivatives D_n(z) of the Riccati-Bessel
         ! function \psi_n(z) by downward recursion as in BHMIE.
@@ -26,6 +26,7 @@ Library of code to do Mie scattering calculations.
 
 import numpy as np
 from numpy import sin, cos, array
+from scipy.special import spherical_jn, spherical_yn
 
 try:
     from . import mie_specfuncs
@@ -76,13 +77,208 @@ def scatcoeffs(m, x, nstop, eps1 = 1e-3, eps2 = 1e-16): # see B/H eqn 4.88
     Dnmx = dn_1_down(m * x, nstop + 1, nstop,
                                  lentz_dn1(m * x, nstop + 1, eps1, eps2))
     n = np.arange(nstop+1)
-    psi, xi = mie_specfuncs.riccati_psi_xi(x, nstop)
+    psi, xi = mie_specfuncs.riccati_psi_xi(x, nstop, eps1, eps2)
     psishift = np.concatenate((np.zeros(1), psi))[0:nstop+1]
     xishift = np.concatenate((np.zeros(1), xi))[0:nstop+1]
     an = ( (Dnmx/m + n/x)*psi - psishift ) / ( (Dnmx/m + n/x)*xi - xishift )
     bn = ( (Dnmx*m + n/x)*psi - psishift ) / ( (Dnmx*m + n/x)*xi - xishift )
     return array([an[1:nstop+1], bn[1:nstop+1]]) # output begins at n=1
 
+def scatcoeffs_derivatives(m, x, nstop, eps1 = 1e-3, eps2 = 1e-16):
+    '''
+    Calculate expansion coefficients for scattered field in Lorenz-Mie
+    solution, and their derivatives with respect to size parameter and
+    relative index.
+
+    Parameters
+    ----------
+    See docstring for scatcoeffs
+
+    Returns
+    -------
+    array(3, 2, nstop), complex
+        Scattering coefficients a_n and b_n, their derivatives with
+        respect to x, and their derivatives with respect to m
+
+    Notes
+    -----
+    Differentiates [Bohren1983]_ eq. 4.88, using psi_n' = psi_{n-1} -
+    n psi_n / x (and the same for xi) and D_n'(z) = n(n+1) / z^2 - 1 -
+    D_n(z)^2, which follows from the Riccati-Bessel equation. The
+    coefficients themselves are the same as from scatcoeffs.
+    '''
+    Dnmx = dn_1_down(m * x, nstop + 1, nstop,
+                                 lentz_dn1(m * x, nstop + 1, eps1, eps2))
+    n = np.arange(nstop+1)
+    psi, xi = mie_specfuncs.riccati_psi_xi(x, nstop, eps1, eps2)
+    psishift = np.concatenate((np.zeros(1), psi))[0:nstop+1]
+    xishift = np.concatenate((np.zeros(1), xi))[0:nstop+1]
+    dDnmx = n * (n + 1) / (m * x)**2 - 1 - Dnmx**2
+    dpsi = psishift - n * psi / x
+    dxi = xishift - n * xi / x
+    dpsishift = n * psishift / x - psi
+    dxishift = n * xishift / x - xi
+
+    coeffs = []
+    # the bracketed factors of a_n and b_n in eq. 4.88, with their
+    # derivatives with respect to x and m
+    for A, dA_dx, dA_dm in [
+            (Dnmx/m + n/x, dDnmx - n/x**2, x*dDnmx/m - Dnmx/m**2),
+            (Dnmx*m + n/x, m**2*dDnmx - n/x**2, Dnmx + m*x*dDnmx)]:
+        numerator = A*psi - psishift
+        denominator = A*xi - xishift
+        coeff = numerator / denominator
+        dcoeff_dx = ((dA_dx*psi + A*dpsi - dpsishift) -
+                     coeff * (dA_dx*xi + A*dxi - dxishift)) / denominator
+        dcoeff_dm = dA_dm * (psi - coeff*xi) / denominator
+        coeffs.append([coeff[1:], dcoeff_dx[1:], dcoeff_dm[1:]])
+    return np.swapaxes(array(coeffs), 0, 1) # output begins at n=1
+
+def fields_and_gradient(calc_points, asbs, einc, rad=True, rad_dep=True,
+                        min_theta=1e-8):
+    '''
+    Calculate fields scattered by a sphere, as mieangfuncs.mie_fields
+    does, for several sets of scattering coefficients at once, together
+    with the gradient of the first field with respect to the position of
+    the field point.
+
+    Parameters
+    ----------
+    calc_points : array (3, n_pts)
+        Points in spherical coordinates relative to the scatterer:
+        non-dimensional radial coordinate (kr), theta and phi
+    asbs : complex array (n_sets, 2, nstop)
+        Sets of coefficients a_n and b_n. Since fields are linear in the
+        coefficients, derivatives of the coefficients with respect to a
+        parameter give the derivative of the field.
+    einc : real array (2)
+        polarization
+    rad : bool
+        If True, include the radial component of the scattered field
+    rad_dep : bool
+        If True, use the full radial dependence of the spherical Hankel
+        functions, otherwise their far field limit
+    min_theta : float
+        Points closer than this to the axis are moved off it, where phi
+        is undefined.
+
+    Returns
+    -------
+    fields : complex array (n_sets, 3, n_pts)
+        Cartesian field components for each set of coefficients
+    gradient : complex array (3, 3, n_pts)
+        gradient[i, j] is the derivative of component j of the first
+        field with respect to the non-dimensional coordinate i (k x, k y
+        or k z) of the field point
+
+    Notes
+    -----
+    Differentiates the series in [Bohren1983]_ term by term: pi_n' and
+    tau_n' by differentiating their up recursions, the spherical Hankel
+    functions by the spherical Bessel equation.
+    '''
+    kr, theta, phi = calc_points
+    theta = np.clip(theta, min_theta, np.pi - min_theta)
+    nstop = asbs.shape[-1]
+    n = np.arange(1, nstop + 1)[:, np.newaxis]
+    ct, st, cp, sp = np.cos(theta), np.sin(theta), np.cos(phi), np.sin(phi)
+
+    # angular functions and their derivatives with respect to theta
+    pis = np.zeros((nstop + 1, len(theta)))
+    dpis = np.zeros((nstop + 1, len(theta)))
+    if nstop > 0:
+        pis[1] = 1.
+    for i in range(2, nstop + 1):
+        pis[i] = (2*i - 1) / (i - 1) * ct * pis[i-1] - i / (i - 1) * pis[i-2]
+        dpis[i] = ((2*i - 1) / (i - 1) * (ct * dpis[i-1] - st * pis[i-1]) -
+                   i / (i - 1) * dpis[i-2])
+    pi_n, dpi_n = pis[1:], dpis[1:]
+    tau_n = n * ct * pi_n - (n + 1) * pis[:-1]
+    dtau_n = n * (ct * dpi_n - st * pi_n) - (n + 1) * dpis[:-1]
+
+    # radial functions and their derivatives with respect to kr
+    hl, dhl = _spherical_hankel(nstop, kr)
+    ddhl = -2 / kr * dhl - (1 - n * (n + 1) / kr**2) * hl
+    if rad_dep:
+        fa = 1j**n * (hl / kr + dhl)
+        dfa = 1j**n * (-hl / kr**2 + dhl / kr + ddhl)
+        fb = 1j**(n + 1) * hl
+        dfb = 1j**(n + 1) * dhl
+    else:
+        fa = fb = np.exp(1j * kr) / kr
+        dfa = dfb = fa * (1j - 1 / kr)
+
+    prefactor = (2. * n[:, 0] + 1.) / (n[:, 0] * (n[:, 0] + 1.))
+    ca = asbs[:, 0] * prefactor
+    cb = asbs[:, 1] * prefactor
+    s2 = ca @ (tau_n * fa) + cb @ (pi_n * fb)
+    s1 = ca @ (pi_n * fa) + cb @ (tau_n * fb)
+    ds2_dkr = ca[0] @ (tau_n * dfa) + cb[0] @ (pi_n * dfb)
+    ds1_dkr = ca[0] @ (pi_n * dfa) + cb[0] @ (tau_n * dfb)
+    ds2_dtheta = ca[0] @ (dtau_n * fa) + cb[0] @ (dpi_n * fb)
+    ds1_dtheta = ca[0] @ (dpi_n * fa) + cb[0] @ (dtau_n * fb)
+    if rad:
+        radial = (2 * n + 1) * 1j**(n + 1) * hl / kr
+        dradial = (2 * n + 1) * 1j**(n + 1) * (dhl / kr - hl / kr**2)
+        er = st * (asbs[:, 0] @ (pi_n * radial))
+        der_dkr = st * (asbs[0, 0] @ (pi_n * dradial))
+        der_dtheta = asbs[0, 0] @ ((ct * pi_n + st * dpi_n) * radial)
+    else:
+        er = np.zeros_like(s1)
+        der_dkr = der_dtheta = np.zeros_like(s1[0])
+
+    # incident polarization parallel and perpendicular to the
+    # scattering plane, and their derivatives with respect to phi
+    epar = einc[0] * cp + einc[1] * sp
+    eperp = einc[0] * sp - einc[1] * cp
+
+    def to_cart(e_theta, e_phi, e_r, ct=ct, st=st, cp=cp, sp=sp):
+        return np.array([ct*cp*e_theta - sp*e_phi + st*cp*e_r,
+                         ct*sp*e_theta + cp*e_phi + st*sp*e_r,
+                         -st*e_theta + ct*e_r])
+
+    e_theta, e_phi, e_r = 1j * epar * s2, -1j * eperp * s1, epar * er
+    fields = np.swapaxes(to_cart(e_theta, e_phi, e_r), 0, 1)
+
+    e_theta, e_phi, e_r = e_theta[0], e_phi[0], e_r[0]
+    dfield_dkr = to_cart(1j * epar * ds2_dkr, -1j * eperp * ds1_dkr,
+                         epar * der_dkr)
+    dfield_dtheta = (to_cart(1j * epar * ds2_dtheta, -1j * eperp * ds1_dtheta,
+                             epar * der_dtheta) +
+                     to_cart(e_theta, 0, e_r, ct=-st, st=ct))
+    dfield_dphi = (to_cart(-1j * eperp * s2[0], -1j * epar * s1[0],
+                           -eperp * er[0]) +
+                   to_cart(e_theta, e_phi, e_r, cp=-sp, sp=cp) *
+                   [[1], [1], [0]])
+
+    r_hat = np.array([st * cp, st * sp, ct])
+    theta_hat = np.array([ct * cp, ct * sp, -st])
+    phi_hat = np.array([-sp, cp, np.zeros_like(sp)])
+    gradient = (r_hat[:, np.newaxis] * dfield_dkr +
+                theta_hat[:, np.newaxis] * dfield_dtheta / kr +
+                phi_hat[:, np.newaxis] * dfield_dphi / (kr * st))
+    return fields, gradient
+
+def _spherical_hankel(nstop, x):
+    '''
+    Spherical Hankel functions h_n(x) of the first kind and their
+    derivatives, for n from 1 to nstop, shape (nstop, len(x)). Upward
+    recursion is stable where x > nstop, as for field points in
+    holograms; elsewhere scipy's Bessel functions are used.
+    '''
+    n = np.arange(1, nstop + 1)[:, np.newaxis]
+    if np.min(x) <= nstop:
+        hl = spherical_jn(n, x) + 1j * spherical_yn(n, x)
+        dhl = (spherical_jn(n, x, derivative=True) +
+               1j * spherical_yn(n, x, derivative=True))
+        return hl, dhl
+    hl = np.empty((nstop + 1, len(x)), dtype=complex)
+    hl[0] = -1j * np.exp(1j * x) / x
+    hl[1] = hl[0] / x - np.exp(1j * x) / x
+    for i in range(2, nstop + 1):
+        hl[i] = (2 * i - 1) / x * hl[i-1] - hl[i-2]
+    return hl[1:], hl[:-1] - (n + 1) / x * hl[1:]
+
 def internal_coeffs(m, x, n_max, eps1 = 1e-3, eps2 = 1e-16):
     '''
     Calculate internal Mie coefficients c_n and d_n given
@@ -31,6 +31,11 @@ scsmfo_min. The former is relics of how scsmfo was written which I
 am not touching. The latter is likely due to some GOTO statements that
 could cause a variable to be referenced before it's initialized. Under
 normal usage I wouldn't worry about it.
+
+mieangfuncs is compiled with OpenMP so that mie_fields and
+tmatrix_fields can split their loops over field points among threads
+(see the n_threads option of Mie and Multisphere). Without OpenMP
+support the directives are ignored and the loops run serially.
 '''
 import sys
 def configuration(parent_package='', top_path=None):
@@ -48,7 +53,10 @@ def configuration(parent_package='', top_path=None):
                          ['mieangfuncs.f90',
                           'uts_scsmfo.for',
                           '../../third_party/SBESJY.F',
-                          '../../third_party/csphjy.for']
+                          '../../third_party/csphjy.for'],
+                         extra_f77_compile_args=['-fopenmp'],
+                         extra_f90_compile_args=['-fopenmp'],
+                         extra_link_args=['-fopenmp']
                          )
         config.add_extension('scsmfo_min',
                          ['scsmfo_min.for']
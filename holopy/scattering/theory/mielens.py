@@ -28,16 +28,42 @@ import numpy as np
 
 from holopy.scattering.scatterer import Sphere
 from holopy.scattering.theory.scatteringtheory import ScatteringTheory
-from holopy.scattering.theory.mielensfunctions import MieLensCalculator
+from holopy.scattering.theory.mielensfunctions import (
+    MieLensCalculator, MieLensAccuracyTuner)
 
 
 class MieLens(ScatteringTheory):
+    """
+    Exact scattering from a sphere imaged through a perfect lens.
+
+    Parameters
+    ----------
+    lens_angle : float, optional
+        The acceptance angle of the lens, in radians.
+    calculator_accuracy_kwargs : dict, optional
+        Accuracy settings passed to `MieLensCalculator`, overriding any
+        settings chosen by `accuracy`.
+    accuracy : float, optional
+        If set, the target error of the scattered field relative to its
+        maximum over the detector. The cheapest calculator settings
+        (`quad_npts`, `interpolator_window_size`, `interpolator_degree`)
+        meeting this accuracy are then chosen from the particle size,
+        index, z, lens angle and the detector's krho range. Tuning is
+        done once per regime of these parameters, rounded up so that
+        small changes (as during a fit) reuse the same settings. The
+        chosen settings, their measured errors and costs are recorded
+        in `tuned_settings`. Default is None, which uses the
+        `MieLensCalculator` defaults.
+    """
     desired_coordinate_system = 'cylindrical'
 
-    def __init__(self, lens_angle=1.0, calculator_accuracy_kwargs={}):
+    def __init__(self, lens_angle=1.0, calculator_accuracy_kwargs={},
+                 accuracy=None):
         super(MieLens, self).__init__()
         self.lens_angle = lens_angle
         self.calculator_accuracy_kwargs = calculator_accuracy_kwargs
+        self.accuracy = accuracy
+        self.tuned_settings = {}
 
     def _can_handle(self, scatterer):
         return isinstance(scatterer, Sphere)
@@ -66,18 +92,19 @@ class MieLens(ScatteringTheory):
         phi += pol_angle
         phi %= (2 * np.pi)
 
-        # FIXME mielens assumes that the detector points are at a fixed z!
-        # right now I'm picking one z:
+        # If every detector point is at the same z we pass a single z
+        # to the calculator; otherwise each point keeps its own z, and
+        # the calculator shares the pupil-side precomputation among
+        # all the detector planes:
         particle_kz = np.mean(z)
         if np.ptp(z) > 1e-13 * (1 + np.abs(particle_kz)):
-            msg = ("mielens currently assumes the detector is a fixed " +
-                   "z from the particle")
-            raise ValueError(msg)
+            particle_kz = z
 
         field_calculator = MieLensCalculator(
             particle_kz=particle_kz, index_ratio=index_ratio,
             size_parameter=size_parameter, lens_angle=self.lens_angle,
-            **self.calculator_accuracy_kwargs)
+            **self._get_calculator_accuracy_kwargs(
+                particle_kz, index_ratio, size_parameter, rho))
         fields_pll, fields_prp = field_calculator.calculate_scattered_field(
             rho, phi)  # parallel and perp to the polarization
 
@@ -105,3 +132,34 @@ class MieLens(ScatteringTheory):
         field_xyz *= -1 * np.exp(1j * particle_kz)
         return field_xyz
 
+    def _get_calculator_accuracy_kwargs(self, particle_kz, index_ratio,
+                                        size_parameter, krho):
+        if self.accuracy is None:
+            return self.calculator_accuracy_kwargs
+        # Tune for the worst case of a regime: the size parameter, |kz|
+        # and krho range are rounded up on a geometric grid, so nearby
+        # parameters share the same settings.
+        farthest_kz = np.ravel(particle_kz)[np.argmax(np.abs(particle_kz))]
+        key = (self.accuracy,
+               self.lens_angle,
+               np.round(np.real(index_ratio), 2),
+               np.round(np.imag(index_ratio), 3),
+               _round_up_geometrically(size_parameter),
+               np.sign(farthest_kz) * _round_up_geometrically(
+                   max(np.abs(farthest_kz), 1.0)),
+               _round_up_geometrically(max(np.max(krho), 1.0)))
+        if key not in self.tuned_settings:
+            tuner = MieLensAccuracyTuner(accuracy=self.accuracy)
+            self.tuned_settings[key] = tuner.tune(
+                particle_kz=key[5], index_ratio=index_ratio,
+                size_parameter=key[4], lens_angle=self.lens_angle,
+                krho_max=key[6])
+        settings = self.tuned_settings[key]
+        kwargs = {k: settings[k] for k in (
+            'quad_npts', 'interpolator_window_size', 'interpolator_degree')}
+        kwargs.update(self.calculator_accuracy_kwargs)
+        return kwargs
+
+
+def _round_up_geometrically(x, ratio=1.25):
+    return ratio ** np.ceil(np.log(x) / np.log(ratio))
@@ -1,15 +1,30 @@
+import time
+from warnings import warn
+
 import numpy as np
 from numpy.polynomial.chebyshev import Chebyshev
-from scipy.special import j0, j1, spherical_jn, spherical_yn
+from scipy.special import (
+    j0, j1, spherical_jn, spherical_yn, hankel1e, hankel2e)
 from scipy import interpolate
 
 
 NPTS = 100
 LEGGAUSS_PTS_WTS_NPTS = np.polynomial.legendre.leggauss(NPTS)
 
+# Accuracy parameters for the large-krho (steepest descent) evaluation;
+# these give ~1e-8 relative accuracy or better for krho >~ 4 * NPTS,
+# degrading to ~1e-6 when the stationary point is near the pupil edge.
+STEEPEST_DESCENT_NPTS = 50
+STEEPEST_DESCENT_MAX_Q = 5.5
+STEEPEST_DESCENT_INNER_NPTS = 40
+STEEPEST_DESCENT_INNER_KRHO = 10.0
+STEEPEST_DESCENT_CHUNKSIZE = 2000
 
-# TODO:
-# fast integration of oscillatory functions.
+# Candidate settings searched by MieLensAccuracyTuner, cheapest first.
+TUNER_QUAD_NPTS = (16, 24, 32, 48, 64, 96, 128, 192, 256, 384, 512, 768, 1024)
+TUNER_WINDOW_SIZES = (10.0, 15.0, 20.0, 30.0, 40.0, 60.0)
+TUNER_DEGREES = (8, 12, 16, 24, 32, 48)
+TUNER_NPROBES = 64
 
 
 class MieLensCalculator(object):
@@ -24,8 +39,12 @@ class MieLensCalculator(object):
 
         Parameters
         ----------
-        particle_kz : float
-            + z is away from the lens
+        particle_kz : float or numpy.ndarray
+            + z is away from the lens. If an array, it gives the
+            particle's z separately for each detector point, and must
+            be the same shape as the `krho` passed to the `calculate_`
+            methods. The z-independent parts of the calculation are
+            then shared among all the detector planes.
         index_ratio : float > 0
         size_parameter : float > 0
         lens_angle : float on (0, pi/2)
@@ -118,15 +137,22 @@ class MieLensCalculator(object):
 
         Notes
         -----
-        This will have problems for large rho, z, because of the quadrature
-        points. Empirically this problem happens for rho >~ 4 * quad_npts.
-        Could be adaptive if needed....
+        The quadrature over the lens pupil has problems for large rho,
+        because of the quadrature points. Empirically this problem
+        happens for rho >~ 4 * quad_npts. So for krho >= 3.9 * quad_npts
+        the integrals are instead evaluated by deforming the integration
+        contour into the complex plane, along the paths of steepest
+        descent of the (stationary-phase) asymptotic form of the
+        integrand. This costs a fixed number of evaluations per point
+        and becomes more accurate as krho increases.
         """
         # 0. Check inputs:
         shape = krho.shape
         if (shape != phi.shape):
             raise ValueError('krho, phi must all be the same shape')
 
+        particle_kz = self._broadcast_particle_kz(shape)
+
         output_x = np.zeros(shape, dtype='complex')
         output_y = np.zeros(shape, dtype='complex')
 
@@ -136,13 +162,17 @@ class MieLensCalculator(object):
 
         # 2. Evaluate scattered fields only at valid rho's:
         if rho_small.any():
+            kz_lowrho = (particle_kz if np.ndim(particle_kz) == 0
+                         else particle_kz[rho_small])
             ex_lowrho, ey_lowrho = self._calculate_small_krho_scattered_field(
-                krho[rho_small], phi[rho_small])
+                krho[rho_small], phi[rho_small], particle_kz=kz_lowrho)
             output_x[rho_small] = ex_lowrho
             output_y[rho_small] = ey_lowrho
         if rho_large.any():
+            kz_hirho = (particle_kz if np.ndim(particle_kz) == 0
+                        else particle_kz[rho_large])
             ex_hirho, ey_hirho = self._calculate_large_krho_scattered_field(
-                krho[rho_large], phi[rho_large])
+                krho[rho_large], phi[rho_large], particle_kz=kz_hirho)
             output_x[rho_large] = ex_hirho
             output_y[rho_large] = ey_hirho
 
@@ -172,40 +202,61 @@ class MieLensCalculator(object):
         """
         return -1, 0
 
-    def _calculate_small_krho_scattered_field(self, krho, phi):
+    def _broadcast_particle_kz(self, shape):
+        if np.ndim(self.particle_kz) == 0:
+            return self.particle_kz
+        particle_kz = np.asarray(self.particle_kz)
+        if particle_kz.shape != shape:
+            raise ValueError('particle_kz must be a scalar or krho.shape')
+        return particle_kz
+
+    def _calculate_small_krho_scattered_field(self, krho, phi,
+                                              particle_kz=None):
         shape = phi.shape
-        i_0 = np.reshape(self._eval_mielens_i_n(krho, n=0), shape)
-        i_2 = np.reshape(self._eval_mielens_i_n(krho, n=2), shape)
+        i_0 = np.reshape(
+            self._eval_mielens_i_n(krho, n=0, particle_kz=particle_kz), shape)
+        i_2 = np.reshape(
+            self._eval_mielens_i_n(krho, n=2, particle_kz=particle_kz), shape)
+        return self._calculate_field_from_i_n(i_0, i_2, phi)
+
+    def _calculate_large_krho_scattered_field(self, krho, phi,
+                                              particle_kz=None):
+        shape = phi.shape
+        i_0 = np.reshape(self._eval_mielens_i_n(
+            krho, n=0, particle_kz=particle_kz, large_krho=True), shape)
+        i_2 = np.reshape(self._eval_mielens_i_n(
+            krho, n=2, particle_kz=particle_kz, large_krho=True), shape)
+        return self._calculate_field_from_i_n(i_0, i_2, phi)
+
+    @classmethod
+    def _calculate_field_from_i_n(cls, i_0, i_2, phi):
         c2p = np.cos(2 * phi)
         s2p = np.sin(2 * phi)
         field_xcomp = 0.5 * (i_0 + i_2 * c2p)
         field_ycomp = 0.5 * i_2 * s2p
         return field_xcomp, field_ycomp
 
-    def _calculate_large_krho_scattered_field(self, krho, phi):
-        # For now, just return 0s:
-        zero = np.zeros(krho.shape, dtype='complex')
-        return zero, zero
-
     def _precompute_scattering_matrices(self):
         kwargs = {'index_ratio': self.index_ratio,
                   'size_parameter': self.size_parameter,
                   }
-        scat_s_evaluator = MieScatteringMatrix(
+        self._scat_perp_evaluator = MieScatteringMatrix(
             parallel_or_perpendicular='perpendicular', lazy=True, **kwargs)
-        scat_p_evaluator = MieScatteringMatrix(
+        self._scat_prll_evaluator = MieScatteringMatrix(
             parallel_or_perpendicular='parallel', lazy=True, **kwargs)
         self._scat_perp_values = np.reshape(
-            scat_s_evaluator._eval(self._theta_pts), (-1, 1))
+            self._scat_perp_evaluator._eval(self._theta_pts), (-1, 1))
         self._scat_prll_values = np.reshape(
-            scat_p_evaluator._eval(self._theta_pts), (-1, 1))
+            self._scat_prll_evaluator._eval(self._theta_pts), (-1, 1))
 
-    def _eval_mielens_i_n(self, krho, n=0):
+    def _eval_mielens_i_n(self, krho, n=0, particle_kz=None,
+                          large_krho=False):
         """Calculates one of several similar integrals over the lens
         pupil which appear in the Mie + lens calculations
 
         This should only be called by
-        `self._calculate_small_krho_scattered_field`
+        `self._calculate_small_krho_scattered_field` or
+        `self._calculate_large_krho_scattered_field`
 
         Parameters
         ----------
@@ -214,12 +265,57 @@ class MieLensCalculator(object):
         n : {0, 2}, optional
             Which integral to evaluate; 0 for S + P, 2 for S - P.
             Default is 0; should always be passed though.
+        particle_kz : float or numpy.ndarray, optional
+            The particle z at each krho value. Default is
+            `self.particle_kz`.
+        large_krho : bool, optional
+            Whether to evaluate the integrals by steepest descent, which
+            is accurate for large krho, instead of by direct quadrature.
+            Default is False.
 
         Returns
         -------
         numpy.ndarray
             The value of the integrand evaluated at the krho points.
         """
+        if particle_kz is None:
+            particle_kz = self.particle_kz
+        evaluate = (self._steepest_descent_eval_mielens_i_n if large_krho
+                    else self._direct_eval_mielens_i_n)
+        if np.ndim(particle_kz) == 0:
+            return self._eval_mielens_i_n_one_plane(
+                krho, n, particle_kz, evaluate)
+
+        # Several detector planes. Each plane with enough points to repay
+        # building an approximant gets its own; everything else, such as
+        # the points of a detector where every z differs, is done in one
+        # batched quadrature over all the remaining planes at once.
+        particle_kz = np.broadcast_to(particle_kz, krho.shape)
+        i_n = np.zeros(krho.shape, dtype='complex')
+        direct = np.ones(krho.shape, dtype='bool')
+        if self.interpolate_integrals is not False:
+            planes, counts = np.unique(particle_kz, return_counts=True)
+            # an approximant needs at least degree + 1 evaluations
+            for kz in planes[counts > self.interpolator_degree + 1]:
+                in_plane = particle_kz == kz
+                if self._interpolation_repays(krho[in_plane]):
+                    i_n[in_plane] = self._interpolate_and_eval_mielens_i_n(
+                        krho[in_plane], n, particle_kz=kz, evaluate=evaluate)
+                    direct[in_plane] = False
+        if direct.any():
+            i_n[direct] = evaluate(
+                krho[direct], n, particle_kz=particle_kz[direct])
+        return i_n
+
+    def _eval_mielens_i_n_one_plane(self, krho, n, particle_kz, evaluate):
+        if self._should_interpolate(krho):
+            i_n = self._interpolate_and_eval_mielens_i_n(
+                krho, n, particle_kz=particle_kz, evaluate=evaluate)
+        else:
+            i_n = evaluate(krho, n, particle_kz=particle_kz)
+        return i_n
+
+    def _should_interpolate(self, krho):
         if self.interpolate_integrals == 'check':
             n_interp_pnts = (self.interpolator_degree * krho.ptp() /
                              self.interpolator_window_size)
@@ -227,13 +323,19 @@ class MieLensCalculator(object):
             interpolate_integrals = n_interp_pnts < 1.1 * n_krho_pts
         else:
             interpolate_integrals = self.interpolate_integrals is True
-        if interpolate_integrals:
-            i_n = self._interpolate_and_eval_mielens_i_n(krho, n)
-        else:
-            i_n = self._direct_eval_mielens_i_n(krho, n)
-        return i_n
+        return interpolate_integrals
 
-    def _direct_eval_mielens_i_n(self, krho, n=0):
+    def _interpolation_repays(self, krho):
+        # whether interpolating costs fewer direct evaluations (degree + 1
+        # per window of the approximant) than evaluating every point
+        window_size = self.interpolator_window_size
+        nwindows = (np.ceil(krho.max() / window_size + 1e-4) -
+                    np.floor(krho.min() / window_size))
+        return (self.interpolator_degree + 1) * nwindows < krho.size
+
+    def _direct_eval_mielens_i_n(self, krho, n=0, particle_kz=None):
+        if particle_kz is None:
+            particle_kz = self.particle_kz
         if n == 0:
             ji = j0
             scatmatrix_values = self._scat_perp_values + self._scat_prll_values
@@ -246,20 +348,183 @@ class MieLensCalculator(object):
         # from cos(lens_angle) to 1.0:
         # Placing things in order [quadrature points, rho-z values]
         rr = krho.reshape(1, -1)
-        integrand = (np.exp(1j * self.particle_kz * (1 - self._quad_pts)) *
+        kz = (particle_kz if np.ndim(particle_kz) == 0
+              else np.reshape(particle_kz, (1, -1)))
+        integrand = (np.exp(1j * kz * (1 - self._quad_pts)) *
                      scatmatrix_values * ji(rr * self._sintheta_pts) *
                      np.sqrt(self._quad_pts))
         answer_flat = np.sum(integrand * self._quad_wts, axis=0)
         return answer_flat.reshape(krho.shape)
 
-    def _interpolate_and_eval_mielens_i_n(self, krho, n=0):
+    def _steepest_descent_eval_mielens_i_n(self, krho, n=0, particle_kz=None):
+        """Evaluates the pupil integrals at large krho.
+
+        Writing the integral over the pupil angle theta, and splitting
+        J_n = (H^{(1)}_n + H^{(2)}_n) / 2, each Hankel-function term is
+        an oscillatory integral with a smooth amplitude and a phase
+            Phi(theta) = kz (1 - cos(theta)) +/- krho sin(theta).
+        The integration contour is deformed onto the paths of steepest
+        descent of Phi from the ends of the pupil and through the
+        stationary point of Phi, if it lies in the pupil. Along these
+        paths the integrand decays as exp(-q^2), so a fixed, small
+        quadrature suffices regardless of krho. The Hankel functions
+        are singular at theta = 0, so the small region where
+        krho sin(theta) < STEEPEST_DESCENT_INNER_KRHO is integrated
+        directly along the real axis.
+        """
+        if n not in (0, 2):
+            raise ValueError('n must be one of {0, 2}')
+        if particle_kz is None:
+            particle_kz = self.particle_kz
+        krho_flat = np.ravel(krho).astype('float')
+        kz_flat = np.ravel(np.broadcast_to(particle_kz, krho.shape))
+        answer_flat = np.zeros(krho_flat.size, dtype='complex')
+        for start in range(0, krho_flat.size, STEEPEST_DESCENT_CHUNKSIZE):
+            chunk = slice(start, start + STEEPEST_DESCENT_CHUNKSIZE)
+            answer_flat[chunk] = self._steepest_descent_eval_chunk(
+                krho_flat[chunk].reshape(-1, 1),
+                kz_flat[chunk].reshape(-1, 1), n)
+        return answer_flat.reshape(krho.shape)
+
+    def _steepest_descent_eval_chunk(self, krho, kz, n):
+        # krho, kz are (N, 1); quadrature nodes run along axis 1.
+        theta_max = np.full(krho.shape, float(self.lens_angle))
+        theta_inner = np.minimum(
+            np.arcsin(np.clip(STEEPEST_DESCENT_INNER_KRHO / krho, 0, 1)),
+            theta_max)
+
+        # 1. The region near theta = 0, directly:
+        pts, wts = gauss_legendre_pts_wts(
+            0, 1, npts=STEEPEST_DESCENT_INNER_NPTS)
+        theta = theta_inner * pts.reshape(1, -1)
+        ji = j0 if n == 0 else j2
+        integrand = (np.exp(1j * kz * (1 - np.cos(theta))) *
+                     self._eval_pupil_amplitude(theta, n) *
+                     ji(krho * np.sin(theta)))
+        answer = np.sum(integrand * theta_inner * wts.reshape(1, -1), axis=1)
+
+        # 2. The rest of the pupil, by steepest descent:
+        # The paths from the ends of the pupil are nearly singular at
+        # q = 0 when the stationary point is close to the end, so we
+        # cluster the nodes there with q = max_q * t^2:
+        t_end, wt_end = gauss_legendre_pts_wts(
+            0, 1, npts=STEEPEST_DESCENT_NPTS)
+        q_end = STEEPEST_DESCENT_MAX_Q * t_end**2
+        w_end = 2 * STEEPEST_DESCENT_MAX_Q * t_end * wt_end
+        q_mid, w_mid = gauss_legendre_pts_wts(
+            -STEEPEST_DESCENT_MAX_Q, STEEPEST_DESCENT_MAX_Q,
+            npts=2 * STEEPEST_DESCENT_NPTS)
+        for hankel_sign in [1, -1]:
+            # Phi' = kz sin(theta) +/- krho cos(theta) vanishes once on
+            # (-pi/2, pi/2], where tan(theta) = -/+ krho / kz:
+            theta_stationary = np.arctan2(-hankel_sign * krho, kz)
+            theta_stationary[theta_stationary > 0.5 * np.pi] -= np.pi
+            theta_stationary[theta_stationary <= -0.5 * np.pi] += np.pi
+            curvature_sign = np.sign(
+                kz * np.cos(theta_stationary) -
+                hankel_sign * krho * np.sin(theta_stationary))
+            has_stationary_point = (
+                (theta_stationary > theta_inner) &
+                (theta_stationary < theta_max)).ravel()
+            # The sign of Phi' at each end of the pupil follows from which
+            # side of the stationary point the end is on. This is robust
+            # even when Phi' ~ 0 there, with the stationary point counted
+            # as inside the pupil only if it is strictly inside.
+            slope_sign_inner = curvature_sign * np.where(
+                theta_stationary <= theta_inner, 1, -1)
+            slope_sign_max = curvature_sign * np.where(
+                theta_stationary < theta_max, 1, -1)
+            answer += self._integrate_along_steepest_descent(
+                theta_inner, krho, kz, n, hankel_sign, q_end, w_end,
+                slope_sign=slope_sign_inner)
+            answer -= self._integrate_along_steepest_descent(
+                theta_max, krho, kz, n, hankel_sign, q_end, w_end,
+                slope_sign=slope_sign_max)
+            if has_stationary_point.any():
+                answer[has_stationary_point] += (
+                    self._integrate_along_steepest_descent(
+                        theta_stationary[has_stationary_point],
+                        krho[has_stationary_point], kz[has_stationary_point],
+                        n, hankel_sign, q_mid, w_mid))
+        return answer
+
+    def _integrate_along_steepest_descent(
+            self, theta_0, krho, kz, n, hankel_sign, q, w, slope_sign=None):
+        """Integrates from theta_0 along the path where the phase
+        Phi(theta) = Phi(theta_0) + i q^2, for the Hankel function
+        H^{(1)} (hankel_sign=1) or H^{(2)} (hankel_sign=-1).
+
+        If `slope_sign` is None, then theta_0 is the stationary point
+        of the phase and the path is followed in both directions, with
+        q from -inf to inf. Otherwise theta_0 is an end of the pupil,
+        the path is followed for q from 0 to inf, and `slope_sign` is
+        the sign of Phi'(theta_0).
+        """
+        q = q.reshape(1, -1)
+        w = w.reshape(1, -1)
+
+        def phase(theta):
+            return (kz * (1 - np.cos(theta)) +
+                    hankel_sign * krho * np.sin(theta))
+
+        def phase_derivative(theta):
+            return kz * np.sin(theta) + hankel_sign * krho * np.cos(theta)
+
+        phase_0 = phase(theta_0)
+        slope = phase_derivative(theta_0)
+        curvature = kz * np.cos(theta_0) - hankel_sign * krho * np.sin(theta_0)
+        # Initial guess for the path, from a quadratic expansion of Phi:
+        if slope_sign is None:
+            theta = theta_0 + q * np.sqrt(2j / curvature)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                root = np.sqrt(slope**2 + 2j * curvature * q**2)
+                root = np.where(root.real * slope_sign < 0, -root, root)
+                theta = theta_0 + (root - slope) / curvature
+                nearly_linear = (np.abs(curvature * q**2) <
+                                 1e-8 * np.abs(slope)**2)
+                theta = np.where(
+                    nearly_linear, theta_0 + 1j * q**2 / slope, theta)
+        # Newton's method for the exact path:
+        target = phase_0 + 1j * q**2
+        for _ in range(50):
+            step = (phase(theta) - target) / phase_derivative(theta)
+            theta = theta - step
+            if np.all(np.abs(step) < 1e-14 * (1 + np.abs(theta))):
+                break
+        dtheta_dq = 2j * q / phase_derivative(theta)
+
+        u = krho * np.sin(theta)
+        scaled_hankel = (hankel1e(n, u) if hankel_sign == 1 else
+                         hankel2e(n, u))
+        # On the path exp(i Phi) = exp(i Phi_0) exp(-q^2), and the scaled
+        # Hankel functions have had their exp(+/- i u) factored out:
+        integrand = (0.5 * scaled_hankel * dtheta_dq * np.exp(-q**2) *
+                     self._eval_pupil_amplitude(theta, n))
+        return np.exp(1j * phase_0.ravel()) * np.sum(integrand * w, axis=1)
+
+    def _eval_pupil_amplitude(self, theta, n):
+        """The non-oscillatory part of the integrand over theta,
+        S_n(theta) sqrt(cos(theta)) sin(theta); works for complex theta.
+        """
+        flat_theta = theta.ravel()
+        perp = self._scat_perp_evaluator._eval(flat_theta)
+        prll = self._scat_prll_evaluator._eval(flat_theta)
+        scatmatrix_values = perp + prll if n == 0 else perp - prll
+        return (scatmatrix_values.reshape(theta.shape) *
+                np.sqrt(np.cos(theta)) * np.sin(theta))
+
+    def _interpolate_and_eval_mielens_i_n(self, krho, n=0, particle_kz=None,
+                                          evaluate=None):
+        if evaluate is None:
+            evaluate = self._direct_eval_mielens_i_n
         window_size = self.interpolator_window_size
         window_start = np.floor(krho.min() / window_size)
         window_end = np.ceil(krho.max() / window_size + 1e-4) + 1
         window_breakpoints = window_size * np.arange(window_start, window_end)
 
         interpolator = PiecewiseChebyshevApproximant(
-            lambda x: self._direct_eval_mielens_i_n(x, n=n),
+            lambda x: evaluate(x, n=n, particle_kz=particle_kz),
             degree=self.interpolator_degree,
             window_breakpoints=window_breakpoints)
         return interpolator(krho)
@@ -271,6 +536,130 @@ class MieLensCalculator(object):
             raise ValueError("{} must be specified.".format(must_be_specified))
 
 
+class MieLensAccuracyTuner(object):
+    def __init__(self, accuracy=1e-6, nprobes=TUNER_NPROBES):
+        """Finds the cheapest `MieLensCalculator` accuracy settings which
+        give a scattered field accurate to a target relative error.
+
+        Parameters
+        ----------
+        accuracy : float > 0, optional
+            The target maximum error in the scattered field, relative to
+            the largest scattered field over the detector. Default 1e-6.
+        nprobes : int, optional
+            The number of krho points at which candidate settings are
+            compared against a reference calculation.
+
+        Methods
+        -------
+        tune(particle_kz, index_ratio, size_parameter, lens_angle,
+             krho_max)
+            dict of the chosen settings, their measured errors and costs
+        """
+        self.accuracy = accuracy
+        self.nprobes = nprobes
+
+    def tune(self, particle_kz, index_ratio, size_parameter, lens_angle,
+             krho_max):
+        """Chooses `quad_npts`, `interpolator_window_size` and
+        `interpolator_degree` for one set of particle and detector
+        parameters.
+
+        The candidates in `TUNER_QUAD_NPTS` are tried in increasing
+        order, with direct quadrature, until one is within half the
+        target accuracy. With that `quad_npts`, the interpolator
+        settings are then tried in order of increasing cost (number of
+        Chebyshev nodes per unit krho) until the interpolated field is
+        within the target accuracy. Errors are measured against a direct
+        quadrature with enough points to be accurate over the whole
+        range: the quadrature error on probe points spanning
+        [0, `krho_max`], and the interpolation error on the probe points
+        below 3.9 * `quad_npts`, where the chosen `quad_npts` evaluates
+        the field by direct quadrature rather than steepest descent.
+
+        Returns
+        -------
+        dict
+            With keys 'quad_npts', 'interpolator_window_size' and
+            'interpolator_degree' (the settings, which can be passed
+            directly to `MieLensCalculator`), 'quadrature_error' and
+            'interpolation_error' (the measured relative errors),
+            'direct_seconds' (the time to evaluate all the probe points
+            by direct quadrature with the chosen `quad_npts`),
+            'interpolation_seconds' (the time to evaluate the probe
+            points below 3.9 * `quad_npts` by interpolation with the
+            chosen settings),
+            and 'tuning_seconds' (the total time spent tuning).
+        """
+        start = time.perf_counter()
+        parameters = {'particle_kz': particle_kz,
+                      'index_ratio': index_ratio,
+                      'size_parameter': size_parameter,
+                      'lens_angle': lens_angle,
+                      }
+        krho = np.linspace(0, krho_max, self.nprobes)
+        phi = np.full(krho.shape, 0.25 * np.pi)
+
+        reference_npts = max(
+            2 * TUNER_QUAD_NPTS[-1], int(np.ceil(krho_max / 3.9)) + 1)
+        reference = MieLensCalculator(
+            quad_npts=reference_npts, interpolate_integrals=False,
+            **parameters).calculate_scattered_field(krho, phi)
+        scale = max(np.abs(reference[0]).max(), np.abs(reference[1]).max())
+
+        def measure(**settings):
+            tick = time.perf_counter()
+            field = MieLensCalculator(
+                **parameters, **settings).calculate_scattered_field(
+                    krho, phi)
+            seconds = time.perf_counter() - tick
+            error = max(np.abs(f - r).max()
+                        for f, r in zip(field, reference)) / scale
+            return error, seconds
+
+        for quad_npts in TUNER_QUAD_NPTS:
+            quadrature_error, direct_seconds = measure(
+                quad_npts=quad_npts, interpolate_integrals=False)
+            if quadrature_error <= 0.5 * self.accuracy:
+                break
+
+        # The krho bandwidth of the integrals is set by the lens angle
+        # alone, so the interpolator error is about the same everywhere
+        # and is largest in absolute terms where the field is. We check
+        # it where the field is evaluated by direct quadrature, which
+        # covers the bright region and is cheap to evaluate.
+        in_direct_region = krho < 3.9 * quad_npts
+        krho = krho[in_direct_region]
+        phi = phi[in_direct_region]
+        reference = tuple(r[in_direct_region] for r in reference)
+        candidates = sorted(
+            [(window_size, degree) for window_size in TUNER_WINDOW_SIZES
+             for degree in TUNER_DEGREES],
+            key=lambda c: ((c[1] + 1) / c[0], -c[0]))
+        for window_size, degree in candidates:
+            interpolation_error, interpolation_seconds = measure(
+                quad_npts=quad_npts, interpolate_integrals=True,
+                interpolator_window_size=window_size,
+                interpolator_degree=degree)
+            if interpolation_error <= self.accuracy:
+                break
+
+        if max(quadrature_error, interpolation_error) > self.accuracy:
+            warn("Could not reach MieLens accuracy {}; best relative "
+                 "error was {:.2g}".format(
+                     self.accuracy,
+                     max(quadrature_error, interpolation_error)))
+        return {'quad_npts': quad_npts,
+                'interpolator_window_size': window_size,
+                'interpolator_degree': degree,
+                'quadrature_error': quadrature_error,
+                'interpolation_error': interpolation_error,
+                'direct_seconds': direct_seconds,
+                'interpolation_seconds': interpolation_seconds,
+                'tuning_seconds': time.perf_counter() - start,
+                }
+
+
 class MieScatteringMatrix(object):
     def __init__(self, parallel_or_perpendicular='perpendicular',
                  index_ratio=1.1, size_parameter=1.0, max_l=None, npts=None,
@@ -547,8 +936,8 @@ def calculate_pil_taul(theta, max_order):
     theta = np.atleast_1d(theta)
     cos_th = np.cos(theta)
 
-    pi = np.zeros([max_order + 1, theta.size])
-    tau = np.zeros([max_order + 1, theta.size])
+    pi = np.zeros([max_order + 1, theta.size], dtype=cos_th.dtype)
+    tau = np.zeros([max_order + 1, theta.size], dtype=cos_th.dtype)
 
     pi[1] = 1
     tau[1] = cos_th
@@ -77,6 +77,11 @@ class Multisphere(ScatteringTheory):
     qeps2 : float (optional)
         error tolerance used to determine at what order the cluster
         spherical harmonic expansion should be truncated
+    n_threads : integer or 'all' (optional)
+        number of threads over which to split the detector points when
+        calculating fields from the cluster expansion. 'all' uses every
+        core. Only has an effect if the Fortran extensions were compiled
+        with OpenMP.
 
     Notes
     -----
@@ -122,7 +127,8 @@ class Multisphere(ScatteringTheory):
     """
 
     def __init__(self, niter=200, eps=1e-6, meth=1, qeps1=1e-5, qeps2=1e-8,
-                 compute_escat_radial = False, suppress_fortran_output = True):
+                 compute_escat_radial = False, suppress_fortran_output = True,
+                 n_threads=1):
         self.niter = niter
         self.eps = eps
         self.meth = meth
@@ -130,6 +136,7 @@ class Multisphere(ScatteringTheory):
         self.qeps2 = qeps2
         self.compute_escat_radial = compute_escat_radial
         self.suppress_fortran_output=suppress_fortran_output
+        self.n_threads = n_threads
 
         if not _COMPILED_FORTRAN:
             raise DependencyMissing("Multisphere theory", "This is probably "
@@ -213,9 +220,11 @@ class Multisphere(ScatteringTheory):
 
     def _raw_fields(self, positions, scatterer, medium_wavevec, medium_index, illum_polarization):
         amn, lmax = self._scsmfo_setup(scatterer, medium_wavevec=medium_wavevec, medium_index=medium_index)
+        n_threads = os.cpu_count() if self.n_threads == 'all' else self.n_threads
         fields = mieangfuncs.tmatrix_fields(positions, amn, lmax, 0,
                                             illum_polarization.values[:2],
-                                            self.compute_escat_radial)
+                                            self.compute_escat_radial,
+                                            n_threads=n_threads)
         if np.isnan(fields[0][0]):
             raise MultisphereFailure()
 
@@ -128,6 +128,14 @@ class ScatteringTheory(HoloPyObject):
         return self._pack_scattering_matrix_into_xarray(
             scat_matrs, positions, schema)
 
+    def _calculation_attrs(self, scatterer, schema, far_field=False):
+        """
+        Attributes describing how scattering from scatterer on schema was
+        calculated, which the calc_* functions add to their results.
+        far_field is True for scattering matrices.
+        """
+        return {}
+
     def _calculate_multiple_color_scattered_field(self, scatterer, schema):
         field = []
         for illum in schema.illum_wavelen.illumination.values: